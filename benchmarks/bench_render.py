@@ -0,0 +1,62 @@
+# -- coding: utf-8 --
+"""Temps de dessin d'un écran plein couvert par une sélection (user-004).
+
+Lancer depuis un vrai terminal : python benchmarks/bench_render.py [fichier]
+Sans fichier, un fichier Python de 400 lignes est généré. Mesure le temps moyen d'une
+image redessinée entièrement et le nombre d'appels addstr/addnstr par image.
+"""
+
+import curses
+import os
+import sys
+import tempfile
+import time
+
+HOME = tempfile.mkdtemp(prefix="ygreg-bench-")
+os.environ["HOME"] = HOME # Réglages et journaux du banc d'essai hors du vrai dossier personnel
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ygreg.editor import Editor
+from ygreg.settings import Settings
+from ygreg.themes import set_theme_colors
+
+FRAMES = 50
+SAMPLE = '''def function_{i}(value, *args, **kwargs):
+    """Docstring de la fonction {i}."""
+    result = [x * {i} for x in range(value) if x % 3]  # commentaire
+    return {{"name": "f{i}", "total": sum(result), "ok": True}}
+
+'''
+
+class CountingWindow:
+    """Enveloppe de la fenêtre curses qui compte les appels d'écriture."""
+
+    def __init__(self, win): self.win, self.calls = win, 0
+    def addstr(self, *args): self.calls += 1; return self.win.addstr(*args)
+    def addnstr(self, *args): self.calls += 1; return self.win.addnstr(*args)
+    def __getattr__(self, name): return getattr(self.win, name)
+
+def main(stdscr, path):
+    set_theme_colors("dark")
+    settings = Settings()
+    settings.settings["journal"] = False
+    editor = Editor(stdscr, path, settings)
+    height, width = stdscr.getmaxyx()
+    editor.selecting, editor.selection_anchor_y, editor.selection_anchor_x = True, 0, 3
+    editor.cursor_y, editor.cursor_x = height - 4, 10
+    window = editor.stdscr = CountingWindow(stdscr)
+    editor._scroll(); editor._render()
+    window.calls = 0
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        editor.damage.invalidate()
+        editor._render()
+    elapsed = (time.perf_counter() - start) / FRAMES
+    editor.close()
+    return f"{width}x{height}, sélection plein écran : {elapsed * 1000:.2f} ms/image, {window.calls // FRAMES} appels addstr/image"
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(HOME, "sample.py")
+    if len(sys.argv) == 1:
+        with open(path, "w") as f: f.write("".join(SAMPLE.format(i=i) for i in range(80)))
+    print(curses.wrapper(main, path))
@@ -0,0 +1,50 @@
+# -- coding: utf-8 --
+"""Recherche incrémentale sur 200 000 lignes (user-012).
+
+python benchmarks/bench_search.py
+Mesure la construction de l'index à chaque caractère tapé, un saut à l'occurrence
+suivante et le coût d'une édition pour l'index, le terme étant présent une ligne sur 100.
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ygreg.buffer import TextBuffer
+from ygreg.search import SearchIndex
+
+LINES = 200_000
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta"]
+
+def timed(action, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat): action()
+    return (time.perf_counter() - start) / repeat
+
+def linear_find(buffer, term, y, x):
+    """Recherche d'avant l'index : ligne par ligne à partir du curseur."""
+    for line_y in range(y, len(buffer)):
+        found = buffer[line_y].find(term, x + 1 if line_y == y else 0)
+        if found != -1: return line_y, found
+    return None
+
+def main():
+    rng = random.Random(0)
+    buffer = TextBuffer([" ".join(rng.choice(WORDS) for _ in range(8)) + (" needle" if i % 100 == 0 else "") for i in range(LINES)])
+    index = SearchIndex(buffer)
+    for term in ["n", "ne", "nee", "need", "needle", "need"]: # Le dernier : retour arrière
+        elapsed = timed(lambda: (index.set_term(term), index.build(None)))
+        print(f"terme {term!r} : index en {elapsed * 1000:.1f} ms, {index.count} occurrences")
+    position = [index.find(0, 0)]
+    def jump(): position[0] = index.find(*position[0])
+    print(f"occurrence suivante : {timed(jump, 10_000) * 1e6:.2f} us, rang {index.rank()}")
+    position[0] = (0, 0)
+    def linear_jump(): position[0] = linear_find(buffer, "needle", *position[0])
+    print(f"occurrence suivante sans index : {timed(linear_jump, 1000) * 1e6:.2f} us")
+    print(f"frappe sur une ligne : {timed(lambda: buffer.insert_text(LINES // 2, 0, 'x'), 1000) * 1e6:.1f} us")
+    print(f"ligne insérée : {timed(lambda: buffer.insert_text(LINES // 2, 0, chr(10)), 100) * 1e6:.1f} us")
+
+if __name__ == "__main__": main()
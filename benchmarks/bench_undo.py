@@ -0,0 +1,47 @@
+# -- coding: utf-8 --
+"""Mémoire de l'historique d'annulation après 100 000 éditions (user-011).
+
+python benchmarks/bench_undo.py
+Document de 10 000 lignes : 10 frappes sur une ligne puis changement de ligne, avec une
+insertion de plusieurs lignes (groupée) toutes les 50 éditions. La mémoire est mesurée
+avec tracemalloc et comparée à l'estimation de l'historique, pour plusieurs budgets.
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ygreg.buffer import TextBuffer
+from ygreg.undo import UndoHistory
+
+EDITS = 100_000
+LINES = 10_000
+
+def run(budget_mb):
+    buffer = TextBuffer([f"    some line of code number {i} = value" for i in range(LINES)])
+    history = UndoHistory(buffer, lambda: (0, 0), budget_mb << 20) if budget_mb else None
+    rng = random.Random(1)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for i in range(EDITS):
+        if i % 10 == 0: y = rng.randrange(LINES)
+        if i % 50 == 49:
+            with history.group() if history else nullcontext(): buffer.insert_text(y, 4, "a\nb")
+        else: buffer.insert_text(y, 4, "k")
+        if history and i % 10 == 9: history.seal()
+    elapsed = time.perf_counter() - start
+    traced = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    per_edit = f"{elapsed / EDITS * 1e6:.1f} us/édition"
+    if history is None: return f"sans historique : {traced / 1e6:.1f} Mo mesurés, {per_edit}"
+    return (f"budget {budget_mb} Mo : {len(history._undo)} étapes, {history.size / 1e6:.1f} Mo estimés, "
+            f"{traced / 1e6:.1f} Mo mesurés, {per_edit}")
+
+if __name__ == "__main__":
+    for budget_mb in (None, 1024, 4): print(run(budget_mb))
@@ -0,0 +1,54 @@
+# -- coding: utf-8 --
+"""Fuzz de l'historique d'annulation (user-011).
+
+python benchmarks/fuzz_undo.py [graines]
+Éditions et groupes au hasard, sans limite puis avec un petit budget : tout annuler
+doit redonner le texte d'origine (ou le plus ancien état encore dans l'historique) et
+tout rétablir le texte final. Les cas courts et déterministes sont dans tests/test_undo.py.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ygreg.buffer import TextBuffer
+from ygreg.undo import UndoHistory
+
+def random_edit(buffer, rng):
+    y = rng.randrange(len(buffer))
+    kind = rng.random()
+    if kind < .5: buffer.insert_text(y, rng.randrange(len(buffer[y]) + 1), rng.choice('abc xyz'))
+    elif kind < .6: buffer.insert_text(y, rng.randrange(len(buffer[y]) + 1), '\n')
+    elif kind < .7 and len(buffer) > 2: buffer.delete_lines(y, min(len(buffer), y + rng.randint(1, 3)))
+    elif kind < .8: buffer.set_line(y, buffer[y][::-1])
+    elif kind < .9: buffer.set_line(y, buffer[y] + "#" * rng.randrange(500))
+    else: buffer.insert_text(y, 0, 'q\nw\ne')
+
+def fuzz(seed, max_bytes):
+    rng = random.Random(seed)
+    buffer = TextBuffer([f"line {i}" for i in range(30)])
+    history = UndoHistory(buffer, lambda: (0, 0), max_bytes)
+    states = [list(buffer)]
+    for _ in range(rng.randint(1, 80)):
+        if rng.random() < .2:
+            with history.group():
+                for _ in range(rng.randint(1, 30)): random_edit(buffer, rng)
+        else: random_edit(buffer, rng)
+        history.seal()
+        if list(buffer) != states[-1]: states.append(list(buffer))
+        assert history.size <= max_bytes, seed
+    undone = 0
+    while history.undo() is not None: undone += 1
+    if max_bytes == UNLIMITED: assert list(buffer) == states[0], seed
+    while history.redo() is not None: undone -= 1
+    assert undone == 0 and list(buffer) == states[-1], seed
+
+UNLIMITED = 1 << 40
+
+if __name__ == "__main__":
+    seeds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    for seed in range(seeds):
+        for max_bytes in (UNLIMITED, 20_000, 4_000): fuzz(seed, max_bytes)
+    print(f"{seeds} graines : annuler et rétablir redonnent les bons textes")
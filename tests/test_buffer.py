@@ -0,0 +1,71 @@
+# -- coding: utf-8 --
+
+import random
+
+from ygreg import buffer as buffer_module
+from ygreg.buffer import ChunkedList, TextBuffer, iter_snapshot
+
+def chain_snapshot(snapshot):
+    for items in iter_snapshot(snapshot): yield from items
+
+def test_splice_matches_a_list(monkeypatch):
+    monkeypatch.setattr(buffer_module, "CHUNK_SIZE", 4) # Des blocs minuscules : fusions et redécoupages à chaque pas
+    rng = random.Random(1)
+    for _ in range(100):
+        reference = [str(i) for i in range(rng.randint(0, 60))]
+        chunked = ChunkedList(reference)
+        for _ in range(100):
+            start = rng.randint(0, len(reference))
+            end = rng.randint(start, min(len(reference), start + rng.choice([0, 1, 2, 10, 40])))
+            new_items = [f"n{rng.random():.3f}" for _ in range(rng.choice([0, 1, 2, 3, 12, 50]))]
+            assert chunked.splice(start, end, new_items) == reference[start:end]
+            reference[start:end] = new_items
+            assert len(chunked) == len(reference) and list(chunked) == reference
+            first = rng.randint(0, len(reference))
+            last = rng.randint(first, len(reference))
+            assert chunked[first:last] == reference[first:last]
+            if reference: assert chunked[rng.randrange(len(reference))] in reference
+
+def test_lazy_chunks_are_loaded_on_access_and_evicted(monkeypatch):
+    monkeypatch.setattr(buffer_module, "MAX_LOADED_CHUNKS", 2)
+    loads = []
+    def loader(n):
+        def load():
+            loads.append(n)
+            return [f"{n}:{i}" for i in range(10)]
+        return load
+    chunked = ChunkedList(["début"])
+    for n in range(5): chunked.append_lazy(10, loader(n))
+    assert len(chunked) == 51 and loads == []
+    assert chunked[25] == "2:4" and loads == [2]
+    chunked[15] = "modifié" # Un bloc modifié n'est plus jamais oublié
+    chunked[35], chunked[45] = chunked[35], chunked[45]
+    assert chunked[15] == "modifié"
+    assert chunked[25] == "2:4" and loads.count(2) == 2 # Bloc 2 oublié puis relu
+
+def test_snapshot_is_not_affected_by_later_edits():
+    chunked = ChunkedList([str(i) for i in range(2000)])
+    snapshot = chunked.snapshot()
+    chunked.splice(0, 10, ["x"])
+    chunked[1500] = "y"
+    assert list(chain_snapshot(snapshot)) == [str(i) for i in range(2000)]
+
+def test_text_edits():
+    text = TextBuffer(["hello", "world"])
+    assert text.insert_text(0, 2, "XX\nYY\nZ") == (2, 1)
+    assert list(text) == ["heXX", "YY", "Zllo", "world"]
+    assert text.delete_range(0, 1, 2, 1) == ["eXX", "YY", "Z"]
+    assert list(text) == ["hllo", "world"]
+    text.join_lines(0, " ")
+    assert list(text) == ["hllo world"]
+    text.delete_lines(0, 1)
+    assert list(text) == [""] # Le document garde au moins une ligne
+
+def test_listeners_see_every_replace():
+    text = TextBuffer(["a", "b", "c"])
+    seen = []
+    text.add_listener(lambda start, old, new: seen.append((start, old, new)))
+    text.split_line(1, 1)
+    text.set_line(0, "A")
+    text.set_line(0, "A") # Sans changement : pas d'édition
+    assert seen == [(1, ["b"], ["b", ""]), (0, ["a"], ["A"])]
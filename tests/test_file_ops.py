@@ -0,0 +1,38 @@
+# -- coding: utf-8 --
+
+import os
+
+from ygreg.file_ops import FileOperation
+
+def run(kind, sources, destination):
+    job = FileOperation(kind, [str(source) for source in sources], str(destination))
+    job._thread.join()
+    return job
+
+def write(path, text):
+    with open(path, 'w') as f: f.write(text)
+
+def test_several_sources_need_a_directory(tmp_path):
+    write(tmp_path / "a", "A")
+    write(tmp_path / "b", "B")
+    job = run("move", [tmp_path / "a", tmp_path / "b"], tmp_path / "dest")
+    assert job.errors and "dest" in job.errors[0]
+    assert not os.path.exists(tmp_path / "dest")
+    assert (tmp_path / "a").read_text() == "A" and (tmp_path / "b").read_text() == "B"
+
+def test_same_name_twice_is_not_overwritten(tmp_path):
+    for folder, text in (("x", "X"), ("y", "Y")):
+        os.mkdir(tmp_path / folder)
+        write(tmp_path / folder / "f", text)
+    os.mkdir(tmp_path / "dest")
+    for kind in ("copy", "move"):
+        job = run(kind, [tmp_path / "x" / "f", tmp_path / "y" / "f"], tmp_path / "dest")
+        assert len(job.errors) == 1 and "existe déjà" in job.errors[0]
+        assert (tmp_path / "dest" / "f").read_text() == "X"
+        assert (tmp_path / "y" / "f").read_text() == "Y"
+        if kind == "copy": os.unlink(tmp_path / "dest" / "f")
+
+def test_single_source_renamed(tmp_path):
+    write(tmp_path / "a", "A")
+    job = run("move", [tmp_path / "a"], tmp_path / "b")
+    assert job.errors == [] and (tmp_path / "b").read_text() == "A"
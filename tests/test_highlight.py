@@ -0,0 +1,37 @@
+# -- coding: utf-8 --
+
+import time
+
+from ygreg.buffer import TextBuffer
+from ygreg.highlight import LineHighlighter, MAX_WALK
+from ygreg.lexers.python import highlight
+
+def wait_idle(highlighter, timeout=10):
+    deadline = time.monotonic() + timeout
+    while highlighter.pending() and time.monotonic() < deadline:
+        highlighter.flush_changes()
+        time.sleep(0.01)
+    highlighter.flush_changes()
+    assert not highlighter.pending()
+
+def test_far_jump_guess_is_corrected():
+    # Une docstring de 5000 lignes : vue de loin, depuis un état neutre, elle passe pour du code
+    lines = ['x = 1', '"""'] + [f'def foo(a): return a  # texte {i}' for i in range(5000)] + ['"""', 'y = 2']
+    highlighter = LineHighlighter(TextBuffer(lines), highlight)
+    changed = []
+    highlighter.on_change = lambda start, end: changed.append((start, end))
+    first = 3000
+    assert first > MAX_WALK
+    highlighter.set_viewports([(first, first + 40)])
+    wait_idle(highlighter)
+    assert highlighter._valid >= first + 40
+    expected = highlight(lines[3010], highlight(lines[1], None)[1])[0]
+    assert highlighter.tokens(3010) == expected
+    assert any(start <= 3010 < end for start, end in changed)
+
+def test_edit_relexes_following_lines():
+    highlighter = LineHighlighter(TextBuffer(['a = 1', 'b = 2', 'c = 3']), highlight)
+    wait_idle(highlighter)
+    highlighter.buffer.replace(0, 1, ['"""a = 1'])
+    wait_idle(highlighter)
+    assert highlighter.tokens(2) == highlight('c = 3', highlight('b = 2', highlight('"""a = 1', None)[1])[1])[0]
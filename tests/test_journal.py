@@ -0,0 +1,103 @@
+# -- coding: utf-8 --
+
+import os
+
+import pytest
+
+from ygreg.buffer import TextBuffer, write_snapshot
+from ygreg.journal import Journal, RecoveryCancelled, journal_path
+from ygreg.text_format import FileFormat
+
+def open_document(path):
+    with open(path, encoding='utf-8') as f: return TextBuffer(f.read().split('\n'))
+
+def save(buffer, path):
+    buffer.write_to(path, FileFormat())
+
+def test_recovers_edits_after_crash(tmp_path):
+    path = str(tmp_path / "doc.txt")
+    with open(path, 'w') as f: f.write("un\ndeux\ntrois")
+    buffer = open_document(path)
+    journal = Journal(path, buffer)
+    buffer.replace(1, 2, ["DEUX", "deux bis"])
+    buffer.insert_text(0, 2, " !")
+    journal.close() # Plantage : le journal reste
+    recovered = open_document(path)
+    journal = Journal(path, recovered)
+    assert journal.recovered == 2
+    assert list(recovered) == list(buffer)
+    journal.close(delete=True)
+    assert not os.path.exists(journal_path(path))
+
+def test_checkpoint_keeps_later_edits_only(tmp_path):
+    path = str(tmp_path / "doc.txt")
+    with open(path, 'w') as f: f.write("\n".join(f"ligne {i}" for i in range(100)))
+    buffer = open_document(path)
+    journal = Journal(path, buffer)
+    for i in range(50): buffer.set_line(i, f"avant {i}")
+    snapshot, mark = buffer.snapshot(), journal.mark()
+    for i in range(50, 60): buffer.set_line(i, f"après {i}")
+    write_snapshot(path, snapshot, FileFormat())
+    journal.checkpoint(mark)
+    buffer.delete_lines(0, 10) # Pendant ou après la réécriture du journal
+    journal.close()
+    assert len(journal._ends) == 11 # Seules les positions des éditions postérieures restent en mémoire
+    recovered = open_document(path)
+    journal = Journal(path, recovered)
+    assert journal.recovered == 11
+    assert list(recovered) == list(buffer)
+    journal.close(delete=True)
+
+def test_checkpoint_after_recovery_drops_replayed_edits(tmp_path):
+    path = str(tmp_path / "doc.txt")
+    with open(path, 'w') as f: f.write("a\nb")
+    buffer = open_document(path)
+    journal = Journal(path, buffer)
+    buffer.set_line(0, "A")
+    journal.close()
+    buffer = open_document(path)
+    journal = Journal(path, buffer)
+    assert journal.recovered == 1
+    mark = journal.mark()
+    save(buffer, path)
+    journal.checkpoint(mark)
+    buffer.set_line(1, "B")
+    journal.close()
+    recovered = open_document(path)
+    journal = Journal(path, recovered)
+    assert journal.recovered == 1
+    assert list(recovered) == ["A", "B"]
+    journal.close(delete=True)
+
+def test_truncated_record_ends_the_journal(tmp_path):
+    path = str(tmp_path / "doc.txt")
+    with open(path, 'w') as f: f.write("x")
+    buffer = open_document(path)
+    journal = Journal(path, buffer)
+    buffer.set_line(0, "y")
+    buffer.set_line(0, "z")
+    journal.close()
+    with open(journal_path(path), 'r+b') as f: f.truncate(os.path.getsize(journal_path(path)) - 3)
+    recovered = open_document(path)
+    journal = Journal(path, recovered)
+    assert journal.recovered == 1 and list(recovered) == ["y"]
+    journal.close(delete=True)
+
+def test_cancelled_replay_restores_document_and_keeps_journal(tmp_path):
+    path = str(tmp_path / "doc.txt")
+    with open(path, 'w') as f: f.write("un\ndeux\ntrois")
+    buffer = open_document(path)
+    journal = Journal(path, buffer)
+    buffer.delete_lines(0, 3)
+    buffer.insert_lines(0, ["a", "b"])
+    buffer.set_line(1, "B")
+    journal.close()
+    size = os.path.getsize(journal_path(path))
+    waits = []
+    recovered = open_document(path)
+    with pytest.raises(RecoveryCancelled): Journal(path, recovered, lambda y: waits.append(y) or len(waits) < 3)
+    assert list(recovered) == ["un", "deux", "trois"]
+    assert os.path.getsize(journal_path(path)) == size
+    journal = Journal(path, recovered) # Rejoué à la prochaine ouverture
+    assert journal.recovered == 3 and list(recovered) == list(buffer)
+    journal.close(delete=True)
@@ -0,0 +1,22 @@
+# -- coding: utf-8 --
+
+import time
+
+import pytest
+
+from ygreg import project_search
+from ygreg.project_search import ProjectSearch
+
+def search(root, term):
+    job = ProjectSearch(str(root), term)
+    deadline = time.monotonic() + 60
+    while not job.done and time.monotonic() < deadline: time.sleep(0.01)
+    assert job.done and job.error is None
+    return job
+
+@pytest.mark.parametrize("matches, truncated", [(4, False), (5, False), (6, True)])
+def test_truncated_only_past_max_results(tmp_path, monkeypatch, matches, truncated):
+    monkeypatch.setattr(project_search, "MAX_RESULTS", 5)
+    for i in range(matches): (tmp_path / f"f{i}.txt").write_text("aiguille\n")
+    job = search(tmp_path, "aiguille")
+    assert len(job.results) == min(matches, 5) and job.truncated == truncated
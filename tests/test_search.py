@@ -0,0 +1,105 @@
+# -- coding: utf-8 --
+
+import random
+import re
+
+from ygreg import search
+from ygreg.buffer import TextBuffer
+from ygreg.search import SearchIndex, ReplaceAll, compile_pattern, is_multiline
+
+def brute_force(buffer, term, **options):
+    """Positions des occurrences non vides, ligne par ligne (ou dans tout le texte pour une regex multiligne)."""
+    pattern = compile_pattern(term, **options)
+    if is_multiline(term, options.get("regex", False)):
+        text = '\n'.join(buffer)
+        positions = []
+        for match in pattern.finditer(text):
+            if match.start() == match.end(): continue
+            before = text[:match.start()]
+            positions.append((before.count('\n'), match.start() - before.rfind('\n') - 1))
+        return positions
+    return [(y, match.start()) for y, line in enumerate(buffer) for match in pattern.finditer(line) if match.start() != match.end()]
+
+def indexed(index):
+    """Positions des occurrences connues de l'index, dans l'ordre."""
+    spans = index.visible_spans(0, len(index.buffer))
+    return sorted({origin for line_spans in spans.values() for _, _, origin in line_spans})
+
+def test_index_follows_edits_and_typing():
+    for seed in range(60):
+        rng = random.Random(seed)
+        buffer = TextBuffer(["".join(rng.choice("aab c") for _ in range(rng.randint(0, 12))) for _ in range(40)])
+        index, term = SearchIndex(buffer), ""
+        for _ in range(60):
+            kind = rng.random()
+            if kind < .3: # Saisie ou retour arrière dans le terme, analyse parfois partielle
+                term = term[:-1] if term and rng.random() < .4 else term + rng.choice("ab c")
+                index.set_term(term)
+                if rng.random() < .5: index.build(0)
+            elif kind < .6:
+                y = rng.randrange(len(buffer))
+                buffer.insert_text(y, rng.randrange(len(buffer[y]) + 1), rng.choice(["a", "b", "\n", "ab", "a\nb", " c"]))
+            elif kind < .7 and len(buffer) > 2:
+                y = rng.randrange(len(buffer) - 1)
+                buffer.delete_lines(y, y + rng.randint(1, 2))
+            elif term:
+                index.build(None)
+                expected = brute_force(buffer, term)
+                assert indexed(index) == expected and index.count == len(expected), seed
+                if not expected: continue
+                y = rng.randrange(len(buffer))
+                x = rng.randrange(len(buffer[y]) + 1)
+                backward = rng.random() < .5
+                position = index.find(y, x, backward=backward)
+                if backward: want = max((p for p in expected if p < (y, x)), default=expected[-1])
+                else: want = min((p for p in expected if p > (y, x)), default=expected[0])
+                assert position == want, seed
+                for _ in range(rng.randint(1, 6)): # Sauts depuis l'occurrence courante, rang tenu à jour
+                    position = index.find(*position, backward=rng.random() < .3)
+                    assert index.rank() == expected.index(position) + 1, seed
+
+def test_options():
+    buffer = TextBuffer(["Mot mots mot", "MOT amot mot_x"])
+    index = SearchIndex(buffer)
+    for options, term in [({}, "mot"), ({"ignore_case": True}, "mot"), ({"whole_word": True}, "mot"),
+                          ({"whole_word": True, "ignore_case": True}, "mot"), ({"regex": True}, r"m\w+"),
+                          ({"regex": True, "whole_word": True}, "mo|mot")]:
+        index.set_term(term, **options)
+        index.build(None)
+        assert indexed(index) == brute_force(buffer, term, **options), options
+
+def test_invalid_regex_reports_error():
+    index = SearchIndex(TextBuffer(["abc"]))
+    index.set_term("(", regex=True)
+    assert index.error and index.count == 0
+
+def test_multiline_matches_across_scan_blocks(monkeypatch):
+    monkeypatch.setattr(search, "SCAN_LINES", 8)
+    monkeypatch.setattr(search, "MULTILINE_CONTEXT", 4)
+    rng = random.Random(3)
+    buffer = TextBuffer([rng.choice(["begin", "x", "end", "begin x", ""]) for _ in range(200)])
+    for term in [r"begin\nx", r"n\n\n?e", r"x\n(?:.*\n){0,2}end"]:
+        index = SearchIndex(buffer)
+        index.set_term(term, regex=True)
+        index.build(None)
+        assert indexed(index) == brute_force(buffer, term, regex=True), term
+        buffer.insert_text(100, 0, "begin\nx") # Une édition en mode multiligne réanalyse la suite
+        index.build(None)
+        assert indexed(index) == brute_force(buffer, term, regex=True), term
+
+def test_replace_all_matches_re_sub(monkeypatch):
+    monkeypatch.setattr(search, "SCAN_LINES", 16)
+    lines = [f"id={i} name=n{i % 7}" + ("" if i % 5 else " name=extra") for i in range(300)]
+    for term, replacement, regex in [("name", "nom", False), (r"name=(\w+)", r"\1:nom", True), (r"\d\n", "#", True)]:
+        buffer = TextBuffer(lines)
+        pattern = compile_pattern(term, regex=regex)
+        job = ReplaceAll(buffer, pattern, replacement, multiline=is_multiline(term, regex), expand=regex)
+        while not job.step(0): pass
+        expected = pattern.sub(replacement if regex else replacement.replace('\\', r'\\'), '\n'.join(lines))
+        assert job.count == len(pattern.findall('\n'.join(lines)))
+        job.apply()
+        assert '\n'.join(buffer) == expected, term
+
+def test_pattern_cache_reuses_compiled_patterns():
+    assert compile_pattern("abc") is compile_pattern("abc")
+    assert compile_pattern("abc", ignore_case=True).flags & re.IGNORECASE
@@ -0,0 +1,122 @@
+# -- coding: utf-8 --
+
+import io
+
+import pytest
+
+from ygreg import mapped_file, text_format
+from ygreg.buffer import write_snapshot
+from ygreg.hex_view import is_binary
+from ygreg.mapped_file import load_mapped
+from ygreg.text_format import FileFormat, load_text
+
+SAMPLES = {
+    "vide": b"",
+    "saut seul": b"\n",
+    "unix": b"a\nb\n",
+    "unix sans fin": b"a\nb",
+    "windows": b"a\r\nb\r\n",
+    "windows sans fin": b"a\r\nb",
+    "mixte windows": b"a\r\nb\nc\r\nd\r\n",
+    "mixte unix": b"a\nb\r\nc\n",
+    "latin-1": "café\r\nnaïve\n".encode("latin-1"),
+    "cp1252": "coût €\n".encode("cp1252"),
+    "bom utf-8": b"\xef\xbb\xbfhi\r\nyo",
+    "utf-16-le": "﻿hé\r\nx\n".encode("utf-16-le"),
+    "utf-16-be": "﻿a\nb".encode("utf-16-be"),
+    "cr dans une ligne": b"a\rb\nc\n",
+    "cr final": b"a\r",
+}
+
+def round_trip(tmp_path, data, load=load_text):
+    path = tmp_path / "doc.txt"
+    path.write_bytes(data)
+    buffer, file_format = load(str(path))
+    while buffer.indexing: buffer.wait_for_line(len(buffer))
+    write_snapshot(str(path), buffer.snapshot(), file_format)
+    return buffer, file_format, path.read_bytes()
+
+@pytest.mark.parametrize("name", SAMPLES)
+def test_unchanged_file_is_rewritten_byte_for_byte(tmp_path, name):
+    buffer, file_format, written = round_trip(tmp_path, SAMPLES[name])
+    assert written == SAMPLES[name]
+    assert buffer.total_bytes == len(SAMPLES[name])
+
+@pytest.mark.parametrize("data, label", [
+    (b"a\nb\n", ""),
+    (b"a\r\nb\r\n", "CRLF"),
+    (b"a\r\nb\nc\r\n", "CRLF fins de ligne mixtes"),
+    ("é\n".encode("cp1252"), "CP1252"),
+    (b"\xef\xbb\xbfx", "UTF-8 BOM"),
+])
+def test_labels(tmp_path, data, label):
+    path = tmp_path / "doc.txt"
+    path.write_bytes(data)
+    assert load_text(str(path))[1].label() == label
+
+def test_edits_keep_line_endings(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_bytes(b"a\r\nb\nc\r\nd\r\n")
+    buffer, file_format = load_text(str(path))
+    buffer.add_listener(file_format.on_edit)
+    buffer.replace(0, 0, ["new"])
+    buffer.replace(2, 3, ["x", "y"]) # La ligne "b" remplacée par deux : sa fin passe à la dernière
+    buffer.delete_lines(0, 1)
+    write_snapshot(str(path), buffer.snapshot(), file_format)
+    assert path.read_bytes() == b"a\r\nx\r\ny\nc\r\nd\r\n"
+
+def test_unencodable_character_keeps_the_file(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_bytes("café\n".encode("cp1252"))
+    buffer, file_format = load_text(str(path))
+    buffer.set_line(0, "中")
+    with pytest.raises(ValueError, match="U\\+4E2D"): write_snapshot(str(path), buffer.snapshot(), file_format)
+    assert path.read_bytes() == "café\n".encode("cp1252")
+
+def test_invalid_utf8_after_the_sample_falls_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_format, "SAMPLE_SIZE", 16)
+    data = b"ascii only at first\n" * 4 + "é\n".encode("latin-1")
+    buffer, file_format, written = round_trip(tmp_path, data)
+    assert file_format.encoding == "cp1252" and buffer[4] == "é" and written == data
+
+def test_utf16_is_not_binary(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_bytes("﻿a\nb".encode("utf-16-le"))
+    assert not is_binary(str(path))
+    path.write_bytes(b"\x00\x01\x02")
+    assert is_binary(str(path))
+
+@pytest.mark.parametrize("data", [
+    b"".join(b"line %d\r\n" % i for i in range(30000)) + b"tail",
+    b"".join((b"l%d\n" if i % 1000 == 7 else b"l%d\r\n") % i for i in range(30000)),
+    b"".join(b"caf\xe9 %d\n" % i for i in range(30000)),
+    b"\xef\xbb\xbf" + b"".join(b"x%d\n" % i for i in range(30000)),
+])
+def test_mapped_file_round_trip(tmp_path, monkeypatch, data):
+    monkeypatch.setattr(mapped_file, "INDEX_BLOCK_SIZE", 4096) # Plusieurs blocs indexés en arrière-plan
+    buffer, file_format, written = round_trip(tmp_path, data, load_mapped)
+    assert written == data
+
+def test_file_format_write_without_final_newline():
+    out = io.BytesIO()
+    FileFormat(newline="\r\n", others={1: "\n"}).write(out, [["a", "b"], ["c"]])
+    assert out.getvalue() == b"a\r\nb\nc"
+
+LATIN1_AFTER_SAMPLE = b"ligne ascii\n" * (text_format.SAMPLE_SIZE // 12 + 100) + "café\n".encode("latin-1") + b"fin\n"
+
+def test_mapped_file_invalid_byte_after_sample(tmp_path):
+    data = LATIN1_AFTER_SAMPLE
+    path = tmp_path / "doc.txt"
+    path.write_bytes(data)
+    buffer, file_format = load_mapped(str(path))
+    while buffer.indexing: buffer.wait_for_line(len(buffer))
+    assert file_format.encoding == "utf-8" and file_format.invalid == data.index(b"\xe9")
+    with pytest.raises(ValueError, match="octet invalide"): write_snapshot(str(path), buffer.snapshot(), file_format.frozen())
+    assert path.read_bytes() == data # Rien n'est écrasé
+
+def test_mapped_file_first_block_falls_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(mapped_file, "INDEX_BLOCK_SIZE", 4 * text_format.SAMPLE_SIZE) # Octet invalide dans le premier bloc, après l'échantillon
+    data = LATIN1_AFTER_SAMPLE
+    buffer, file_format, written = round_trip(tmp_path, data, load_mapped)
+    assert file_format.encoding == "cp1252" and file_format.invalid is None
+    assert written == data
@@ -0,0 +1,106 @@
+# -- coding: utf-8 --
+
+import random
+
+from ygreg.buffer import TextBuffer
+from ygreg.undo import UndoHistory
+
+def make_history(lines, max_bytes=1 << 30):
+    buffer = TextBuffer(lines)
+    return buffer, UndoHistory(buffer, lambda: (0, 0), max_bytes)
+
+def random_edit(buffer, rng, first=0, end=None):
+    """Édition au hasard entre les lignes first et end (exclue) ; end None : jusqu'à la fin."""
+    end = len(buffer) if end is None else end
+    y = rng.randrange(first, end)
+    kind = rng.random()
+    if kind < .5: buffer.insert_text(y, rng.randrange(len(buffer[y]) + 1), rng.choice('abc xyz'))
+    elif kind < .6: buffer.insert_text(y, rng.randrange(len(buffer[y]) + 1), '\n')
+    elif kind < .7 and end - first > 2: buffer.delete_lines(y, min(end, y + rng.randint(1, 3)))
+    elif kind < .8: buffer.set_line(y, buffer[y][::-1])
+    else: buffer.insert_text(y, 0, 'q\nw\ne')
+
+def test_typing_coalesces_into_one_step():
+    buffer, history = make_history(["hello"])
+    for char in "world": buffer.insert_text(0, len(buffer[0]), char)
+    history.undo()
+    assert list(buffer) == ["hello"]
+    assert history.undo() is None
+
+def test_undo_redo_round_trip():
+    for seed in range(50):
+        rng = random.Random(seed)
+        buffer, history = make_history([f"line {i}" for i in range(30)])
+        states = [list(buffer)]
+        for _ in range(rng.randint(1, 40)):
+            if rng.random() < .2:
+                with history.group():
+                    for _ in range(rng.randint(1, 4)): random_edit(buffer, rng)
+            else: random_edit(buffer, rng)
+            history.seal()
+            if list(buffer) != states[-1]: states.append(list(buffer))
+        i = len(states) - 1
+        while history.undo() is not None:
+            i -= 1
+            assert list(buffer) == states[i], seed
+        assert i == 0
+        while history.redo() is not None: i += 1
+        assert list(buffer) == states[-1], seed
+
+def test_budget_drops_oldest_steps():
+    buffer, history = make_history(["x" * 100 for _ in range(100)], max_bytes=20_000)
+    for i in range(500):
+        buffer.set_line(i % 100, f"{i:>100}")
+        history.seal()
+    assert history.size <= history.max_bytes
+    assert 0 < len(history._undo) < 500
+    while history.undo() is not None: pass
+    assert list(buffer)[-1] == f"{399:>100}" # Les plus récentes restent annulables
+
+def test_group_over_budget_keeps_earlier_steps():
+    lines = [f"ligne {i}" for i in range(1000)]
+    buffer, history = make_history(lines, max_bytes=50_000)
+    for i in range(20): # 20 étapes en haut du document
+        buffer.set_line(i, f"modifiée {i}")
+        history.seal()
+    buffer.insert_lines(5, ["insérée"]) # Décale les lignes du groupe
+    history.seal()
+    with history.group(): # Bien plus que le budget, plus bas
+        for i in range(100, 1001): buffer.set_line(i, "z" * 200)
+        buffer.insert_lines(500, ["a", "b"])
+    assert history.size <= history.max_bytes
+    assert len(history._undo) == 21
+    for _ in range(21): assert history.undo() is not None
+    assert history.undo() is None
+    assert list(buffer) == lines[:99] + ["z" * 200] * 400 + ["a", "b"] + ["z" * 200] * 501
+
+def test_group_over_budget_forgets_overlapping_steps():
+    buffer, history = make_history([f"ligne {i}" for i in range(1000)], max_bytes=10_000)
+    buffer.set_line(0, "ancienne")
+    history.seal()
+    buffer.set_line(700, "touchée par le groupe")
+    history.seal()
+    buffer.set_line(999, "après le groupe")
+    history.seal()
+    with history.group():
+        for i in range(500, 900): buffer.set_line(i, "z" * 200)
+    assert len(history._undo) == 1 # Seule l'étape après la zone du groupe reste
+    history.undo()
+    assert buffer[999] == "ligne 999" and buffer[700] == "z" * 200 and buffer[0] == "ancienne"
+
+def test_group_over_budget_with_random_edits_around():
+    for seed in range(30):
+        rng = random.Random(seed)
+        lines = [f"haut {i}" for i in range(40)] + ["----"] + [f"bas {i}" for i in range(400)]
+        buffer, history = make_history(lines, max_bytes=20_000)
+        for _ in range(rng.randint(1, 20)): # Les étapes restent au-dessus du séparateur
+            random_edit(buffer, rng, 0, list(buffer).index("----"))
+            history.seal()
+        with history.group():
+            for _ in range(200):
+                marker = list(buffer).index("----")
+                random_edit(buffer, rng, marker + 1)
+            for i in range(list(buffer).index("----") + 1, len(buffer)): buffer.set_line(i, buffer[i] + "#" * 100)
+        bottom = list(buffer)[list(buffer).index("----"):]
+        while history.undo() is not None: pass
+        assert list(buffer) == lines[:40] + bottom, seed
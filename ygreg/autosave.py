@@ -0,0 +1,61 @@
+# -- coding: utf-8 --
+
+import threading
+from collections import OrderedDict
+
+from .buffer import write_snapshot
+
+class BackgroundWriter:
+    """Écrit les sauvegardes dans un fil dédié : l'éditeur confie un instantané et continue.
+
+    Chaque instantané vient avec le format du fichier (encodage, fins de ligne). Les
+    demandes encore en attente pour un même fichier sont fusionnées, seule la plus
+    récente est écrite. Le résultat de chaque écriture, (version, exception ou None),
+    est récupéré par l'éditeur avec take_result().
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = OrderedDict() # chemin -> (version, instantané, format)
+        self._writing = None
+        self._results = {}
+        self._thread = None
+
+    def submit(self, path, version, snapshot, file_format):
+        with self._cond:
+            self._pending[path] = (version, snapshot, file_format)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def busy(self, path):
+        """Vrai si une écriture de path est en attente ou en cours."""
+        with self._cond: return path in self._pending or self._writing == path
+
+    def wait(self, path):
+        """Attend la fin des écritures de path (avant de quitter l'éditeur)."""
+        with self._cond: self._cond.wait_for(lambda: path not in self._pending and self._writing != path)
+
+    def has_result(self, path):
+        with self._cond: return path in self._results
+
+    def take_result(self, path):
+        with self._cond: return self._results.pop(path, None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                path, (version, snapshot, file_format) = self._pending.popitem(last=False)
+                self._writing = path
+            try:
+                write_snapshot(path, snapshot, file_format)
+                error = None
+            except Exception as e: error = e
+            with self._cond:
+                self._results[path] = (version, error)
+                self._writing = None
+                self._cond.notify_all()
+
+writer = BackgroundWriter()
@@ -0,0 +1,304 @@
+# -- coding: utf-8 --
+
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from itertools import chain
+
+CHUNK_SIZE = 512 # Nombre de lignes visé par bloc
+MAX_LOADED_CHUNKS = 256 # Blocs paresseux gardés décodés en mémoire
+
+class _Chunk:
+    __slots__ = ("items", "size", "loader", "shared")
+
+    def __init__(self, items, size=None, loader=None):
+        self.items, self.loader = items, loader
+        self.size = len(items) if size is None else size
+        self.shared = False # Contenu référencé par un instantané : à copier avant de le modifier
+
+
+def iter_snapshot(snapshot):
+    """Parcourt un instantané (voir ChunkedList.snapshot) bloc par bloc."""
+    for items, loader in snapshot: yield items if items is not None else loader()
+
+def write_snapshot(path, snapshot, file_format):
+    """Écrit un instantané de document dans un fichier temporaire, au format file_format (voir text_format), puis le renomme sur path.
+
+    Ne touche pas au tampon : peut être appelée depuis un autre fil que celui de l'éditeur.
+    """
+    tmp_path = f"{path}.ygreg-tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            try: file_format.write(f, iter_snapshot(snapshot))
+            except UnicodeEncodeError as e:
+                raise ValueError(f"caractère U+{ord(e.object[e.start]):04X} impossible à écrire en {file_format.encoding}") from None
+        if os.path.exists(path): shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+
+class ChunkedList:
+    """Liste découpée en blocs, indexée par un arbre de Fenwick sur la taille des blocs.
+
+    L'accès à un élément et les éditions locales coûtent O(log n) au lieu du O(n)
+    des insertions/suppressions dans une liste Python classique. Un bloc peut être
+    paresseux : son contenu est alors produit par un chargeur au premier accès, et
+    oublié à nouveau tant qu'il n'a pas été modifié.
+    """
+
+    def __init__(self, items=()):
+        items = list(items)
+        self._chunks = [_Chunk(items[i:i + CHUNK_SIZE]) for i in range(0, len(items), CHUNK_SIZE)]
+        self._loaded = OrderedDict()
+        self._rebuild()
+
+    def _rebuild(self):
+        """Reconstruit l'arbre de Fenwick après un changement de structure des blocs."""
+        n = len(self._chunks)
+        tree = [0] * (n + 1)
+        for i, chunk in enumerate(self._chunks, 1):
+            tree[i] += chunk.size
+            parent = i + (i & -i)
+            if parent <= n: tree[parent] += tree[i]
+        self._tree, self._len = tree, sum(c.size for c in self._chunks)
+        self._step = 1 << n.bit_length()
+
+    def _add(self, chunk_idx, delta):
+        i, n = chunk_idx + 1, len(self._chunks)
+        while i <= n:
+            self._tree[i] += delta
+            i += i & -i
+        self._len += delta
+
+    def _prefix(self, count):
+        total = 0
+        while count:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def _locate(self, index):
+        """Retourne (indice du bloc, position dans le bloc) pour un index global valide."""
+        pos, rest, step, tree = 0, index, self._step, self._tree
+        n = len(tree) - 1
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= rest: pos, rest = nxt, rest - tree[nxt]
+            step >>= 1
+        return pos, rest
+
+    def _items(self, chunk_idx):
+        """Retourne le contenu d'un bloc, en le chargeant si nécessaire."""
+        chunk = self._chunks[chunk_idx]
+        if chunk.loader is not None:
+            if chunk.items is None: chunk.items = chunk.loader()
+            self._loaded[id(chunk)] = chunk
+            self._loaded.move_to_end(id(chunk))
+            while len(self._loaded) > MAX_LOADED_CHUNKS:
+                _, evicted = self._loaded.popitem(last=False)
+                evicted.items = None
+        return chunk.items
+
+    def _detach(self, chunk):
+        """Marque un bloc comme modifié : il ne sera plus jamais oublié."""
+        if chunk.loader is not None:
+            chunk.loader = None
+            self._loaded.pop(id(chunk), None)
+
+    def _writable(self, chunk_idx):
+        """Retourne le contenu d'un bloc pour le modifier sur place, copié d'abord s'il est partagé."""
+        items = self._items(chunk_idx)
+        chunk = self._chunks[chunk_idx]
+        self._detach(chunk)
+        if chunk.shared: chunk.items, chunk.shared = list(items), False
+        return chunk.items
+
+    def __len__(self): return self._len
+
+    def snapshot(self):
+        """Fige le contenu en O(nombre de blocs) : les blocs ne sont copiés qu'à leur prochaine modification."""
+        for chunk in self._chunks: chunk.shared = True
+        return [(chunk.items, chunk.loader) for chunk in self._chunks]
+
+    def iter_chunks(self):
+        """Parcourt le contenu bloc par bloc sans garder en mémoire les blocs paresseux lus.
+
+        Le contenu est figé dès l'appel, ce qui permet de le prendre sous verrou.
+        """
+        return iter_snapshot(self.snapshot())
+
+    def __iter__(self): return chain.from_iterable(self.iter_chunks())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1: return list(self)[index]
+            if start >= stop: return []
+            ci, off = self._locate(start)
+            result, needed = [], stop - start
+            while needed > 0:
+                part = self._items(ci)[off:off + needed]
+                result.extend(part); needed -= len(part)
+                ci, off = ci + 1, 0
+            return result
+        if index < 0: index += self._len
+        if not 0 <= index < self._len: raise IndexError("index hors limites")
+        ci, off = self._locate(index)
+        return self._items(ci)[off]
+
+    def __setitem__(self, index, value):
+        ci, off = self._locate(index)
+        self._writable(ci)[off] = value
+
+    def append_lazy(self, size, loader):
+        """Ajoute en fin de liste un bloc de size éléments qui ne sera chargé qu'au premier accès."""
+        self._chunks.append(_Chunk(None, size, loader))
+        i = len(self._chunks)
+        self._tree.append(self._len + size - self._prefix(i - (i & -i)))
+        self._len += size
+        self._step = 1 << i.bit_length()
+
+    def splice(self, start, end, new_items):
+        """Remplace les éléments [start:end] par new_items et retourne les éléments retirés."""
+        new_items = list(new_items)
+        count = end - start
+        if start == self._len and self._chunks: ci, off = len(self._chunks) - 1, self._chunks[-1].size
+        elif start < self._len: ci, off = self._locate(start)
+        else: ci, off = 0, 0
+
+        if ci < len(self._chunks):
+            chunk = self._chunks[ci]
+            new_size = chunk.size - count + len(new_items)
+            # Cas courant : l'édition reste dans un seul bloc de taille raisonnable
+            if off + count <= chunk.size and 0 < new_size <= 2 * CHUNK_SIZE:
+                items = self._writable(ci)
+                old = items[off:off + count]
+                items[off:off + count] = new_items
+                chunk.size = new_size
+                if len(new_items) != count: self._add(ci, len(new_items) - count)
+                return old
+
+        # Cas général : on fusionne les blocs touchés puis on les redécoupe
+        last, remaining = ci, count - (self._chunks[ci].size - off if ci < len(self._chunks) else 0)
+        while remaining > 0:
+            last += 1
+            remaining -= self._chunks[last].size
+        merged = list(chain.from_iterable(self._items(i) for i in range(ci, min(last + 1, len(self._chunks)))))
+        for chunk in self._chunks[ci:last + 1]: self._detach(chunk)
+        old = merged[off:off + count]
+        merged[off:off + count] = new_items
+        self._chunks[ci:last + 1] = [_Chunk(merged[i:i + CHUNK_SIZE]) for i in range(0, len(merged), CHUNK_SIZE)]
+        self._rebuild()
+        return old
+
+
+class TextBuffer:
+    """Contenu d'un document, une entrée par ligne.
+
+    Toutes les modifications passent par replace(), qui prévient les écouteurs
+    enregistrés avec (début, anciennes lignes, nouvelles lignes). Un tampon ouvert
+    via mapped_file est complété en arrière-plan : `indexing` reste vrai tant que
+    toutes les lignes du fichier ne sont pas connues.
+    """
+
+    def __init__(self, lines=None):
+        self._lines = ChunkedList(lines or [""])
+        self._listeners = []
+        self.lock = threading.RLock()
+        self._grown = threading.Condition(self.lock)
+        self.indexing, self.indexed_bytes, self.total_bytes = False, 0, 0
+
+    def __len__(self): return len(self._lines)
+
+    def __iter__(self):
+        with self.lock: chunks = self._lines.iter_chunks()
+        return chain.from_iterable(chunks)
+
+    def __getitem__(self, index):
+        with self.lock: return self._lines[index]
+
+    def add_listener(self, callback): self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self.lock: self._listeners.remove(callback)
+
+    def replace(self, start, end, new_lines):
+        """Remplace les lignes [start:end] par new_lines et retourne les lignes retirées."""
+        new_lines = list(new_lines)
+        if start >= end and not new_lines: return []
+        with self.lock:
+            if not new_lines and end - start >= len(self): new_lines = [""] # Le document garde au moins une ligne
+            old_lines = self._lines.splice(start, end, new_lines)
+            # Sous le verrou : un fil de fond ne voit jamais le tampon et un écouteur désynchronisés
+            for callback in self._listeners: callback(start, old_lines, new_lines)
+        return old_lines
+
+    def append_lazy(self, count, loader, indexed_bytes):
+        """Ajoute count lignes chargées à la demande (utilisé par l'indexation en arrière-plan)."""
+        with self._grown:
+            self._lines.append_lazy(count, loader)
+            self.indexed_bytes = indexed_bytes
+            self._grown.notify_all()
+
+    def finish_indexing(self):
+        with self._grown:
+            self.indexing = False
+            self._grown.notify_all()
+
+    def wait_for_line(self, y, timeout=None):
+        """Attend que la ligne y soit indexée ; retourne False si elle n'existe pas."""
+        with self._grown:
+            self._grown.wait_for(lambda: y < len(self._lines) or not self.indexing, timeout)
+            return y < len(self._lines)
+
+    def estimated_len(self):
+        """Nombre de lignes, extrapolé à partir de la partie déjà indexée pendant l'indexation."""
+        if not self.indexing or not self.indexed_bytes: return len(self)
+        return max(len(self), int(len(self) * self.total_bytes / self.indexed_bytes))
+
+    def snapshot(self):
+        """Retourne une copie figée du document, à écrire avec write_snapshot() depuis n'importe quel fil."""
+        with self.lock: return self._lines.snapshot()
+
+    def write_to(self, path, file_format):
+        """Écrit le document via un fichier temporaire renommé sur path."""
+        write_snapshot(path, self.snapshot(), file_format)
+
+    def set_line(self, y, text):
+        if self[y] != text: self.replace(y, y + 1, [text])
+
+    def insert_lines(self, y, lines): self.replace(y, y, lines)
+
+    def delete_lines(self, start, end): return self.replace(start, end, [])
+
+    def insert_text(self, y, x, text):
+        """Insère text (éventuellement sur plusieurs lignes) en (y, x) et retourne la position de fin."""
+        line = self[y]
+        parts = text.split('\n')
+        end_x = len(parts[-1]) if len(parts) > 1 else x + len(text)
+        parts[0] = line[:x] + parts[0]
+        parts[-1] += line[x:]
+        self.replace(y, y + 1, parts)
+        return y + len(parts) - 1, end_x
+
+    def get_range(self, start_y, start_x, end_y, end_x):
+        """Retourne le texte entre deux positions, sous forme de liste de lignes."""
+        if start_y == end_y: return [self[start_y][start_x:end_x]]
+        lines = self[start_y:end_y + 1]
+        lines[0], lines[-1] = lines[0][start_x:], lines[-1][:end_x]
+        return lines
+
+    def delete_range(self, start_y, start_x, end_y, end_x):
+        """Supprime le texte entre deux positions et retourne les lignes supprimées."""
+        removed = self.get_range(start_y, start_x, end_y, end_x)
+        self.replace(start_y, end_y + 1, [self[start_y][:start_x] + self[end_y][end_x:]])
+        return removed
+
+    def split_line(self, y, x): return self.insert_text(y, x, '\n')
+
+    def join_lines(self, y, separator=""):
+        """Fusionne la ligne y avec la suivante."""
+        self.replace(y, y + 2, [self[y] + separator + self[y + 1]])
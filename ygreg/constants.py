@@ -3,6 +3,16 @@
 import os
 
 CONFIG_FILE = os.path.expanduser("~/.ygreg_cli_config.json")
+CACHE_DIR = os.path.expanduser("~/.cache/ygreg") # Index des fichiers de projet, pour un démarrage à chaud
+
+# Au-delà de cette taille, un fichier est ouvert via mmap et indexé en arrière-plan
+LAZY_LOAD_THRESHOLD = 16 * 1024 * 1024
+LINE_OVERHEAD = 56 # Octets d'un objet str Python vide : coût d'une ligne en mémoire en plus de son texte
+INDEX_BLOCK_SIZE = 64 * 1024
+
+# Attente maximale d'une touche (ms) quand un travail de fond peut changer l'affichage
+BACKGROUND_POLL_MS = 30
+FOLLOW_POLL_MS = 250 # Intervalle entre deux vérifications d'un fichier suivi (tail -f)
 
 LOREM_IPSUM = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat. Duis aute irure dolor in reprehenderit in voluptate velit esse cillum dolore eu fugiat nulla pariatur. Excepteur sint occaecat cupidatat non proident, sunt in culpa qui officia deserunt mollit anim id est laborum."
 
@@ -23,7 +33,7 @@ CSS_PROPERTIES = {
     "margin", "padding", "border", "display", "position", "top", "left",
     "right", "bottom", "flex", "grid", "align-items", "justify-content"
 }
-OPERATORS = r"[(){}[]=,.:;+\-*/%&|<>^@!]"
+OPERATORS = r"[(){}\[\]=,.:;+\-*/%&|<>^@!~]"
 
 FILE_ICON_MAP = {
     ".py": ("🐍", 9), ".js": ("🟨", 9), ".html": ("🌐", 9), ".css": ("🎨", 9), ".json": ("🗃️", 9),
@@ -39,15 +49,18 @@ FILE_ICON_MAP = {
 
 GROUPED_COMMANDS = [
     ("Fichier", [
-        ('s', "Sauvegarder"), ('q', "Quitter"), ('h', "Aide"), ('p', "Paramètres")
+        ('s', "Sauvegarder"), ('e', "Ouvrir un fichier"), ('l', "Liste des fichiers ouverts"), ('q', "Quitter"), ('h', "Aide"), ('p', "Paramètres"), ('a', "Suivre le fichier")
     ]),
     ("Recherche", [
-        ('f', "Rechercher"), ('r', "Remplacer"), ('g', "Aller à")
+        ('f', "Rechercher"), ('n', "Suivant"), ('b', "Précédent"), ('r', "Remplacer"), ('g', "Aller à")
     ]),
     ("Édition", [
-        ('d', "Dupliquer"), ('j', "Joindre"), ('o', "Ordonner"), ('t', "Tableau")
+        ('d', "Dupliquer"), ('j', "Joindre"), ('o', "Ordonner"), ('t', "Tableau"), ('u', "Annuler"), ('y', "Rétablir")
     ]),
     ("Presse-papiers", [
         ('x', "Couper"), ('c', "Copier"), ('v', "Coller")
     ]),
+    ("Vues", [
+        ('-', "Empiler une vue"), ('|', "Juxtaposer une vue"), ('w', "Suivante"), ('k', "Fermer la vue")
+    ]),
 ]
\ No newline at end of file
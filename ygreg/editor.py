@@ -7,41 +7,139 @@ import time
 import math
 import uuid
 from datetime import datetime
+from bisect import insort
+from itertools import chain
 
 from .utils import prompt_input
-from .constants import LOREM_IPSUM, GROUPED_COMMANDS
+from .constants import LOREM_IPSUM, GROUPED_COMMANDS, LAZY_LOAD_THRESHOLD, BACKGROUND_POLL_MS, FOLLOW_POLL_MS, LINE_OVERHEAD
+from .buffer import TextBuffer
+from .mapped_file import load_mapped
+from .render import View, layout, views, split, remove
+from .highlight import LineHighlighter, token_cache, ui_idle
+from .autosave import writer
+from .journal import Journal, RecoveryCancelled
+from .undo import UndoHistory
+from .search import SearchIndex, ReplaceAll, compile_pattern, is_multiline, iter_chunks, replace_matches
+from .file_index import project_index
+from .file_finder import FileFinder
+from .follow import FileFollower
+from .hex_view import HexView, is_binary, parse_hex, parse_offset
+from .text_format import FileFormat, load_text
 from . import syntax # Import du module de coloration
 
+def _view_attribute(name):
+    """Attribut de l'éditeur qui appartient en fait à la vue active."""
+    return property(lambda self: getattr(self.view, name), lambda self, value: setattr(self.view, name, value))
+
 class Editor:
+    # Position, sélection et suivi de l'affichage sont propres à chaque vue (volet) du document
+    cursor_y, cursor_x = _view_attribute("cursor_y"), _view_attribute("cursor_x")
+    top_line, left_col = _view_attribute("top_line"), _view_attribute("left_col")
+    selecting = _view_attribute("selecting")
+    selection_anchor_y, selection_anchor_x = _view_attribute("selection_anchor_y"), _view_attribute("selection_anchor_x")
+    damage, _last_frame = _view_attribute("damage"), _view_attribute("last_frame")
+    MIN_VIEW_ROWS, MIN_VIEW_WIDTH = 3, 24 # Taille minimale d'une vue issue d'une division
+
     AUTO_PAIRS = {'(': ')', '[': ']', '{': '}', '"': '"', "'": "'"}
+    SEARCH_TOGGLES = {'\x12': "regex", '\x14': "ignore_case", '\x17': "whole_word"} # Ctrl+R, Ctrl+T, Ctrl+W dans le prompt de recherche
 
     def __init__(self, stdscr, file_path, settings):
         self.stdscr = stdscr
         self.file_path = file_path
         self.settings = settings
-        self.lines = [""]
-        self.cursor_y, self.cursor_x = 0, 0
-        self.top_line, self.left_col = 0, 0
+        self.lines = TextBuffer()
+        self.view = self.layout = View() # Vue active, et disposition de toutes les vues
+        self._separators = []
         self.modified_counter = 0
         self.status_message, self.status_message_time = "", 0
-        self.search_term = ""
         self.clipboard = []
-        self.selecting = False
-        self.selection_anchor_y, self.selection_anchor_x = -1, -1
         self.read_only = False
         self.color_preview_active = False
+        self.open_request = None # Fichier choisi avec « Ouvrir un fichier » ou la liste des fichiers ouverts, à afficher à la place
+        self.workspace = None # BufferPool qui tient ce document parmi les autres fichiers ouverts
+        self._text_bytes = 0 # Taille du texte chargé en mémoire, pour l'estimation de memory_estimate()
+        self._loaded_bytes = 0 # Octets du fichier lus à l'ouverture : le suivi (tail -f) reprend de là
+        self.follower = None # FileFollower pendant le suivi du fichier
+        self.hex_view = None # HexView d'un fichier binaire, affiché en hexadécimal à la place du texte
+        self.text_format = FileFormat() # Encodage et fins de ligne du fichier, gardés à la sauvegarde
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                self.lines = [line.rstrip('\n') for line in f.readlines()]
-            if not self.lines: self.lines = [""]
-        except (IOError, UnicodeDecodeError) as e:
-            self.lines = ["", f" ERREUR: Impossible d'ouvrir le fichier : {e}", " Le fichier est en lecture seule.", ""]
-            self.read_only = True
+            size = os.path.getsize(file_path)
+            if is_binary(file_path): self.hex_view = HexView(file_path)
+            elif size >= LAZY_LOAD_THRESHOLD: self.lines, self.text_format = load_mapped(file_path) # Le texte reste dans le fichier mappé
+            else:
+                self.lines, self.text_format = load_text(file_path)
+                self._text_bytes = size
         except FileNotFoundError:
             self._set_status_message(f"Nouveau fichier : {os.path.basename(file_path)}")
+        except UnicodeDecodeError: self.hex_view = HexView(file_path) # Pas du texte UTF-8
+        except (IOError, ValueError) as e:
+            self.lines = TextBuffer(["", f" ERREUR: Impossible d'ouvrir le fichier : {e}", " Le fichier est en lecture seule.", ""])
+            self.read_only = True
+        if self.hex_view is not None:
+            self.read_only = True
+            self._set_status_message("Fichier binaire, affiché en hexadécimal")
+        self._loaded_bytes = self.lines.total_bytes # Plus que size si le fichier a grossi pendant la lecture
+        self.lines.add_listener(self.text_format.on_edit) # Avant que le journal ne rejoue des éditions
         
         self._modified_flag = False
+        self._version, self._submitted_version = 0, 0 # Version du document, et dernière confiée au fil d'écriture
+        self._last_edit_time = 0
+        self._manual_save = False
+        self._journal_marks = {} # Version confiée au fil d'écriture -> position dans le journal
+
+        self.journal = None
+        if not self.read_only and settings.get("journal"): self._open_journal()
+        self.history = UndoHistory(self.lines, lambda: (self.cursor_y, self.cursor_x), settings.get("undo_memory_mb") * 1024 * 1024)
+        self.search = SearchIndex(self.lines)
+        self.search_options = {"regex": False, "ignore_case": False, "whole_word": False}
+        self.lines.add_listener(self.view.damage.on_edit)
+
+        self.highlighter = None
+        self.apply_settings()
+
+    def _open_journal(self):
+        try: self.journal = Journal(self.file_path, self.lines, self._wait_for_line) # Rejoue le journal d'une session interrompue
+        except RecoveryCancelled: # Sauvegarder rendrait le journal caduc : il sera rejoué à la prochaine ouverture
+            self.read_only = True
+            self._set_status_message("Récupération annulée : journal gardé, document en lecture seule")
+        except OSError as e: self._set_status_message(f"Journal de récupération indisponible : {e}")
+        else:
+            if self.journal.recovered:
+                self._modified_flag = True
+                self._set_status_message(f"{self.journal.recovered} modification(s) récupérée(s) depuis le journal")
+
+    def apply_settings(self):
+        """Prend en compte les réglages, à la création puis au retour de l'écran des paramètres : l'éditeur y survit."""
+        token_cache.resize(self.settings.get("token_cache_size"))
+        self.history.resize(self.settings.get("undo_memory_mb") * 1024 * 1024)
+        highlight = (not self.read_only or self.follower is not None) and self.settings.get("show_syntax_highlighting")
+        if highlight and self.highlighter is None:
+            lexer = syntax.get_highlighter(self.file_path, self.lines[0]) # Le module du langage est importé ici, à la demande
+            if lexer:
+                self.highlighter = LineHighlighter(self.lines, lexer)
+                self.highlighter.on_change = self._on_highlight_change
+        elif not highlight and self.highlighter is not None:
+            self.lines.remove_listener(self.highlighter._on_edit) # Son fil s'arrête avec lui
+            self.highlighter = None
+        journal = not self.read_only and self.settings.get("journal")
+        if not journal and self.journal is not None:
+            self.journal.close(delete=True)
+            self.journal, self._journal_marks = None, {}
+        # Un journal ouvert en cours de route ne connaîtrait pas les éditions déjà faites : seulement sur un document sauvegardé
+        elif journal and self.journal is None and not self.modified and not writer.busy(self.file_path): self._open_journal()
+
+    def memory_estimate(self):
+        """Mémoire occupée par le document, estimée sans le parcourir : texte lu, objets ligne et historique d'annulation."""
+        return self._text_bytes + len(self.lines) * LINE_OVERHEAD + self.history.size
+
+    def close(self):
+        """Libère le document, sauvegardé ou abandonné : son journal n'a plus de raison d'être."""
+        if self.journal: self.journal.close(delete=True)
+        self.journal = None
+        if self.highlighter: self.lines.remove_listener(self.highlighter._on_edit)
+        self.highlighter = None
+        if self.hex_view: self.hex_view.close()
 
     @property
     def modified(self): return self._modified_flag
@@ -51,29 +149,68 @@ class Editor:
         if self.read_only: self._modified_flag = False; return
         self._modified_flag = value
         if value:
+            self._version += 1
+            self._last_edit_time = time.time()
             self.modified_counter += 1
             threshold = self.settings.get("autosave_threshold")
-            if threshold > 0 and self.modified_counter >= threshold:
-                if self._save_file(autosave=True):
-                    self._set_status_message("Sauvegarde automatique")
-                    self.modified_counter = 0
+            if threshold > 0 and self.modified_counter >= threshold: self._save_file(autosave=True)
         else: self.modified_counter = 0
 
+    def _on_highlight_change(self, start, end):
+        for view in views(self.layout):
+            if end is None: view.damage.mark_from(start)
+            else: view.damage.mark_lines(start, end)
+
+    def _invalidate_views(self):
+        for view in views(self.layout): view.damage.invalidate()
+
+    def _arrange(self):
+        """Place les vues dans la zone de texte de l'écran."""
+        height, width = self._get_screen_size()
+        self._separators = layout(self.layout, 1, 0, height - 2, width)
+
+    def _split_view(self, orientation):
+        """Partage la vue active en deux ('h' : l'une sous l'autre, 'v' : côte à côte) ; la nouvelle devient active."""
+        self._arrange()
+        _, _, rows, width = self.view.rect
+        if (rows < 2 * self.MIN_VIEW_ROWS + 1) if orientation == 'h' else (width < 2 * self.MIN_VIEW_WIDTH):
+            self._set_status_message("Pas assez de place pour une nouvelle vue"); return
+        view = View(self.view)
+        self.lines.add_listener(view.damage.on_edit)
+        self.layout, self.view = split(self.layout, self.view, orientation, view), view # Les vues déplacées seront repeintes
+
+    def _close_view(self):
+        if self.layout is self.view: self._set_status_message("C'est la seule vue"); return
+        self.lines.remove_listener(self.view.damage.on_edit)
+        all_views = views(self.layout)
+        index = all_views.index(self.view)
+        self.layout = remove(self.layout, self.view)
+        self.view = views(self.layout)[max(0, index - 1)]
+
+    def _next_view(self):
+        all_views = views(self.layout)
+        self.view = all_views[(all_views.index(self.view) + 1) % len(all_views)]
+
     def _set_status_message(self, msg):
         self.status_message, self.status_message_time = msg, time.time()
 
     def _get_screen_size(self): return self.stdscr.getmaxyx()
 
+    def _line_number_width(self): return len(str(self.lines.estimated_len())) + 2
+
     def _draw_ui(self):
         height, width = self._get_screen_size()
         self.stdscr.attron(curses.color_pair(3)); self.stdscr.box(); self.stdscr.attroff(curses.color_pair(3))
         
         time_str = datetime.now().strftime('%H:%M:%S')
-        title_extra = " [LECTURE SEULE]" if self.read_only else ""
+        title_extra = " [HEXA]" if self.hex_view else " [SUIVI]" if self.follower else " [LECTURE SEULE]" if self.read_only else ""
         title = f" YGREG - {os.path.basename(self.file_path)}{title_extra} "
         
         full_title = f"{time_str} {title}"
-        if len(full_title) < width: self.stdscr.addstr(0, (width - len(title)) // 2 - len(time_str), full_title, curses.A_BOLD)
+        if self.workspace and len(self.workspace.paths) > 1: # Plusieurs fichiers ouverts : leurs onglets à la place du titre
+            tabs = self.workspace.tabs(self.file_path, width - 23 - len(time_str) - len(title_extra))
+            self.stdscr.addstr(0, 20, f"{time_str} {tabs}{title_extra}", curses.A_BOLD)
+        elif len(full_title) < width: self.stdscr.addstr(0, (width - len(title)) // 2 - len(time_str), full_title, curses.A_BOLD)
         else: self.stdscr.addstr(0, 2, title[:width-4], curses.A_BOLD)
 
         status_bar_pair = 17 if self.color_preview_active else 2
@@ -86,7 +223,14 @@ class Editor:
             self.status_message = ""
             modified_char = '[+]' if self.modified else ''
             status_text = f" {len(self.lines)} Lignes {modified_char}"
+            if self.hex_view is not None:
+                status_text = f" {self.hex_view.size} octets | g: Aller à, f: Chercher (hexa), n/b: Suivant/Précédent, q: Fermer"
+            if self.lines.indexing:
+                status_text += f" (indexation {self.lines.indexed_bytes * 100 // max(1, self.lines.total_bytes)}%)"
+            if self.text_format.label(): status_text += f" | {self.text_format.label()}"
+            if self.search.term: status_text += f" | '{self.search.term}' {self._search_counter()}"
             pos_text = f"L:{self.cursor_y + 1}, C:{self.cursor_x + 1} "
+            if self.hex_view is not None: pos_text = f"0x{self.hex_view.cursor:x} ({self.hex_view.cursor}) "
             
             self.stdscr.attron(curses.color_pair(status_bar_pair))
             status_bar_content = status_text.ljust(width - len(pos_text) - 2) + pos_text
@@ -141,83 +285,173 @@ class Editor:
                 return
         self.color_preview_active = False
         
-    def _draw_lines(self):
-        height, width = self._get_screen_size()
-        editor_height = height - 2
-        self.line_num_width_ref = len(str(len(self.lines))) + 2
-        for y_idx in range(editor_height):
+    def _draw_lines(self, rows=None):
+        """Dessine les lignes rows (toutes si None, sur un écran effacé) de la vue active."""
+        y0, x0, view_rows, view_width = self.view.rect
+        line_number_width = self._line_number_width()
+        self.line_num_width_ref = x0 + line_number_width # Colonne de l'écran où commence le texte
+        self._content_width = view_width - line_number_width - 2
+        for y_idx in (range(view_rows) if rows is None else rows):
             file_line_idx = self.top_line + y_idx
-            if file_line_idx >= len(self.lines): break
-            line_num_str = str(file_line_idx + 1).rjust(self.line_num_width_ref - 2) + " "
-            self.stdscr.addstr(y_idx + 1, 1, line_num_str, curses.color_pair(3) | curses.A_DIM)
-            self._draw_highlighted_line(y_idx + 1, self.line_num_width_ref, file_line_idx, self.lines[file_line_idx])
+            if rows is not None: self.stdscr.addstr(y0 + y_idx, x0 + 1, " " * (view_width - 3))
+            if file_line_idx >= len(self.lines): continue
+            line_num_str = str(file_line_idx + 1).rjust(line_number_width - 2) + " "
+            self.stdscr.addstr(y0 + y_idx, x0 + 1, line_num_str, curses.color_pair(3) | curses.A_DIM)
+            self._draw_highlighted_line(y0 + y_idx, self.line_num_width_ref, file_line_idx, self.lines[file_line_idx])
         self._draw_scrollbar()
 
-    def _render_token(self, y, line_idx, token_text, color_attr, token_start_col_abs):
+    def _render(self):
+        """Redessine l'écran : chaque vue ne repeint que ses lignes abîmées depuis son image précédente."""
+        self._arrange()
+        all_views, active = views(self.layout), self.view
+        if self.highlighter: # La vue active d'abord
+            self.highlighter.set_viewports((view.top_line, view.top_line + view.rect[2]) for view in sorted(all_views, key=lambda v: v is not active))
+        for view in all_views:
+            if view.last_frame is None or view.last_frame["geometry"] != self._geometry(view): view.damage.invalidate()
+        erase = all(view.damage.full for view in all_views)
+        if erase: self.stdscr.erase()
+        self._draw_ui()
+        try:
+            for view in all_views:
+                self.view = view
+                self._render_view(erase, view is active)
+        finally: self.view = active
+        attr = curses.color_pair(3)
+        for orientation, line, col, length in self._separators:
+            if orientation == 'h': self.stdscr.hline(line, col + 1, curses.ACS_HLINE | attr, length - 2)
+            else: self.stdscr.vline(line, col, curses.ACS_VLINE | attr, length)
+
+    def _geometry(self, view): return (self._get_screen_size(), view.rect, self._line_number_width(), view.left_col)
+
+    def _render_view(self, erased, focused):
+        """Repeint self.view ; erased : l'écran vient d'être effacé, focused : c'est la vue où l'on tape (sinon son curseur est immobile)."""
         height, width = self._get_screen_size()
-        content_width = width - self.line_num_width_ref - 2
-        overlap_start = max(token_start_col_abs, self.left_col)
-        overlap_end = min(token_start_col_abs + len(token_text), self.left_col + content_width)
-        if overlap_start >= overlap_end: return
-        text_to_draw = token_text[overlap_start - token_start_col_abs : overlap_end - token_start_col_abs]
-        screen_x = self.line_num_width_ref + (overlap_start - self.left_col)
-        for i, char in enumerate(text_to_draw):
-            char_abs_x = overlap_start + i
-            selection_attr = curses.A_REVERSE if self._is_selected(line_idx, char_abs_x) else curses.A_NORMAL
-            try: self.stdscr.addstr(y, screen_x + i, char, color_attr | selection_attr)
-            except curses.error: pass
+        y0, x0, editor_height, view_width = self.view.rect
+        if editor_height < 1: return
+        damage = self.damage
+        selection = self._get_selection_bounds() if self.selecting else None
+        geometry = self._geometry(self.view)
+        last = self._last_frame
+        if last is None or last["geometry"] != geometry: damage.invalidate()
+        else:
+            if len(self.lines) > last["line_count"]: damage.mark_from(last["line_count"]) # Lignes indexées entre-temps
+            if focused:
+                damage.mark_lines(last["cursor_y"], last["cursor_y"] + 1)
+                damage.mark_lines(self.cursor_y, self.cursor_y + 1)
+            old_selection = last["selection"]
+            if selection != old_selection:
+                if selection is None or old_selection is None:
+                    for start, end in filter(None, (selection, old_selection)): damage.mark_lines(start[0], end[0] + 1)
+                else: # Seules les lignes entre les anciennes et nouvelles bornes changent d'aspect
+                    for old, new in zip(old_selection, selection): damage.mark_lines(min(old[0], new[0]), max(old[0], new[0]) + 1)
 
-    def _is_selected(self, y, x):
-        if not self.selecting: return False
-        (start_y, start_x), (end_y, end_x) = self._get_selection_bounds()
-        return start_y <= y <= end_y and not (y == start_y and x < start_x) and not (y == end_y and x >= end_x)
+        exposed = []
+        delta = self.top_line - (last["top_line"] if last else self.top_line)
+        if delta and not damage.full:
+            if abs(delta) >= editor_height or view_width != width: damage.invalidate() # Une vue côte à côte ne peut pas défiler seule
+            else:
+                # Décale le contenu déjà affiché et ne dessine que les lignes découvertes
+                self.stdscr.setscrreg(y0, y0 + editor_height - 1)
+                self.stdscr.scrollok(True); self.stdscr.scroll(delta); self.stdscr.scrollok(False)
+                self.stdscr.setscrreg(0, height - 1)
+                exposed = range(editor_height - delta, editor_height) if delta > 0 else range(-delta)
+
+        self._frame_selection = selection
+        # Les occurrences visibles changent avec la recherche, son analyse ou une édition multiligne : on repeint les lignes concernées
+        spans = self.search.visible_spans(self.top_line, self.top_line + editor_height) if self.search.term else {}
+        current = self.search.current if self.search.current == (self.cursor_y, self.cursor_x) else None
+        if last is not None:
+            changed_current = {current, last["current"]} if current != last["current"] else ()
+            for line_idx in set(spans).union(last["spans"]):
+                old_spans, new_spans = last["spans"].get(line_idx, ()), spans.get(line_idx, ())
+                if new_spans != old_spans or any(span[2] in changed_current for span in chain(old_spans, new_spans)):
+                    damage.mark_lines(line_idx, line_idx + 1)
+        self._frame_spans, self._frame_current = spans, current
+        if damage.full: rows = None if erased else range(editor_height)
+        else:
+            rows = sorted(set(exposed).union(r for r in range(editor_height) if damage.is_dirty(self.top_line + r)))
+        self._draw_lines(rows)
+        damage.clear()
+        self._last_frame = {"geometry": geometry, "top_line": self.top_line, "cursor_y": self.cursor_y,
+                            "selection": selection, "line_count": len(self.lines), "spans": spans, "current": current}
+
+    def _render_token(self, y, token_text, color_attr, token_start_col_abs, marks):
+        """Dessine la partie visible d'un token, découpée aux bords des zones marquées (sélection, occurrences)."""
+        start = max(token_start_col_abs, self.left_col)
+        end = min(token_start_col_abs + len(token_text), self.left_col + self._content_width)
+        for mark_start, mark_end, mark_attr in marks:
+            if mark_end <= start: continue
+            if mark_start >= end: break
+            if mark_start > start: self._put_text(y, token_text, token_start_col_abs, start, mark_start, color_attr)
+            start, mark_end = max(start, mark_start), min(mark_end, end)
+            self._put_text(y, token_text, token_start_col_abs, start, mark_end, color_attr | mark_attr)
+            start = mark_end
+        if start < end: self._put_text(y, token_text, token_start_col_abs, start, end, color_attr)
+
+    def _put_text(self, y, token_text, token_start_col_abs, start, end, attr):
+        try: self.stdscr.addstr(y, self.line_num_width_ref + start - self.left_col, token_text[start - token_start_col_abs:end - token_start_col_abs], attr)
+        except curses.error: pass
+
+    def _selected_columns(self, line_idx):
+        """Colonnes [début, fin) sélectionnées sur une ligne, d'après les bornes calculées pour l'image."""
+        if not self._frame_selection: return None
+        (start_y, start_x), (end_y, end_x) = self._frame_selection
+        if not start_y <= line_idx <= end_y: return None
+        return (start_x if line_idx == start_y else 0, end_x if line_idx == end_y else float('inf'))
+
+    def _line_marks(self, line_idx):
+        """Zones de la ligne à mettre en valeur, triées et disjointes : occurrences de la recherche, puis la sélection par-dessus."""
+        marks = []
+        for start, end, origin in self._frame_spans.get(line_idx, ()):
+            marks.append((start, end, curses.A_REVERSE if origin == self._frame_current else curses.A_BOLD | curses.A_UNDERLINE))
+        selected = self._selected_columns(line_idx)
+        if selected:
+            marks = [mark for mark in marks if mark[1] <= selected[0] or mark[0] >= selected[1]]
+            insort(marks, (selected[0], selected[1], curses.A_REVERSE))
+        return marks
     
     def _draw_scrollbar(self):
-        height, width = self._get_screen_size()
-        editor_height = height - 2
-        if len(self.lines) > editor_height:
-            thumb_size = max(1, int(editor_height * editor_height / len(self.lines)))
-            thumb_pos = int(self.top_line / (len(self.lines) - editor_height) * (editor_height - thumb_size)) if len(self.lines) > editor_height else 0
+        y0, x0, editor_height, view_width = self.view.rect
+        total_lines = self.lines.estimated_len()
+        if total_lines > editor_height:
+            thumb_size = max(1, int(editor_height * editor_height / total_lines))
+            thumb_pos = min(editor_height - thumb_size, int(self.top_line / (total_lines - editor_height) * (editor_height - thumb_size)))
             for i in range(editor_height):
                 char = "█" if thumb_pos <= i < thumb_pos + thumb_size else "░"
                 attr = curses.color_pair(3) | (curses.A_NORMAL if thumb_pos <= i < thumb_pos + thumb_size else curses.A_DIM)
-                self.stdscr.addstr(i + 1, width - 2, char, attr)
+                self.stdscr.addstr(y0 + i, x0 + view_width - 2, char, attr)
                 
     def _draw_highlighted_line(self, y, x_offset, line_idx, line):
-        ext = os.path.splitext(self.file_path)[1].lower() if not self.read_only else ""
-        highlighter = None
-        if self.settings.get("show_syntax_highlighting"):
-            if ext == '.py': highlighter = syntax.highlight_python
-            elif ext == '.js': highlighter = syntax.highlight_js
-            elif ext == '.html': highlighter = syntax.highlight_html
-            elif ext == '.css': highlighter = syntax.highlight_css
-            elif ext == '.json': highlighter = syntax.highlight_json
-        
-        if highlighter:
-            tokens = highlighter(line)
+        marks = self._line_marks(line_idx)
+        tokens = self.highlighter.tokens(line_idx) if self.highlighter else None
+        if tokens is not None:
             current_col = 0
             for token_text, color_pair_num, attr in tokens:
                 color = curses.color_pair(color_pair_num) | attr
-                self._render_token(y, line_idx, token_text, color, current_col)
+                self._render_token(y, token_text, color, current_col, marks)
                 current_col += len(token_text)
-        else:
-            self._render_token(y, line_idx, line, curses.color_pair(0), 0)
+        else: # Pas de coloration, ou ligne pas encore colorée par le fil de fond
+            self._render_token(y, line, curses.color_pair(0), 0, marks)
 
     def _scroll(self):
-        height, width = self._get_screen_size()
-        editor_height = height - 2
-        line_number_width = len(str(len(self.lines))) + 2
-        content_width = width - line_number_width - 2
+        self._arrange()
+        _, _, editor_height, view_width = self.view.rect
+        line_number_width = self._line_number_width()
+        content_width = view_width - line_number_width - 2
         if self.cursor_y < self.top_line: self.top_line = self.cursor_y
         if self.cursor_y >= self.top_line + editor_height: self.top_line = self.cursor_y - editor_height + 1
         if self.cursor_x < self.left_col: self.left_col = self.cursor_x
         if self.cursor_x >= self.left_col + content_width: self.left_col = self.cursor_x - content_width + 1
 
     def run(self):
+        if self.hex_view is not None: return self._run_hex()
+        ui_idle.clear()
+        self._invalidate_views()
+        self.stdscr.idlok(True) # Autorise curses à utiliser les séquences de défilement du terminal
         while True:
             height, width = self._get_screen_size()
             if height < 5 or width < 20:
-                self.stdscr.erase()
+                self.stdscr.erase(); self._invalidate_views()
                 self.stdscr.addstr(0, 0, "Terminal trop petit. Redimensionnez.")
                 self.stdscr.refresh()
                 try:
@@ -227,22 +461,99 @@ class Editor:
                 continue
 
             self._update_color_preview()
+            self._follow_file()
+            self._check_invalid_bytes()
+            if self.highlighter: self.highlighter.flush_changes()
+            if not self.search.complete: self.search.build() # Après une édition multiligne ou pendant l'indexation
             try:
-                self.stdscr.erase()
                 self._scroll()
-                self._draw_ui(); self._draw_lines()
-                line_number_width = len(str(len(self.lines))) + 2
-                self.stdscr.move(self.cursor_y - self.top_line + 1, self.cursor_x - self.left_col + line_number_width)
+                self._render()
+                y0, x0, _, _ = self.view.rect
+                self.stdscr.move(y0 + self.cursor_y - self.top_line, x0 + self.cursor_x - self.left_col + self._line_number_width())
                 curses.curs_set(1)
                 self.stdscr.refresh()
             except curses.error: pass
 
             action = self._handle_input()
-            if action in ["quit", "settings", "help"]:
-                if action == "quit" and self.modified:
-                    if prompt_input(self.stdscr, "Quitter sans sauvegarder? (o/n) ").lower() != 'o': continue
+            self._autosave_if_idle()
+            self._check_save_result()
+            if action == "quit":
+                writer.wait(self.file_path) # Une sauvegarde en cours doit aboutir avant de quitter
+                self._check_save_result()
+                if self.modified and prompt_input(self.stdscr, "Quitter sans sauvegarder? (o/n) ").lower() != 'o': continue
+            if action in ["quit", "open", "explorer", "settings", "help"]:
+                # Sauf en quittant, l'éditeur est gardé tel quel (tampon, curseur, historique) : run() reprendra
+                ui_idle.set()
                 return action
 
+    def _run_hex(self):
+        """Boucle de la vue hexadécimale : navigation, aller à un décalage, recherche d'un motif d'octets."""
+        view = self.hex_view
+        while True:
+            height, width = self._get_screen_size()
+            rows = max(1, height - 2)
+            try:
+                curses.curs_set(0)
+                self.stdscr.erase()
+                self._draw_ui()
+                view.draw(self.stdscr, 1, rows, width)
+                self.stdscr.refresh()
+            except curses.error: pass
+            ui_idle.set()
+            try: key = self.stdscr.get_wch()
+            except curses.error: continue
+            except KeyboardInterrupt: key = 'q'
+            finally: ui_idle.clear()
+            action = None
+            if isinstance(key, int) and view.move(key, rows, view.row_bytes(width)): continue
+            elif key == 'g':
+                offset = parse_offset(prompt_input(self.stdscr, "Aller au décalage (décimal, 0x..., +n, -n): "), view.cursor)
+                if offset is None: self._set_status_message("Décalage invalide")
+                else: view.goto(offset)
+            elif key in ('f', '/'):
+                pattern = parse_hex(prompt_input(self.stdscr, "Motif hexadécimal (ex. 7f 45 4c 46): "))
+                if pattern is None: self._set_status_message("Motif invalide : des paires de chiffres hexadécimaux")
+                else: view.pattern = pattern; self._hex_find(view.cursor)
+            elif key in ('n', curses.KEY_F3): self._hex_find(view.cursor + 1)
+            elif key in ('b', curses.KEY_F15): self._hex_find(view.cursor, backward=True)
+            elif key == 'e': action = self._open_file()
+            elif key == 'l': action = self._switch_file()
+            elif key in (curses.KEY_F6, curses.KEY_F18) and self.workspace and len(self.workspace.paths) > 1:
+                self.open_request = self.workspace.neighbour(self.file_path, 1 if key == curses.KEY_F6 else -1)
+                action = "open"
+            elif key == 'q': action = "quit"
+            elif key == 'h': action = "help"
+            elif key == 'p': action = "settings"
+            if action:
+                ui_idle.set()
+                return action
+
+    def _hex_find(self, start, backward=False):
+        """Cherche le dernier motif de la vue hexadécimale et y place le curseur."""
+        view = self.hex_view
+        if view.pattern is None: self._set_status_message("Aucun motif (f pour chercher)"); return
+        found = view.find(view.pattern, start, backward, self._hex_search_progress)
+        if found is None: # L'occurrence précédente, peut-être d'un autre motif, n'est plus mise en valeur
+            view.match = None
+            self._set_status_message("Motif introuvable"); return
+        view.cursor, view.match = found, found
+
+    def _hex_search_progress(self, fraction):
+        """Affiche l'avancement d'une recherche dans un gros fichier ; retourne False si Échap a été pressée."""
+        return self._show_progress(f"Recherche... {fraction:.0%}")
+
+    def _show_progress(self, message):
+        """Affiche message dans la barre d'état pendant une longue attente ; retourne False si Échap a été pressée."""
+        height, width = self._get_screen_size()
+        try:
+            self.stdscr.addstr(height - 1, 1, f"{message} (Échap : annuler)".ljust(width - 2), curses.color_pair(1))
+            self.stdscr.refresh()
+        except curses.error: pass
+        self.stdscr.timeout(0)
+        try: return self.stdscr.get_wch() != '\x1b'
+        except curses.error: return True
+        finally: self.stdscr.timeout(-1)
+
     def _get_selection_bounds(self):
         return min((self.selection_anchor_y, self.selection_anchor_x), (self.cursor_y, self.cursor_x)), \
                max((self.selection_anchor_y, self.selection_anchor_x), (self.cursor_y, self.cursor_x))
@@ -286,7 +597,7 @@ class Editor:
             end_pos = last_match.end()
 
             # Construit la nouvelle ligne
-            self.lines[self.cursor_y] = line[:start_pos] + replacement + line[end_pos:]
+            self.lines.set_line(self.cursor_y, line[:start_pos] + replacement + line[end_pos:])
 
             # Met à jour la position du curseur
             self.cursor_x = start_pos + (cursor_offset if cursor_offset is not None else len(replacement))
@@ -308,7 +619,7 @@ class Editor:
             safe_env = {k: v for k, v in math.__dict__.items() if not k.startswith('_')}
             result = eval(expression, {"__builtins__": {}}, safe_env)
             result_str = str(int(result) if isinstance(result, float) and result.is_integer() else f"{result:.4f}")
-            self.lines[self.cursor_y] += f" {result_str}"
+            self.lines.set_line(self.cursor_y, f"{line_content} {result_str}")
             self.cursor_x = len(self.lines[self.cursor_y])
             self.modified = True
             return True # Success
@@ -318,18 +629,16 @@ class Editor:
 
     def _duplicate_line_or_selection(self):
         if self.selecting:
-            (start_y, _), (end_y, end_x) = self._get_selection_bounds()
-            to_duplicate = self._get_selection_text()
-            last_line_part = self.lines[end_y][end_x:]
-            self.lines[end_y] = self.lines[end_y][:end_x] + "".join(to_duplicate) + last_line_part
+            _, (end_y, end_x) = self._get_selection_bounds()
+            self.lines.insert_text(end_y, end_x, "\n".join(self._get_selection_text()))
         else:
-            self.lines.insert(self.cursor_y + 1, self.lines[self.cursor_y])
+            self.lines.insert_lines(self.cursor_y + 1, [self.lines[self.cursor_y]])
         self.modified = True; self._set_status_message("Dupliqué")
 
     def _join_lines(self):
         if self.cursor_y < len(self.lines) - 1:
-            next_line = self.lines.pop(self.cursor_y + 1).lstrip()
-            self.lines[self.cursor_y] = self.lines[self.cursor_y].rstrip() + " " + next_line
+            joined = self.lines[self.cursor_y].rstrip() + " " + self.lines[self.cursor_y + 1].lstrip()
+            self.lines.replace(self.cursor_y, self.cursor_y + 2, [joined])
             self.modified = True
 
     def _sort_lines(self):
@@ -339,11 +648,11 @@ class Editor:
         if choice == 'a':
             words = self.lines[self.cursor_y].split()
             words.sort(key=str.lower)
-            self.lines[self.cursor_y] = " ".join(words)
+            self.lines.set_line(self.cursor_y, " ".join(words))
             self.modified = True
             self._set_status_message("Ligne actuelle ordonnée")
         elif choice == 't':
-            self.lines.sort(key=str.lower)
+            self.lines.replace(0, len(self.lines), sorted(self.lines, key=str.lower))
             self.modified = True
             self._set_status_message("Document ordonné")
         elif choice == 'l':
@@ -353,9 +662,7 @@ class Editor:
                 start = int(start_str) - 1
                 end = int(end_str)
                 if 0 <= start < end <= len(self.lines):
-                    lines_to_sort = self.lines[start:end]
-                    lines_to_sort.sort(key=str.lower)
-                    self.lines[start:end] = lines_to_sort
+                    self.lines.replace(start, end, sorted(self.lines[start:end], key=str.lower))
                     self.modified = True
                     self._set_status_message(f"Lignes {start+1} à {end} ordonnées")
                 else:
@@ -375,11 +682,34 @@ class Editor:
         table = [sep]
         for i in range(rows): table.extend([content_row, sep])
         
-        self.lines[self.cursor_y+1:self.cursor_y+1] = table; self.modified = True
+        self.lines.insert_lines(self.cursor_y + 1, table); self.modified = True
+
+    def _background_pending(self):
+        """Vrai si un travail de fond (indexation, coloration, recherche, sauvegarde) doit encore mettre l'écran à jour."""
+        if self.lines.indexing or writer.busy(self.file_path) or writer.has_result(self.file_path): return True
+        if self.follower is not None and self.follower.behind: return True
+        if not self.search.complete: return True
+        return self.highlighter is not None and self.highlighter.pending()
+
+    def _input_timeout(self):
+        """Attente maximale d'une touche en ms (-1 : indéfinie)."""
+        timeout = BACKGROUND_POLL_MS if self._background_pending() else -1
+        idle = self.settings.get("autosave_idle")
+        if idle > 0 and self.modified and self._version != self._submitted_version:
+            remaining = max(0, int((self._last_edit_time + idle - time.time()) * 1000))
+            timeout = remaining if timeout < 0 else min(timeout, remaining)
+        if self.follower is not None: timeout = FOLLOW_POLL_MS if timeout < 0 else min(timeout, FOLLOW_POLL_MS)
+        return timeout
 
     def _handle_input(self):
+        # Sans travail de fond, on attend la touche indéfiniment ; sinon on revient redessiner
+        self.stdscr.timeout(self._input_timeout())
+        ui_idle.set()
         try: key = self.stdscr.get_wch()
         except (curses.error, KeyboardInterrupt): return "continue"
+        finally: self.stdscr.timeout(-1); ui_idle.clear()
+        # Seules les frappes de caractères successives se regroupent en une étape d'annulation
+        if not (isinstance(key, str) and key.isprintable()): self.history.seal()
         
         is_shift_move = isinstance(key, int) and key in [curses.KEY_SLEFT, curses.KEY_SRIGHT, curses.KEY_SR, curses.KEY_SF]
         if is_shift_move and not self.selecting:
@@ -392,23 +722,20 @@ class Editor:
             if self.selecting:
                 (start_y, start_x), (end_y, end_x) = self._get_selection_bounds()
                 if start_y == end_y:
-                    line = self.lines[start_y]
-                    self.lines[start_y] = line[:start_x]
-                    self.lines.insert(start_y + 1, line[start_x:])
+                    self.lines.split_line(start_y, start_x)
                     self.cursor_y += 1; self.cursor_x = 0
                     self.modified = True; self.selecting = False
                     return "continue"
-            line = self.lines[self.cursor_y]
-            self.lines.insert(self.cursor_y + 1, line[self.cursor_x:])
-            self.lines[self.cursor_y] = line[:self.cursor_x]
+            self.lines.split_line(self.cursor_y, self.cursor_x)
             self.cursor_y += 1; self.cursor_x = 0; self.modified = True
 
         elif key == '\t': # Touche Tab
-            if self.selecting:
+            if self.read_only: return self._handle_command_mode()
+            elif self.selecting:
                 self._indent_selection()
             elif self.cursor_x == 0:
                 tab_str = ' ' * self.settings.get("tab_size")
-                self.lines[self.cursor_y] = tab_str + self.lines[self.cursor_y]
+                self.lines.insert_text(self.cursor_y, 0, tab_str)
                 self.cursor_x += len(tab_str)
                 self.modified = True
             elif self._handle_auto_expansion() or self._calculate_line():
@@ -419,6 +746,15 @@ class Editor:
         elif key == curses.KEY_BTAB: # Shift+Tab
             if self.selecting: self._unindent_selection()
 
+        elif key == curses.KEY_F3: self._find_next()
+        elif key == curses.KEY_F15: self._find_next(backward=True) # Shift+F3
+        elif key in (curses.KEY_F6, curses.KEY_F18) and self.workspace and len(self.workspace.paths) > 1: # F6, Shift+F6 : onglet suivant, précédent
+            self.open_request = self.workspace.neighbour(self.file_path, 1 if key == curses.KEY_F6 else -1)
+            return "open"
+
+        elif key == '\x1b': # Échap : retire la mise en valeur de la recherche
+            if self.search.term: self.search.set_term("")
+
         elif isinstance(key, int):
             if key == curses.KEY_UP or key == curses.KEY_SR: self.cursor_y = max(0, self.cursor_y - 1)
             elif key == curses.KEY_DOWN or key == curses.KEY_SF: self.cursor_y = min(len(self.lines) - 1, self.cursor_y + 1)
@@ -428,11 +764,11 @@ class Editor:
                 if self.read_only: return "continue"
                 if self.selecting: self._delete_selection(); self.selecting = False
                 elif self.cursor_x > 0:
-                    self.lines[self.cursor_y] = self.lines[self.cursor_y][:self.cursor_x-1] + self.lines[self.cursor_y][self.cursor_x:]
+                    self.lines.delete_range(self.cursor_y, self.cursor_x - 1, self.cursor_y, self.cursor_x)
                     self.cursor_x -= 1; self.modified = True
                 elif self.cursor_y > 0:
                     prev_len = len(self.lines[self.cursor_y - 1])
-                    self.lines[self.cursor_y - 1] += self.lines.pop(self.cursor_y)
+                    self.lines.join_lines(self.cursor_y - 1)
                     self.cursor_y -= 1; self.cursor_x = prev_len; self.modified = True
         elif isinstance(key, str) and key in self.AUTO_PAIRS:
             if self.read_only: return "continue"
@@ -440,19 +776,22 @@ class Editor:
             if self.selecting:
                 # Si le wrapping échoue (ex: multi-ligne), on supprime la sélection et on insère normalement
                 if not self._wrap_selection(key, closing_char):
-                    self._delete_selection()
-                    self.lines[self.cursor_y] = self.lines[self.cursor_y][:self.cursor_x] + key + self.lines[self.cursor_y][self.cursor_x:]
+                    with self.history.group():
+                        self._delete_selection()
+                        self.lines.insert_text(self.cursor_y, self.cursor_x, key)
                     self.cursor_x += len(key)
                     self.modified = True
             else:
-                line = self.lines[self.cursor_y]
-                self.lines[self.cursor_y] = line[:self.cursor_x] + key + closing_char + line[self.cursor_x:]
+                self.lines.insert_text(self.cursor_y, self.cursor_x, key + closing_char)
                 self.cursor_x += 1
                 self.modified = True
         elif isinstance(key, str):
             if self.read_only: return "continue"
-            if self.selecting: self._delete_selection()
-            self.lines[self.cursor_y] = self.lines[self.cursor_y][:self.cursor_x] + key + self.lines[self.cursor_y][self.cursor_x:]
+            if self.selecting:
+                with self.history.group():
+                    self._delete_selection()
+                    self.lines.insert_text(self.cursor_y, self.cursor_x, key)
+            else: self.lines.insert_text(self.cursor_y, self.cursor_x, key)
             self.cursor_x += len(key); self.modified = True
 
         if not is_shift_move: self.selecting = False
@@ -486,36 +825,62 @@ class Editor:
                 continue
 
             if isinstance(key, str) and key in all_command_keys:
-                cmd = key
-                if cmd == 's': self._save_file()
-                elif cmd == 'q': return "quit"
-                elif cmd == 'h': return "help"
-                elif cmd == 'p': return "settings"
-                elif cmd == 'f': self._search()
-                elif cmd == 'r': self._search_and_replace()
-                elif cmd == 'g': self._goto_line()
-                elif cmd == 'd': self._duplicate_line_or_selection()
-                elif cmd == 'j': self._join_lines()
-                elif cmd == 'o': self._sort_lines()
-                elif cmd == 't': self._insert_table()
-                elif cmd == 'x': self._copy_selection(); self._delete_selection()
-                elif cmd == 'c': self._copy_selection()
-                elif cmd == 'v': self._paste()
+                with self.history.group(): # Chaque commande s'annule en une fois
+                    action = self._run_command(key)
+                if action: return action
 
             # Quitte le mode commande sur Esc ou toute autre touche
             break
 
         # Redessine l'interface normale pour effacer le prompt
         return "continue"
+
+    def _run_command(self, cmd):
+        if cmd == 's': self._save_file()
+        elif cmd == 'e': return self._open_file()
+        elif cmd == 'l': return self._switch_file()
+        elif cmd == 'q': return "quit"
+        elif cmd == 'a': self._toggle_follow()
+        elif cmd == '-': self._split_view('h')
+        elif cmd == '|': self._split_view('v')
+        elif cmd == 'w': self._next_view()
+        elif cmd == 'k': self._close_view()
+        elif cmd == 'h': return "help"
+        elif cmd == 'p': return "settings"
+        elif cmd == 'f': self._search()
+        elif cmd == 'n': self._find_next()
+        elif cmd == 'b': self._find_next(backward=True)
+        elif cmd == 'r': self._search_and_replace()
+        elif cmd == 'g': self._goto_line()
+        elif cmd == 'd': self._duplicate_line_or_selection()
+        elif cmd == 'j': self._join_lines()
+        elif cmd == 'o': self._sort_lines()
+        elif cmd == 't': self._insert_table()
+        elif cmd == 'x': self._copy_selection(); self._delete_selection()
+        elif cmd == 'c': self._copy_selection()
+        elif cmd == 'v': self._paste()
+        elif cmd == 'u': self._undo()
+        elif cmd == 'y': self._redo()
+        return None
+
+    def _undo(self):
+        if self.read_only: return
+        cursor = self.history.undo()
+        if cursor is None: self._set_status_message("Rien à annuler"); return
+        self.cursor_y, self.cursor_x = cursor
+        self.selecting = False; self.modified = True
+
+    def _redo(self):
+        if self.read_only: return
+        cursor = self.history.redo()
+        if cursor is None: self._set_status_message("Rien à rétablir"); return
+        self.cursor_y, self.cursor_x = cursor
+        self.selecting = False; self.modified = True
     
     def _get_selection_text(self):
         if not self.selecting: return []
         (start_y, start_x), (end_y, end_x) = self._get_selection_bounds()
-        if start_y == end_y: return [self.lines[start_y][start_x:end_x]]
-        lines = [self.lines[start_y][start_x:]]
-        lines.extend(self.lines[start_y + 1:end_y])
-        lines.append(self.lines[end_y][:end_x])
-        return lines
+        return self.lines.get_range(start_y, start_x, end_y, end_x)
 
     def _wrap_selection(self, open_char, close_char):
         if not self.selecting: return False
@@ -529,7 +894,7 @@ class Editor:
         wrapped_text = open_char + selected_text + close_char
 
         line = self.lines[start_y]
-        self.lines[start_y] = line[:start_x] + wrapped_text + line[end_x:]
+        self.lines.set_line(start_y, line[:start_x] + wrapped_text + line[end_x:])
 
         # Mettre à jour le curseur et l'état de la sélection
         self.cursor_y = start_y
@@ -541,13 +906,7 @@ class Editor:
     def _delete_selection(self):
         if not self.selecting: return
         (start_y, start_x), (end_y, end_x) = self._get_selection_bounds()
-        first_line_part = self.lines[start_y][:start_x]
-        last_line_part = self.lines[end_y][end_x:]
-        if start_y == end_y:
-            self.lines[start_y] = first_line_part + last_line_part
-        else:
-            self.lines[start_y] = first_line_part + last_line_part
-            del self.lines[start_y + 1 : end_y + 1]
+        self.lines.delete_range(start_y, start_x, end_y, end_x)
         self.cursor_y, self.cursor_x = start_y, start_x
         self.selecting = False; self.modified = True
         
@@ -556,82 +915,287 @@ class Editor:
         
     def _paste(self):
         if self.read_only or not self.clipboard: return
-        if self.selecting: self._delete_selection()
-        if len(self.clipboard) == 1:
-            line = self.lines[self.cursor_y]
-            self.lines[self.cursor_y] = line[:self.cursor_x] + self.clipboard[0] + line[self.cursor_x:]
-            self.cursor_x += len(self.clipboard[0])
-        else:
-            line_end = self.lines[self.cursor_y][self.cursor_x:]
-            self.lines[self.cursor_y] = self.lines[self.cursor_y][:self.cursor_x] + self.clipboard[0]
-            for i, clip_line in enumerate(self.clipboard[1:]):
-                self.lines.insert(self.cursor_y + i + 1, clip_line)
-            self.lines[self.cursor_y + len(self.clipboard) - 1] += line_end
-            self.cursor_y += len(self.clipboard) - 1
-            self.cursor_x = len(self.clipboard[-1])
+        with self.history.group():
+            if self.selecting: self._delete_selection()
+            self.cursor_y, self.cursor_x = self.lines.insert_text(self.cursor_y, self.cursor_x, "\n".join(self.clipboard))
         self.modified = True
         
     def _indent_selection(self, unindent=False):
         if self.read_only or not self.selecting: return
         (start_y, _), (end_y, _) = self._get_selection_bounds()
         tab_str = " " * self.settings.get("tab_size")
-        for i in range(start_y, end_y + 1):
-            if unindent:
-                if self.lines[i].startswith(tab_str): self.lines[i] = self.lines[i][len(tab_str):]
-            else: self.lines[i] = tab_str + self.lines[i]
+        new_lines = []
+        for line in self.lines[start_y:end_y + 1]:
+            if unindent: new_lines.append(line[len(tab_str):] if line.startswith(tab_str) else line)
+            else: new_lines.append(tab_str + line)
+        self.lines.replace(start_y, end_y + 1, new_lines)
         self.modified = True
         
     def _unindent_selection(self): self._indent_selection(unindent=True)
     
     def _save_file(self, autosave=False):
+        """Confie un instantané du document au fil d'écriture ; le résultat arrive par _check_save_result()."""
         if self.read_only:
             if not autosave: self._set_status_message("Fichier non modifiable")
             return False
-        try:
-            with open(self.file_path, 'w', encoding='utf-8') as f: f.write('\n'.join(self.lines))
-            self.modified = False
-            if not autosave: self._set_status_message("Fichier sauvegardé !")
-            return True
-        except Exception as e:
-            if not autosave: self._set_status_message(f"Erreur de sauvegarde: {e}")
-            return False
-            
+        # Une sauvegarde manuelle encore en attente reste annoncée comme telle si une autosauvegarde la remplace
+        self._manual_save = not autosave or (self._manual_save and writer.busy(self.file_path))
+        if self.journal: self._journal_marks[self._version] = self.journal.mark()
+        with self.lines.lock: snapshot, text_format = self.lines.snapshot(), self.text_format.frozen()
+        writer.submit(self.file_path, self._version, snapshot, text_format)
+        self._submitted_version = self._version
+        self.modified_counter = 0
+        if not autosave: self._set_status_message("Sauvegarde...")
+        return True
+
+    def _autosave_if_idle(self):
+        idle = self.settings.get("autosave_idle")
+        if idle > 0 and self.modified and self._version != self._submitted_version and time.time() - self._last_edit_time >= idle:
+            self._save_file(autosave=True)
+
+    def _check_save_result(self):
+        result = writer.take_result(self.file_path)
+        if result is None: return
+        version, error = result
+        if error is not None:
+            self._set_status_message(f"Erreur de sauvegarde{'' if self._manual_save else ' automatique'}: {error}")
+        else:
+            if version == self._version: self._modified_flag = False # Aucune édition depuis l'instantané
+            mark = self._journal_marks.get(version)
+            self._journal_marks = {v: m for v, m in self._journal_marks.items() if v > version}
+            if self.journal and mark is not None and not writer.busy(self.file_path): self.journal.checkpoint(mark)
+            self._set_status_message("Fichier sauvegardé !" if self._manual_save else "Sauvegarde automatique")
+        self._manual_save = False
+
     def _goto_line(self):
         line_num_str = prompt_input(self.stdscr, "Aller à la ligne: ")
         if line_num_str.isdigit():
             line_num = int(line_num_str)
+            if line_num > len(self.lines) and not self._wait_for_line(line_num - 1): return
             if 1 <= line_num <= len(self.lines): self.cursor_y, self.cursor_x = line_num - 1, 0
+
+    def _wait_for_line(self, y):
+        """Attend que l'indexation atteigne la ligne y, en affichant l'avancement ; retourne False si Échap l'a interrompue."""
+        while y >= len(self.lines) and self.lines.indexing:
+            if self.lines.wait_for_line(y, BACKGROUND_POLL_MS / 1000): break
+            percent = self.lines.indexed_bytes * 100 // max(1, self.lines.total_bytes)
+            if not self._show_progress(f"Indexation... {percent}%"):
+                self._set_status_message("Saut annulé : indexation en cours"); return False
+        return True
             
+    def _open_file(self):
+        """Invite « Aller au fichier » sur l'index du dossier de travail ; retourne "open" si un fichier a été choisi."""
+        path = FileFinder(self.stdscr, project_index()).run()
+        self._invalidate_views() # L'invite a recouvert tout l'écran
+        if path is None or os.path.abspath(path) == os.path.abspath(self.file_path or ""): return None
+        self.open_request = path
+        return "open"
+
+    def _switch_file(self):
+        """Liste des fichiers ouverts ; retourne "open" vers le fichier choisi, ou "explorer"."""
+        if self.workspace is None: return None
+        choice = self.workspace.choose(self.file_path)
+        self._invalidate_views()
+        if choice == "explorer": return "explorer"
+        if choice is None or choice == os.path.abspath(self.file_path): return None
+        self.open_request = choice
+        return "open"
+
+    def _toggle_follow(self):
+        """Active ou arrête le suivi du fichier (tail -f) : le document, en lecture seule, reçoit ce qui s'ajoute au fichier."""
+        if self.follower is not None:
+            self.follower, self.read_only = None, False
+            self.apply_settings() # Rouvre le journal de récupération
+            self._set_status_message("Suivi du fichier arrêté"); return
+        if self.read_only: self._set_status_message("Lecture seule"); return
+        if self.modified or writer.busy(self.file_path): self._set_status_message("Sauvegardez d'abord les modifications"); return
+        try: # Après une sauvegarde, le document est ce qui a été écrit : le fichier entier
+            offset = self._loaded_bytes if not self._version else os.path.getsize(self.file_path)
+            self.follower = FileFollower(self.file_path, offset, self.text_format.encoding)
+        except OSError as e: self._set_status_message(f"Impossible de suivre le fichier : {e.strerror or e}"); return
+        self.read_only = True
+        self.apply_settings() # Ferme le journal : le texte ajouté ne vient pas de l'utilisateur
+        self._set_status_message("Suivi du fichier : les ajouts s'affichent au fur et à mesure")
+
+    def _check_invalid_bytes(self):
+        """Passe en lecture seule un document mappé où l'indexation a trouvé un octet que son encodage ne décode pas."""
+        if self.text_format.invalid is None or self.read_only: return
+        self.read_only = True # Sauvegarder réécrirait l'octet en U+FFFD
+        self._set_status_message(f"Octet invalide en {self.text_format.encoding} à la position {self.text_format.invalid} : lecture seule")
+
+    def _follow_file(self):
+        """Ajoute au document ce que le fichier suivi a reçu ; une vue dont le curseur était sur la dernière ligne la suit."""
+        if self.follower is None or self.lines.indexing: return
+        continued = self.follower.continued
+        changes = self.follower.poll()
+        if changes is None: return
+        reset, lines = changes
+        last = len(self.lines) - 1
+        following = [view for view in views(self.layout) if view.cursor_y >= last]
+        if reset: self.text_format.others = {}
+        with self.history.untracked():
+            if reset: self.lines.replace(0, len(self.lines), lines)
+            elif continued: self.lines.replace(last, last + 1, [self.lines[last] + lines[0]] + lines[1:])
+            else: self.lines.replace(last + 1, last + 1, lines)
+        self.text_format.final_newline = not self.follower.continued
+        added = sum(map(len, lines))
+        self._text_bytes = added if reset else self._text_bytes + added
+        if reset: self._set_status_message("Fichier remplacé ou tronqué : relu depuis le début")
+        last = len(self.lines) - 1
+        for view in views(self.layout):
+            if view in following: view.cursor_y, view.cursor_x = last, 0
+            else: view.cursor_y = min(view.cursor_y, last); view.cursor_x = min(view.cursor_x, len(self.lines[view.cursor_y]))
+            if reset: view.selecting = False
+            rows = view.rect[2] if view.rect else 1 # Les vues inactives ne passent pas par _scroll()
+            view.top_line = min(max(view.top_line, view.cursor_y - rows + 1), view.cursor_y)
+            if reset: view.top_line = max(0, min(view.top_line, last - rows + 1)) # Le nouveau fichier, court, tient peut-être en entier
+
+    def jump_to(self, y, x=0):
+        """Place le curseur en (y, x), ramené dans le document ; attend au besoin que la ligne soit indexée."""
+        if y >= len(self.lines): self._wait_for_line(y) # Interrompue : on s'arrête à la dernière ligne indexée
+        self.cursor_y = max(0, min(y, len(self.lines) - 1))
+        self.cursor_x = max(0, min(x, len(self.lines[self.cursor_y])))
+
+    def _search_counter(self):
+        """« k/N » si le curseur est sur une occurrence, sinon le nombre d'occurrences (suivi de … pendant l'analyse)."""
+        search = self.search
+        if search.error: return "regex invalide"
+        total = f"{search.count}{'' if search.complete else '…'}"
+        if search.current == (self.cursor_y, self.cursor_x): return f"{search.rank()}/{total}"
+        return f"{total} résultat(s)"
+
     def _search(self):
-        search_term = prompt_input(self.stdscr, "Rechercher: ")
-        if search_term: self.search_term = search_term; self._find_next()
-        
-    def _find_next(self):
-        if not self.search_term: return
-        start_y, start_x = self.cursor_y, self.cursor_x + 1
-        for y in range(start_y, len(self.lines)):
-            x = self.lines[y].find(self.search_term, start_x if y == start_y else 0)
-            if x != -1: self.cursor_y, self.cursor_x = y, x; return
-        for y in range(start_y):
-            x = self.lines[y].find(self.search_term)
-            if x != -1: self.cursor_y, self.cursor_x = y, x; return
-        self._set_status_message(f"'{self.search_term}' non trouvé")
+        """Recherche au fil de la frappe : chaque touche affine l'index et place le curseur sur la première occurrence.
+
+        Haut/Bas passent d'une occurrence à l'autre, Entrée valide, Échap revient à la position de départ.
+        """
+        origin = (self.cursor_y, self.cursor_x, self.top_line, self.left_col)
+        term, jumped = "", False
+        self.search.set_term(term, **self.search_options)
+        while True:
+            if term and not self.search.complete: self.search.build()
+            if term and not jumped:
+                position = self.search.find(origin[0], origin[1], inclusive=True)
+                if position: self.cursor_y, self.cursor_x = position; jumped = True
+                elif self.search.complete: self.cursor_y, self.cursor_x, self.top_line, self.left_col = origin
+            if self.highlighter: self.highlighter.flush_changes()
+            try:
+                self._scroll()
+                self._render()
+                self._draw_search_prompt(term)
+                self.stdscr.refresh()
+            except curses.error: pass
+
+            self.stdscr.timeout(BACKGROUND_POLL_MS if term and not self.search.complete else self._input_timeout())
+            ui_idle.set()
+            try: key = self.stdscr.get_wch()
+            except curses.error: continue
+            except KeyboardInterrupt: key = '\x1b'
+            finally: self.stdscr.timeout(-1); ui_idle.clear()
+
+            if key in ('\n', '\r', curses.KEY_ENTER):
+                if term: self.search.build(None); self._set_status_message(f"'{term}' : {self._search_counter()}")
+                break
+            elif key == '\x1b':
+                self.search.set_term("")
+                self.cursor_y, self.cursor_x, self.top_line, self.left_col = origin
+                break
+            elif key in (curses.KEY_DOWN, curses.KEY_UP):
+                if term: self.search.build(None); self._jump_to_match(backward=key == curses.KEY_UP)
+                continue
+            elif key in self.SEARCH_TOGGLES: # Change de mode : la recherche repart avec le même terme
+                option = self.SEARCH_TOGGLES[key]
+                self.search_options[option] = not self.search_options[option]
+            elif key in (curses.KEY_BACKSPACE, '\x7f', '\b'): term = term[:-1]
+            elif isinstance(key, str) and key.isprintable(): term += key
+            else: continue
+            if (term, self.search_options) != (self.search.term, self.search.options):
+                jumped = False
+                self.search.set_term(term, **self.search_options)
+                self.cursor_y, self.cursor_x, self.top_line, self.left_col = origin
+
+    def _search_mode_label(self):
+        """Modes actifs du moteur de recherche, à afficher dans les prompts (« [regex, casse ignorée] »)."""
+        names = {"regex": "regex", "ignore_case": "casse ignorée", "whole_word": "mot entier"}
+        active = [names[option] for option, enabled in self.search_options.items() if enabled]
+        return f" [{', '.join(active)}]" if active else ""
+
+    def _draw_search_prompt(self, term):
+        height, width = self._get_screen_size()
+        prompt = f"Rechercher{self._search_mode_label()}: {term}"
+        counter = f" {self._search_counter()} " if term else ""
+        self.stdscr.attron(curses.color_pair(1))
+        self.stdscr.addstr(height - 1, 1, (prompt.ljust(width - 2 - len(counter)) + counter)[:width - 2])
+        self.stdscr.attroff(curses.color_pair(1))
+        self.stdscr.move(height - 1, min(width - 2, 1 + len(prompt)))
+
+    def _jump_to_match(self, backward=False):
+        position = self.search.find(self.cursor_y, self.cursor_x, backward)
+        if position is None: self._set_status_message(f"'{self.search.term}' non trouvé"); return False
+        self.cursor_y, self.cursor_x = position
+        self.selecting = False
+        return True
+
+    def _find_next(self, backward=False):
+        """Saute à l'occurrence suivante (ou précédente) de la dernière recherche."""
+        if not self.search.term: self._set_status_message("Aucune recherche en cours"); return
+        self.search.build(None)
+        if self._jump_to_match(backward): self._set_status_message(f"'{self.search.term}' : {self._search_counter()}")
         
     def _search_and_replace(self):
+        """Remplace avec le moteur de la recherche et ses modes ; en regex, le remplacement peut citer les groupes (\\1)."""
         if self.read_only: self._set_status_message("Lecture seule"); return
-        find_str = prompt_input(self.stdscr, "Remplacer: ")
+        find_str = prompt_input(self.stdscr, f"Remplacer{self._search_mode_label()}: ")
         if not find_str: return
+        try: pattern = compile_pattern(find_str, **self.search_options)
+        except re.error as e: self._set_status_message(f"Regex invalide : {e}"); return
+        multiline, expand = is_multiline(find_str, self.search_options["regex"]), self.search_options["regex"]
         replace_str = prompt_input(self.stdscr, f"Remplacer '{find_str}' par: ")
         replace_all = prompt_input(self.stdscr, "Remplacer tout? (o/n): ").lower() == 'o'
-        count = 0
-        if replace_all:
-            for i, line in enumerate(self.lines):
-                new_line, num = re.subn(find_str, replace_str, line)
-                if num > 0: self.lines[i], count = new_line, count + num
-        else:
-            line = self.lines[self.cursor_y]
-            if find_str in line:
-                self.lines[self.cursor_y] = line.replace(find_str, replace_str, 1)
-                count = 1
-        if count > 0: self.modified = True; self._set_status_message(f"{count} remplacement(s)")
-        else: self._set_status_message("Non trouvé")
\ No newline at end of file
+        if replace_all: self._replace_all(ReplaceAll(self.lines, pattern, replace_str, multiline, expand)); return
+        # Occurrence suivante à partir du curseur, en revenant au début si besoin
+        for start in ((self.cursor_y, self.cursor_x), (0, 0)):
+            match = next((m for _, found in iter_chunks(self.lines, pattern, multiline, start) for m in found), None)
+            if match: break
+        if not match: self._set_status_message("Non trouvé"); return
+        try: replace_matches(self.lines, [match], replace_str, expand)
+        except (re.error, IndexError) as e: self._set_status_message(f"Remplacement invalide : {e}"); return
+        self.cursor_y, self.cursor_x = match[0], match[1]
+        self.modified = True; self._set_status_message("1 remplacement(s)")
+
+    def _replace_all(self, job):
+        """Remplace tout : analyse par tranches avec sa progression (Échap annule), puis confirmation et application d'un bloc.
+
+        Entre deux tranches, on revient lire le clavier. Le document n'est modifié qu'après
+        confirmation du nombre d'occurrences, en une seule étape d'annulation et une seule
+        modification signalée (donc au plus une sauvegarde automatique).
+        """
+        try:
+            while not job.complete:
+                job.step()
+                self._draw_replace_progress(job)
+                waiting = job.position[0] >= len(self.lines) # Attend la suite de l'indexation
+                self.stdscr.timeout(BACKGROUND_POLL_MS if waiting else 0)
+                ui_idle.set()
+                try: key = self.stdscr.get_wch()
+                except curses.error: key = None
+                except KeyboardInterrupt: key = '\x1b'
+                finally: self.stdscr.timeout(-1); ui_idle.clear()
+                if key == '\x1b': self._set_status_message("Remplacement annulé"); return
+        except (re.error, IndexError) as e: self._set_status_message(f"Remplacement invalide : {e}"); return
+        if not job.count: self._set_status_message("Non trouvé"); return
+        if prompt_input(self.stdscr, f"{job.count} occurrence(s) : remplacer? (o/n): ").lower() != 'o':
+            self._set_status_message("Remplacement annulé"); return
+        with self.history.group(): count = job.apply() # Une seule étape d'annulation pour tout le document
+        self.modified = True
+        self._set_status_message(f"{count} remplacement(s)")
+
+    def _draw_replace_progress(self, job):
+        height, width = self._get_screen_size()
+        text = f"Remplacer tout : {int(job.progress() * 100)}% analysé, {job.count} occurrence(s) (Échap : annuler)"
+        try:
+            self.stdscr.attron(curses.color_pair(1))
+            self.stdscr.addstr(height - 1, 1, text.ljust(width - 2)[:width - 2])
+            self.stdscr.attroff(curses.color_pair(1))
+            self.stdscr.refresh()
+        except curses.error: pass
\ No newline at end of file
@@ -0,0 +1,85 @@
+# -- coding: utf-8 --
+
+import curses
+import os
+
+from .constants import BACKGROUND_POLL_MS
+from .file_index import FuzzyQuery
+
+
+class FileFinder:
+    """Invite « Aller au fichier » : recherche floue dans les chemins d'un FileIndex.
+
+    Chaque touche relance le classement, qui ne dispose que d'une tranche de QUERY_SLICE
+    avant le dessin ; il se poursuit entre deux touches. Les classements précédents sont
+    gardés : un retour arrière retrouve le sien au lieu de tout refaire.
+    """
+
+    def __init__(self, stdscr, index):
+        self.stdscr, self.index = stdscr, index
+
+    def run(self):
+        """Retourne le chemin absolu du fichier choisi avec Entrée, ou None (Échap)."""
+        self.index.refresh()
+        term, selected, top, queries = "", 0, 0, []
+        query = None
+        curses.curs_set(0)
+        try:
+            while True:
+                snapshot = self.index.snapshot
+                if snapshot is not None and (query is None or query.snapshot is not snapshot): # Index publié ou mis à jour
+                    queries, query = [], None
+                    for k in range(len(term) + 1): # Restaure la pile des saisies sur le nouvel instantané
+                        query = FuzzyQuery(snapshot, term[:k], query); queries.append(query)
+                if query is not None: query.step()
+                h, w = self.stdscr.getmaxyx(); list_h = max(1, h - 4)
+                results = query.results(max(top, selected) + list_h) if query is not None else []
+                selected = max(0, min(selected, len(results) - 1))
+                if selected < top: top = selected
+                if selected >= top + list_h: top = selected - list_h + 1
+                try:
+                    self.stdscr.erase()
+                    self._draw(term, query, results[top:top + list_h], top, selected)
+                    self.stdscr.refresh()
+                except curses.error: pass
+
+                waiting = query is None or not query.complete or self.index.crawling
+                self.stdscr.timeout(BACKGROUND_POLL_MS if waiting else -1)
+                try: key = self.stdscr.get_wch()
+                except curses.error: continue
+                except KeyboardInterrupt: return None
+                if key == '\x1b': return None
+                elif key in ('\n', '\r', curses.KEY_ENTER):
+                    if results: return os.path.join(self.index.root, results[selected])
+                elif key == curses.KEY_UP: selected = max(0, selected - 1)
+                elif key == curses.KEY_DOWN: selected += 1
+                elif key == curses.KEY_PPAGE: selected = max(0, selected - list_h)
+                elif key == curses.KEY_NPAGE: selected += list_h
+                elif key in (curses.KEY_BACKSPACE, '\x7f', '\b'):
+                    if not term: continue
+                    term, selected, top = term[:-1], 0, 0
+                    if queries: queries.pop(); query = queries[-1]
+                elif isinstance(key, str) and key.isprintable():
+                    term, selected, top = term + key, 0, 0
+                    if query is not None: query = FuzzyQuery(query.snapshot, term, query); queries.append(query)
+        finally:
+            self.stdscr.timeout(-1)
+
+    def _draw(self, term, query, visible, top, selected):
+        h, w = self.stdscr.getmaxyx()
+        self.stdscr.attron(curses.color_pair(3)); self.stdscr.box(); self.stdscr.attroff(curses.color_pair(3))
+        title = " YGREG - Aller au fichier "
+        self.stdscr.addstr(0, (w - len(title)) // 2, title, curses.A_BOLD)
+        if query is None: state = "indexation..."
+        else:
+            state = f"{query.count}{'' if query.complete else '…'}/{len(query.snapshot.paths)} fichier(s)"
+            if self.index.crawling: state += ", indexation..."
+            elif self.index.truncated: state += " (limite atteinte)"
+        self.stdscr.addstr(1, 2, f"Dossier: {self.index.root}  ({state})"[:w - 4], curses.A_DIM)
+        for i, path in enumerate(visible):
+            style = curses.color_pair(2) | curses.A_BOLD if top + i == selected else curses.color_pair(0)
+            self.stdscr.addstr(i + 2, 2, path[:w - 4].ljust(w - 4), style)
+        prompt = f"Fichier: {term}"
+        self.stdscr.addstr(h - 2, 2, prompt[-(w - 4):].ljust(w - 4), curses.color_pair(1))
+        footer = "Entrée: Ouvrir | Haut/Bas: Choisir | Échap: Retour"
+        self.stdscr.addstr(h - 1, (w - len(footer)) // 2, footer, curses.color_pair(2))
@@ -0,0 +1,216 @@
+# -- coding: utf-8 --
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from .constants import CACHE_DIR
+from .project_search import is_ignored, parse_gitignore, parent_rules
+
+POLL_INTERVAL = 10 # Secondes entre deux vérifications des dates de modification des dossiers
+SAVE_INTERVAL = 60 # Secondes minimum entre deux écritures du cache
+PARTIAL_PUBLISH = 0.5 # Pendant le premier parcours, secondes entre deux publications partielles
+MAX_FILES = 500000 # Au-delà, le parcours s'arrête (dossier de travail trop vaste, le dossier personnel par exemple)
+QUERY_SLICE = 0.008 # Secondes de classement par appel de step() : la réponse à une touche reste sous 10 ms
+QUERY_BATCH = 512
+CACHE_VERSION = 1
+
+# Index des chemins d'un dossier de projet, pour l'ouverture par recherche floue. Un fil
+# parcourt l'arborescence (en respectant les .gitignore comme la recherche dans le dossier),
+# puis vérifie régulièrement la date de modification de chaque dossier : seuls ceux qui ont
+# changé sont relus. Le contenu des dossiers est gardé dans un cache sur disque, relu au
+# lancement suivant, qui n'a plus qu'à vérifier les dates.
+
+def _cache_path(root):
+    return os.path.join(CACHE_DIR, f"files-{hashlib.sha1(root.encode('utf-8', 'surrogateescape')).hexdigest()[:16]}.json")
+
+
+class Snapshot:
+    """Liste figée des chemins (relatifs, séparés par '/'), du plus court au plus long, avec leurs versions en minuscules."""
+
+    def __init__(self, paths):
+        self.paths = sorted(paths, key=lambda p: (len(p), p))
+        self.lower = [p.lower() for p in self.paths]
+        self.names = [p[p.rfind('/') + 1:] for p in self.lower]
+
+
+class FileIndex:
+    """Chemins des fichiers sous root, tenus à jour par un fil de fond.
+
+    `snapshot` est le dernier instantané publié (None avant le premier) ; il est remplacé,
+    jamais modifié, et se lit donc sans verrou. `crawling` reste vrai jusqu'à la fin du
+    premier parcours, `truncated` si MAX_FILES a été atteint. refresh() demande une
+    vérification immédiate, par exemple à l'ouverture de l'invite de recherche.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.snapshot, self.crawling, self.truncated = None, True, False
+        self._dirs = {} # Dossier relatif ('' pour root) -> [mtime en ns, fichiers, sous-dossiers]
+        self._rules = {} # Dossier relatif -> règles .gitignore qui s'y appliquent
+        self._saved = 0
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def refresh(self): self._wake.set()
+
+    def _run(self):
+        if self._load_cache(): self._publish(self._dirs)
+        while True:
+            if self._refresh() or self.snapshot is None:
+                self._publish(self._dirs)
+                if self.crawling or time.monotonic() - self._saved >= SAVE_INTERVAL: self._save_cache()
+            self.crawling = False
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+
+    def _refresh(self):
+        """Parcourt les dossiers : relit ceux dont la date a changé et les nouveaux ; retourne True si des chemins ont changé."""
+        old, dirs, changed = self._dirs, {}, False
+        stack, count, published = [''], 0, time.monotonic()
+        while stack:
+            rel = stack.pop()
+            try: mtime = os.stat(os.path.join(self.root, rel)).st_mtime_ns
+            except OSError: continue # Disparu : absent du nouveau relevé
+            entry = old.get(rel)
+            if entry is None or entry[0] != mtime:
+                entry = [mtime, *self._scan(rel)]
+                changed = True
+            dirs[rel] = entry
+            count += len(entry[1])
+            if count >= MAX_FILES: self.truncated = True; break
+            stack.extend(reversed([f"{rel}/{name}" if rel else name for name in entry[2]]))
+            if self.snapshot is None and time.monotonic() - published >= PARTIAL_PUBLISH: # Premier parcours : on publie au fur et à mesure
+                self._publish(dirs); published = time.monotonic()
+        changed = changed or len(dirs) != len(old)
+        self._dirs = dirs
+        return changed
+
+    def _scan(self, rel):
+        """(fichiers, sous-dossiers) du dossier rel, sans ceux qu'excluent les .gitignore."""
+        self._rules.pop(rel, None) # Son .gitignore a pu changer
+        rules = self._rules_for(rel)
+        files, subdirs = [], []
+        try:
+            with os.scandir(os.path.join(self.root, rel)) as it:
+                for entry in it:
+                    try: is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError: continue
+                    if is_dir and entry.name == '.git': continue
+                    if is_ignored(entry.path, entry.name, is_dir, rules): continue
+                    if is_dir: subdirs.append(entry.name)
+                    elif entry.is_file(): files.append(entry.name)
+        except OSError: pass
+        return files, sorted(subdirs)
+
+    def _rules_for(self, rel):
+        rules = self._rules.get(rel)
+        if rules is None:
+            path = os.path.join(self.root, rel)
+            inherited = parent_rules(self.root) if not rel else self._rules_for(rel.rpartition('/')[0])
+            rules = self._rules[rel] = inherited + parse_gitignore(path)
+        return rules
+
+    def _publish(self, dirs):
+        paths = []
+        for rel, (_, files, _) in list(dirs.items()):
+            prefix = f"{rel}/" if rel else ""
+            paths.extend(prefix + name for name in files)
+        self.snapshot = Snapshot(paths)
+
+    def _load_cache(self):
+        try:
+            with open(_cache_path(self.root), encoding='utf-8') as f: data = json.load(f)
+        except (OSError, ValueError): return False
+        if data.get("version") != CACHE_VERSION or data.get("root") != self.root: return False
+        self._dirs = data["dirs"]
+        return True
+
+    def _save_cache(self):
+        """Écrit le contenu des dossiers dans le cache, via un fichier temporaire ; un échec est sans conséquence."""
+        path = _cache_path(self.root)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": CACHE_VERSION, "root": self.root, "dirs": self._dirs}, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except (OSError, ValueError): return
+        self._saved = time.monotonic()
+
+
+class FuzzyQuery:
+    """Classement des chemins d'un instantané pour une saisie, fait par tranches avec step().
+
+    Un chemin correspond si les caractères de la saisie y apparaissent dans l'ordre, casse
+    ignorée. Du meilleur au moins bon : le nom du fichier contient la saisie, le chemin la
+    contient, le nom contient ses caractères dans l'ordre, le chemin aussi ; à rang égal,
+    le chemin le plus court d'abord. Une saisie qui prolonge la précédente (previous) ne
+    réexamine que les correspondances de celle-ci et ce qu'elle n'avait pas encore vu.
+    """
+
+    def __init__(self, snapshot, query, previous=None):
+        self.snapshot, self.query = snapshot, query
+        self._q = query.lower()
+        # "abc" -> a[^b]*b[^c]*c : chaque caractère est pris à sa première occurrence, sans retour arrière
+        self._sub = re.compile(re.escape(self._q[:1]) + ''.join(f"[^{re.escape(c)}]*{re.escape(c)}" for c in self._q[1:])).search
+        self._tiers, self._matched = ([], [], [], []), []
+        if not self._q: self._sources = [] # Tout correspond : results() prend les premiers chemins
+        elif previous is not None and previous._q and previous.snapshot is snapshot and self._q.startswith(previous._q):
+            self._sources = [list(previous._matched)] + previous._remaining()
+        else: self._sources = [range(len(snapshot.paths))]
+        self._source, self._pos = 0, 0
+
+    @property
+    def complete(self): return self._source >= len(self._sources)
+
+    @property
+    def count(self): return len(self.snapshot.paths) if not self._q else len(self._matched)
+
+    def _remaining(self):
+        """Candidats pas encore examinés, dans l'ordre."""
+        if self.complete: return []
+        return [self._sources[self._source][self._pos:]] + self._sources[self._source + 1:]
+
+    def step(self, budget=QUERY_SLICE):
+        """Poursuit le classement pendant au plus budget secondes ; retourne True s'il est terminé."""
+        deadline = time.monotonic() + budget
+        lower, names, q, sub = self.snapshot.lower, self.snapshot.names, self._q, self._sub
+        tiers, matched = self._tiers, self._matched
+        while self._source < len(self._sources):
+            source = self._sources[self._source]
+            while self._pos < len(source):
+                stop = min(len(source), self._pos + QUERY_BATCH)
+                for j in source[self._pos:stop]:
+                    path = lower[j]
+                    if sub(path) is None: continue
+                    name = names[j]
+                    tiers[0 if q in name else 1 if q in path else 2 if sub(name) else 3].append(j)
+                    matched.append(j)
+                self._pos = stop
+                if time.monotonic() >= deadline: return False
+            self._source, self._pos = self._source + 1, 0
+        return True
+
+    def results(self, limit):
+        """Les limit meilleurs chemins trouvés jusqu'ici."""
+        paths = self.snapshot.paths
+        if not self._q: return paths[:limit]
+        found = []
+        for tier in self._tiers:
+            found.extend(paths[j] for j in tier[:limit - len(found)])
+            if len(found) >= limit: break
+        return found
+
+
+_project = None
+
+def project_index(root=None):
+    """Index du dossier de projet, créé (et son parcours lancé) au premier appel : root, ou le dossier de travail."""
+    global _project
+    if _project is None: _project = FileIndex(root or os.getcwd())
+    return _project
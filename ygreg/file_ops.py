@@ -0,0 +1,201 @@
+# -- coding: utf-8 --
+
+import errno
+import os
+import shutil
+import threading
+
+COPY_CHUNK = 1024 * 1024 # Octets copiés entre deux vérifications d'annulation
+
+# Opérations de fichiers de l'explorateur (suppression, copie, déplacement), faites par un
+# fil de fond : l'interface continue de répondre pendant la suppression d'un gros dossier.
+# Chaque opération compte d'abord ce qu'elle a à faire, puis avance élément par élément
+# en vérifiant entre deux si elle a été annulée. Une erreur sur un élément est notée et
+# l'opération continue avec les suivants, comme rm -rf.
+
+LABELS = {"delete": "Suppression", "copy": "Copie", "move": "Déplacement"}
+ENDINGS = {"delete": "e", "copy": "e", "move": ""} # Accord de « terminé » et « annulé »
+
+
+class FileOperation:
+    """Suppression, copie ou déplacement de sources (chemins absolus) vers destination, en arrière-plan.
+
+    Pour une copie ou un déplacement, si destination est un dossier existant les sources y
+    sont placées sous leur nom, sinon destination est le nouveau nom d'une source unique
+    (plusieurs sources vers autre chose qu'un dossier sont refusées). Rien n'est écrasé :
+    une cible existante, même apparue en cours d'opération, est une erreur. `finished`
+    devient vrai à la fin, `errors` liste les échecs (« chemin : raison »).
+    """
+
+    def __init__(self, kind, sources, destination=None):
+        self.kind, self.sources, self.destination = kind, list(sources), destination
+        self.counting, self.finished, self.cancelled = True, False, False
+        self.total_items, self.total_bytes, self.done_items, self.done_bytes = 0, 0, 0, 0
+        self.errors = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Demande l'arrêt ; l'élément en cours est terminé (ou, pour une copie, son fichier partiel effacé)."""
+        self.cancelled = True
+        self._stop.set()
+
+    def progress(self):
+        """Texte d'avancement, pour l'affichage."""
+        label = LABELS[self.kind]
+        if self.counting: return f"{label} : préparation ({self.total_items} éléments)..."
+        if self.total_bytes: percent = self.done_bytes * 100 // self.total_bytes
+        else: percent = self.done_items * 100 // max(1, self.total_items)
+        return f"{label} : {self.done_items}/{self.total_items} éléments ({percent}%)"
+
+    def summary(self):
+        """Bilan d'une opération terminée."""
+        label = LABELS[self.kind]
+        if self.errors:
+            more = f" (et {len(self.errors) - 1} autre(s))" if len(self.errors) > 1 else ""
+            return f"{label} : erreur {self.errors[0]}{more}"
+        ending = ENDINGS[self.kind]
+        if self.cancelled: return f"{label} annulé{ending} après {self.done_items} élément(s)"
+        return f"{label} terminé{ending} : {self.done_items} élément(s)"
+
+    def _error(self, path, e):
+        self.errors.append(f"{path} : {e.strerror or e}" if isinstance(e, OSError) else f"{path} : {e}")
+
+    def _run(self):
+        try:
+            if self.kind != "delete" and len(self.sources) > 1 and not os.path.isdir(self.destination):
+                self._error(os.path.abspath(self.destination), "n'est pas un dossier existant"); return # Sinon chaque source écraserait la précédente
+            targets = [(source, self._target(source)) for source in self.sources]
+            for source, target in targets:
+                if target is not None and self.kind == "move" and self._same_device(source, target): self.total_items += 1 # Simple renommage
+                elif target is not None or self.kind == "delete": self._count(source)
+            self.counting = False
+            for source, target in targets:
+                if self._stop.is_set(): break
+                if self.kind == "delete": self._delete(source)
+                elif target is None: continue # Cible refusée, erreur déjà notée
+                elif os.path.lexists(target): self._error(target, "existe déjà") # Créée depuis par une autre source ou un autre programme
+                elif self.kind == "copy": self._copy(source, target)
+                else: self._move(source, target)
+        finally:
+            self.counting, self.finished = False, True
+
+    def _target(self, source):
+        """Chemin que prendra source, ou None (erreur notée) s'il est déjà pris ou à l'intérieur de source."""
+        if self.kind == "delete": return None
+        destination = os.path.abspath(self.destination)
+        target = os.path.join(destination, os.path.basename(source)) if os.path.isdir(destination) else destination
+        if os.path.lexists(target): self._error(target, "existe déjà"); return None
+        if os.path.isdir(source) and not os.path.islink(source) and (target + os.sep).startswith(source.rstrip(os.sep) + os.sep):
+            self._error(target, "à l'intérieur de la source"); return None
+        return target
+
+    @staticmethod
+    def _same_device(source, target):
+        try: return os.lstat(source).st_dev == os.stat(os.path.dirname(target)).st_dev
+        except OSError: return False
+
+    def _count(self, source):
+        """Ajoute source (et, si c'est un dossier, son contenu) aux totaux ; les octets ne comptent que pour une copie."""
+        count_bytes = self.kind != "delete"
+        if not os.path.isdir(source) or os.path.islink(source):
+            self.total_items += 1
+            if count_bytes:
+                try: self.total_bytes += os.lstat(source).st_size
+                except OSError: pass
+            return
+        for directory, dirnames, filenames in os.walk(source):
+            if self._stop.is_set(): return
+            self.total_items += 1 + len(filenames) + sum(os.path.islink(os.path.join(directory, d)) for d in dirnames)
+            if count_bytes:
+                for name in filenames:
+                    try: self.total_bytes += os.lstat(os.path.join(directory, name)).st_size
+                    except OSError: pass
+
+    def _delete(self, source, tally=True):
+        """Supprime source ; tally=False pour la fin d'un déplacement, dont les éléments sont déjà comptés par la copie."""
+        if not os.path.isdir(source) or os.path.islink(source): self._remove(os.unlink, source, tally); return
+        for directory, dirnames, filenames in os.walk(source, topdown=False, onerror=lambda e: self._error(e.filename, e)):
+            for name in filenames:
+                if self._stop.is_set(): return
+                self._remove(os.unlink, os.path.join(directory, name), tally)
+            for name in dirnames: # Les sous-dossiers sont déjà vides ; un lien vers un dossier est retiré sans être suivi
+                path = os.path.join(directory, name)
+                if os.path.islink(path): self._remove(os.unlink, path, tally)
+            if self._stop.is_set(): return
+            self._remove(os.rmdir, directory, tally)
+
+    def _remove(self, remove, path, tally):
+        try: remove(path)
+        except FileNotFoundError: pass
+        except OSError as e:
+            if e.errno != errno.ENOTEMPTY: self._error(path, e) # Dossier non vide : un de ses éléments a déjà échoué
+            return
+        if tally: self.done_items += 1
+
+    def _copy(self, source, target):
+        """Copie source en target ; retourne True si tout a été copié."""
+        if not os.path.isdir(source) or os.path.islink(source): return self._copy_file(source, target)
+        ok, directories = True, []
+        for directory, dirnames, filenames in os.walk(source, onerror=lambda e: self._error(e.filename, e)):
+            destination = target if directory == source else os.path.join(target, os.path.relpath(directory, source))
+            try: os.mkdir(destination)
+            except OSError as e: self._error(destination, e); ok = False; dirnames.clear(); continue
+            self.done_items += 1
+            directories.append((directory, destination))
+            for name in filenames + [d for d in dirnames if os.path.islink(os.path.join(directory, d))]:
+                if self._stop.is_set(): return False
+                ok = self._copy_file(os.path.join(directory, name), os.path.join(destination, name)) and ok
+        for directory, destination in reversed(directories): # Après le contenu, qui change leur date de modification
+            try: shutil.copystat(directory, destination)
+            except OSError: pass
+        return ok and not self._stop.is_set()
+
+    def _copy_file(self, source, target):
+        try:
+            if os.path.islink(source): os.symlink(os.readlink(source), target)
+            elif not os.path.isfile(source): self._error(source, "fichier spécial, ignoré"); return False # Tube nommé, socket...
+            else:
+                with open(source, 'rb') as src, open(target, 'xb') as dst:
+                    while True:
+                        chunk = src.read(COPY_CHUNK)
+                        if not chunk: break
+                        dst.write(chunk)
+                        self.done_bytes += len(chunk)
+                        if self._stop.is_set(): break
+                if self._stop.is_set(): os.unlink(target); return False # Pas de fichier à moitié copié
+                shutil.copystat(source, target)
+        except OSError as e: self._error(source, e); return False
+        self.done_items += 1
+        return True
+
+    def _move(self, source, target):
+        if self._same_device(source, target):
+            try: os.rename(source, target); self.done_items += 1
+            except OSError as e: self._error(source, e)
+            return
+        # Autre système de fichiers : copie, puis suppression de la source si la copie est complète
+        if self._copy(source, target): self._delete(source, tally=False)
+
+
+jobs = [] # Opérations lancées depuis l'explorateur, jusqu'à ce que collect() rende leur bilan
+
+def start(kind, sources, destination=None):
+    job = FileOperation(kind, sources, destination)
+    jobs.append(job)
+    return job
+
+def running():
+    return [job for job in jobs if not job.finished]
+
+def collect():
+    """Retire et retourne les opérations terminées."""
+    finished = [job for job in jobs if job.finished]
+    jobs[:] = [job for job in jobs if not job.finished]
+    return finished
+
+def cancel_all(wait=False):
+    for job in running(): job.cancel()
+    if wait:
+        for job in jobs: job._thread.join()
@@ -2,63 +2,181 @@
 
 import curses
 import os
-import shutil
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import chain
 from math import log, floor
 
-from .constants import FILE_ICON_MAP
+from .constants import FILE_ICON_MAP, BACKGROUND_POLL_MS
+from .file_finder import FileFinder
+from .file_index import project_index
+from . import file_ops
+from .project_search import ProjectSearch
 from .utils import prompt_input
 
+STAT_THREADS = 8 # Sur un montage réseau, un stat attend surtout la latence : on en fait plusieurs à la fois
+
+_stat_executor = None
+
+def _stat_pool():
+    global _stat_executor
+    if _stat_executor is None: _stat_executor = ThreadPoolExecutor(max_workers=STAT_THREADS, thread_name_prefix="ygreg-stat")
+    return _stat_executor
+
+def _format_size(size):
+    if size == 0: return "0B"
+    i = int(floor(log(size, 1024))); p = pow(1024, i)
+    return f"{round(size / p, 2)} {('B', 'KB', 'MB', 'GB')[i]}"
+
+def _directory_mtime(path):
+    try: return os.stat(path).st_mtime_ns
+    except OSError: return None
+
+
+class DirectoryListing:
+    """Contenu d'un dossier, lu en un seul passage d'os.scandir et trié.
+
+    Le type de chaque entrée vient de son DirEntry, sans os.path.isdir : les noms
+    s'affichent tout de suite. La taille et la date viennent d'un stat fait dans un groupe
+    de fils, seulement pour les entrées demandées par load() (la zone affichée et ses
+    abords) ; row() donne des cases vides en attendant. `items` et `is_dir` sont parallèles.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = _directory_mtime(path) # Avant la lecture : un changement pendant celle-ci la rend périmée
+        entries = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try: is_dir = entry.is_dir()
+                    except OSError: is_dir = False
+                    entries.append((not is_dir, entry.name.lower(), entry))
+        except OSError: pass # Dossier illisible : liste vide
+        entries.sort(key=lambda e: e[:2])
+        self._entries = [entry for _, _, entry in entries]
+        self.items = [entry.name for entry in self._entries]
+        self.is_dir = [not is_file for is_file, _, _ in entries]
+        if os.path.abspath(path) != '/':
+            self._entries.insert(0, None); self.items.insert(0, ".."); self.is_dir.insert(0, True)
+        self._stats = [None] * len(self.items) # (taille, date) une fois chargées
+        self._loading = {} # Indice -> future du stat en cours
+        self._dates = {} # Minute -> date formatée : beaucoup de fichiers partagent la même
+        self._check = None # Vérification en cours de la date de modification du dossier
+
+    def row(self, i):
+        """(nom affiché, taille, date, couleur) de l'entrée i ; taille et date vides tant que le stat n'est pas arrivé."""
+        name, is_dir = self.items[i], self.is_dir[i]
+        icon, color = ("📁", 7) if is_dir else ("📄", 0)
+        if not is_dir:
+            ext = os.path.splitext(name)[1].lower()
+            if ext in FILE_ICON_MAP: icon, color = FILE_ICON_MAP[ext]
+        size_str, date_str = self._stats[i] or ("", "")
+        return f"{icon} {name}", size_str, date_str, color
+
+    def load(self, first, last):
+        """Demande les stat des entrées [first:last] et d'autant de part et d'autre ; les demandes hors de cette zone sont abandonnées."""
+        margin = last - first
+        start, stop = max(0, first - margin), min(len(self.items), last + margin)
+        for i, future in list(self._loading.items()):
+            if not start <= i < stop: future.cancel() # S'il n'a pas commencé ; son rappel le retire de _loading
+        # Les lignes visibles d'abord, puis leurs voisines
+        for i in chain(range(max(0, first), min(len(self.items), last)), range(start, stop)):
+            if self._stats[i] is None and i not in self._loading:
+                future = self._loading[i] = _stat_pool().submit(self._stat, i)
+                future.add_done_callback(lambda f, i=i: self._loading.pop(i, None))
+
+    def _stat(self, i):
+        """Dans un fil du groupe : stat de l'entrée i, mis en forme."""
+        entry = self._entries[i]
+        try: stat = entry.stat() if entry is not None else os.stat(os.path.join(self.path, ".."))
+        except OSError: self._stats[i] = ("", ""); return
+        minute = int(stat.st_mtime) // 60
+        date_str = self._dates.get(minute)
+        if date_str is None: date_str = self._dates[minute] = datetime.fromtimestamp(minute * 60).strftime('%Y-%m-%d %H:%M')
+        self._stats[i] = ("" if self.is_dir[i] else _format_size(stat.st_size), date_str)
+
+    def check(self):
+        """Lance, en arrière-plan, la vérification de la date de modification du dossier (si aucune n'est en cours)."""
+        if self._check is None: self._check = _stat_pool().submit(_directory_mtime, self.path)
+
+    def stale(self):
+        """Vrai si la dernière vérification terminée a vu le dossier changer depuis la lecture ; n'attend jamais."""
+        check = self._check
+        if check is None or not check.done(): return False
+        self._check = None
+        return check.result() != self.mtime
+
+    def pending(self):
+        """Vrai si des stat ou une vérification sont en cours : l'écran doit encore être mis à jour."""
+        return bool(self._loading) or self._check is not None
+
+    def close(self):
+        for future in list(self._loading.values()): future.cancel()
+        if self._check is not None: self._check.cancel()
+
+
 class FileSelector:
-    def __init__(self, stdscr, settings):
+    def __init__(self, stdscr, settings, back_to_editor=False):
         self.stdscr = stdscr
         self.settings = settings
+        self.back_to_editor = back_to_editor # Des fichiers sont ouverts : Q y retourne au lieu de quitter
         self.current_path = os.getcwd()
         self.selected_row, self.top_row = 0, 0
+        self.open_at = None # (ligne, colonne) où ouvrir le fichier retourné, choisi dans les résultats d'une recherche
+        self.marked = set() # Chemins marqués avec Espace, cibles des opérations de fichiers
+        self.message = "" # Bilan de la dernière opération terminée, affiché jusqu'à la touche suivante
+        self._listing = None
 
-    def _get_item_display(self, item_name, full_path):
-        icon, color = ("📁", 7) if os.path.isdir(full_path) else ("📄", 0)
-        if not os.path.isdir(full_path):
-            ext = os.path.splitext(item_name)[1].lower()
-            if ext in FILE_ICON_MAP: icon, color = FILE_ICON_MAP[ext]
-        display_name = f"{icon} {item_name}"
-        
-        size_str, date_str = "", ""
-        try:
-            stat = os.stat(full_path)
-            date_str = datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M')
-            if not os.path.isdir(full_path):
-                size = stat.st_size
-                if size == 0: size_str = "0B"
-                else:
-                    i = int(floor(log(size, 1024))); p = pow(1024, i)
-                    size_str = f"{round(size / p, 2)} {('B', 'KB', 'MB', 'GB')[i]}"
-        except OSError: pass
-        return display_name, size_str, date_str, color
-
-    def _draw(self, items):
+    def _get_listing(self):
+        """Liste du dossier courant, relue seulement s'il a changé (date de modification) ou après une création, une suppression ou F5."""
+        listing = self._listing
+        if listing is None or listing.path != self.current_path or listing.stale():
+            self._invalidate()
+            listing = self._listing = DirectoryListing(self.current_path)
+        return listing
+
+    def _invalidate(self):
+        """Oublie la liste du dossier (relue au prochain tour) et abandonne ses stat en attente."""
+        if self._listing is not None: self._listing.close()
+        self._listing = None
+
+    def _draw(self, listing):
         h, w = self.stdscr.getmaxyx(); selector_h = h - 2
         self.stdscr.attron(curses.color_pair(3)); self.stdscr.box(); self.stdscr.attroff(curses.color_pair(3))
         self.stdscr.addstr(0, (w - 31) // 2, " YGREG - Explorateur de Fichiers ", curses.A_BOLD)
         path_display = self.current_path if len(self.current_path) <= w-4 else f"...{self.current_path[-(w-7):]}"
-        self.stdscr.addstr(1, 2, f"Dossier: {path_display}", curses.A_DIM)
+        self.stdscr.addstr(1, 2, f"Dossier: {path_display}"[:w - 4], curses.A_DIM)
+        status = " | ".join(job.progress() for job in file_ops.running()) or self.message
+        if status: # Par-dessus la fin du chemin : l'avancement des opérations importe davantage
+            status = f" {status} "[:w - 4]
+            self.stdscr.addstr(1, w - 2 - len(status), status, curses.color_pair(1))
 
         if self.selected_row < self.top_row: self.top_row = self.selected_row
         if self.selected_row >= self.top_row + selector_h - 1: self.top_row = self.selected_row - selector_h + 2
+        listing.load(self.top_row, self.top_row + selector_h - 1)
         
         for i in range(selector_h - 1):
             list_idx = self.top_row + i
-            if list_idx >= len(items): break
-            item_name = items[list_idx]
-            display_name, size, date, color = self._get_item_display(item_name, os.path.join(self.current_path, item_name))
+            if list_idx >= len(listing.items): break
+            display_name, size, date, color = listing.row(list_idx)
             line = f"{display_name:<{w-30}} {date:<17} {size:>8}"[:w-4]
             style = curses.color_pair(2) | curses.A_BOLD if list_idx == self.selected_row else curses.color_pair(color)
+            if os.path.join(self.current_path, listing.items[list_idx]) in self.marked: style |= curses.A_REVERSE
             self.stdscr.addstr(i + 2, 2, line.ljust(w - 4), style)
         
-        self.stdscr.addstr(h - 1, (w - 53) // 2, "Entrée: Ouvrir | Q: Quitter | Suppr: Effacer | Tab > Cmds", curses.color_pair(2))
+        footer = "Entrée: Ouvrir | Q: Quitter | Espace: Marquer | Suppr: Effacer | Tab > Cmds"
+        self.stdscr.addstr(h - 1, max(1, (w - len(footer)) // 2), footer[:w - 2], curses.color_pair(2))
 
     def run(self):
         curses.curs_set(0)
+        try: return self._browse()
+        finally:
+            self._invalidate()
+            self.stdscr.timeout(-1)
+
+    def _browse(self):
         while True:
             h, w = self.stdscr.getmaxyx()
             if h < 5 or w < 40:
@@ -67,41 +185,150 @@ class FileSelector:
                 self.stdscr.refresh()
                 self.stdscr.getch()
                 continue
+            listing = self._get_listing()
+            items = listing.items
+            self.selected_row = min(self.selected_row, max(0, len(items) - 1)) # Entrées supprimées depuis
             try:
-                items = sorted(os.listdir(self.current_path), key=lambda x: (not os.path.isdir(os.path.join(self.current_path, x)), x.lower()))
-                if os.path.abspath(self.current_path) != '/': items.insert(0, "..")
-                self.stdscr.erase(); self._draw(items); self.stdscr.refresh()
+                self.stdscr.erase(); self._draw(listing); self.stdscr.refresh()
             except curses.error: pass
 
+            # Tant que des stat arrivent ou qu'une opération avance, on revient redessiner ; la navigation, elle, n'attend jamais
+            self.stdscr.timeout(BACKGROUND_POLL_MS if listing.pending() or file_ops.jobs else -1)
             key = self.stdscr.getch()
+            finished = file_ops.collect()
+            if finished:
+                self.message = " | ".join(job.summary() for job in finished)
+                self._invalidate()
+            if key == -1: continue
+            if not finished: self.message = ""
+            listing.check() # Le dossier a-t-il changé ? Réponse à un prochain tour
             if key == curses.KEY_UP: self.selected_row = max(0, self.selected_row - 1)
             elif key == curses.KEY_DOWN: self.selected_row = min(len(items) - 1, self.selected_row + 1)
             elif key == ord('p'): return "settings"
             elif key == ord('h'): return "help"
-            elif key == ord('q'): return None
+            elif key == ord('q'):
+                if self.back_to_editor: return None # Les opérations continuent pendant l'édition
+                if file_ops.running() and prompt_input(self.stdscr, "Opérations en cours : les interrompre et quitter? (o/n): ").lower() != 'o': continue
+                file_ops.cancel_all(wait=True)
+                return None
+            elif key == 27 and file_ops.running():
+                if prompt_input(self.stdscr, "Annuler les opérations en cours? (o/n): ").lower() == 'o': file_ops.cancel_all()
+            elif key == ord(' '):
+                if not items or items[self.selected_row] == "..": continue
+                path = os.path.join(self.current_path, items[self.selected_row])
+                self.marked.symmetric_difference_update({path})
+                self.selected_row = min(len(items) - 1, self.selected_row + 1)
+            elif key == curses.KEY_F5: self._invalidate() # Relecture forcée
+            elif key == ord('f'):
+                path = self._find_file()
+                if path: return path
             elif key in [curses.KEY_ENTER, 10, 13]:
                 if not items: continue
                 selected_path = os.path.abspath(os.path.join(self.current_path, items[self.selected_row]))
-                if os.path.isdir(selected_path): 
+                if listing.is_dir[self.selected_row]:
                     self.current_path, self.selected_row = selected_path, 0
                     os.chdir(self.current_path)
                 else: return selected_path
             elif key == curses.KEY_DC:
-                path_to_delete = os.path.join(self.current_path, items[self.selected_row])
-                if prompt_input(self.stdscr, f"Effacer '{items[self.selected_row]}'? (o/n): ").lower() == 'o':
-                    try:
-                        if os.path.isdir(path_to_delete): shutil.rmtree(path_to_delete)
-                        else: os.remove(path_to_delete)
-                        self.selected_row = max(0, self.selected_row - 1)
-                    except OSError as e: prompt_input(self.stdscr, f"Erreur: {e}...")
+                targets = self._targets(items)
+                if not targets: continue
+                if prompt_input(self.stdscr, f"Effacer {self._describe(targets)}? (o/n): ").lower() == 'o':
+                    file_ops.start("delete", targets) # En arrière-plan : la liste est relue à la fin
+                    self.marked.clear()
             elif key == ord('\t'):
                 name_prompt = {"n": "Nom du nouveau fichier: ", "d": "Nom du nouveau dossier: "}
-                cmd = prompt_input(self.stdscr, "Commande: (n)ouveau fichier, (d)ossier: ")
-                if cmd in name_prompt:
+                cmd = prompt_input(self.stdscr, "Commande: (n)ouveau fichier, (d)ossier, (c)opier, dé(p)lacer, (r)echercher dans le dossier, (o)uvrir par nom: ")
+                if cmd in ('c', 'p'):
+                    targets = self._targets(items)
+                    if not targets: continue
+                    verb = "Copier" if cmd == 'c' else "Déplacer"
+                    destination = prompt_input(self.stdscr, f"{verb} {self._describe(targets)} vers: ")
+                    if destination:
+                        file_ops.start("copy" if cmd == 'c' else "move", targets, os.path.join(self.current_path, os.path.expanduser(destination)))
+                        self.marked.clear()
+                elif cmd == 'o':
+                    path = self._find_file()
+                    if path: return path
+                elif cmd == 'r':
+                    term = prompt_input(self.stdscr, "Rechercher dans le dossier: ")
+                    result = self._project_search(term) if term else None
+                    if result:
+                        path, self.open_at = result[0], result[1:]
+                        return path
+                elif cmd in name_prompt:
                     name = prompt_input(self.stdscr, name_prompt[cmd])
                     if name:
                         try:
                             if cmd == 'n': open(os.path.join(self.current_path, name), 'a').close()
                             else: os.makedirs(os.path.join(self.current_path, name), exist_ok=True)
                         except OSError as e:
-                            prompt_input(self.stdscr, f"Erreur de création: {e}...")
\ No newline at end of file
+                            prompt_input(self.stdscr, f"Erreur de création: {e}...")
+                        self._invalidate()
+
+    def _targets(self, items):
+        """Chemins visés par une opération : les entrées marquées, sinon celle sélectionnée (jamais « .. »)."""
+        if self.marked: return sorted(self.marked)
+        if not items or items[self.selected_row] == "..": return []
+        return [os.path.join(self.current_path, items[self.selected_row])]
+
+    @staticmethod
+    def _describe(targets):
+        return f"'{os.path.basename(targets[0])}'" if len(targets) == 1 else f"{len(targets)} éléments"
+
+    def _find_file(self):
+        """Invite « Aller au fichier » sur l'index du dossier de travail ; retourne le chemin choisi ou None."""
+        path = FileFinder(self.stdscr, project_index()).run()
+        curses.curs_set(0)
+        return path
+
+    def _project_search(self, term):
+        """Cherche term dans tout le dossier courant et affiche les résultats à mesure qu'ils arrivent.
+
+        Retourne (chemin, ligne, colonne) du résultat choisi avec Entrée, ou None (Échap ou q).
+        """
+        try: search = ProjectSearch(self.current_path, term)
+        except re.error as e: prompt_input(self.stdscr, f"Terme invalide : {e}..."); return None
+        selected, top = 0, 0
+        curses.curs_set(0)
+        try:
+            while True:
+                done, results = search.done, search.results
+                count = len(results) # La liste ne fait que s'allonger : on s'en tient à cette longueur
+                h, w = self.stdscr.getmaxyx(); list_h = h - 3
+                if selected < top: top = selected
+                if selected >= top + list_h: top = selected - list_h + 1
+                try:
+                    self.stdscr.erase()
+                    self._draw_search_results(search, results[top:min(count, top + list_h)], top, selected, count, done)
+                    self.stdscr.refresh()
+                except curses.error: pass
+
+                self.stdscr.timeout(-1 if done else BACKGROUND_POLL_MS)
+                key = self.stdscr.getch()
+                if key == curses.KEY_UP: selected = max(0, selected - 1)
+                elif key == curses.KEY_DOWN: selected = max(0, min(count - 1, selected + 1))
+                elif key == curses.KEY_PPAGE: selected = max(0, selected - list_h)
+                elif key == curses.KEY_NPAGE: selected = max(0, min(count - 1, selected + list_h))
+                elif key in (27, ord('q')): return None
+                elif key in [curses.KEY_ENTER, 10, 13] and count:
+                    path, y, x, _ = results[selected]
+                    return path, y, x
+        finally:
+            self.stdscr.timeout(-1)
+            search.cancel()
+
+    def _draw_search_results(self, search, visible, top, selected, count, done):
+        h, w = self.stdscr.getmaxyx()
+        self.stdscr.attron(curses.color_pair(3)); self.stdscr.box(); self.stdscr.attroff(curses.color_pair(3))
+        title = " YGREG - Recherche dans le dossier "
+        self.stdscr.addstr(0, (w - len(title)) // 2, title, curses.A_BOLD)
+        if search.error: state = f" - Erreur : {search.error}"
+        elif search.truncated: state = f" (limite de {count} atteinte)"
+        elif not done: state = f"... ({search.files_searched}/{search.files_found} fichiers lus)"
+        else: state = f" dans {search.files_searched} fichier(s)"
+        self.stdscr.addstr(1, 2, f"'{search.term}' : {count} résultat(s){state}"[:w - 4], curses.A_DIM)
+        for i, (path, y, x, snippet) in enumerate(visible):
+            line = f"{os.path.relpath(path, search.root)}:{y + 1}: {snippet}"[:w - 4]
+            style = curses.color_pair(2) | curses.A_BOLD if top + i == selected else curses.color_pair(0)
+            self.stdscr.addstr(i + 2, 2, line.ljust(w - 4), style)
+        self.stdscr.addstr(h - 1, (w - 36) // 2, "Entrée: Ouvrir | Échap/Q: Retour", curses.color_pair(2))
\ No newline at end of file
@@ -0,0 +1,67 @@
+# -- coding: utf-8 --
+
+import codecs
+import os
+
+READ_LIMIT = 4 * 1024 * 1024 # Octets lus au plus par vérification : un fichier qui grossit très vite ne fige pas l'interface
+
+# Suivi d'un fichier qui grossit, comme tail -f (un journal d'application par exemple).
+# Chaque vérification se contente d'un stat() ; seuls les octets écrits depuis la
+# précédente sont lus, à partir du dernier décalage connu : le coût ne dépend pas de la
+# taille du fichier. Un fichier remplacé (rotation : le nom désigne un autre inode) ou
+# raccourci (troncature) est repris depuis le début.
+
+
+class FileFollower:
+    """Texte ajouté à path, dans encoding, depuis le décalage offset où s'est arrêtée la lecture du document.
+
+    `continued` dit si la dernière ligne lue n'était pas terminée : le texte suivant la
+    prolonge. `behind` reste vrai tant que poll() n'a pas tout lu (plus de READ_LIMIT
+    octets d'écart).
+    """
+
+    def __init__(self, path, offset, encoding="utf-8"):
+        self.path, self.offset = path, offset
+        stat = os.stat(path)
+        self._identity, self._mtime = (stat.st_dev, stat.st_ino), stat.st_mtime_ns
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._pending_cr = "" # '\r' en fin de lecture, peut-être la moitié d'un '\r\n'
+        self.continued, self.behind = offset == 0 or self._last_byte() != b'\n', False
+
+    def _last_byte(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset - 1)
+            return f.read(1)
+
+    def poll(self):
+        """Lit ce qui a été écrit depuis l'appel précédent ; retourne None si rien n'a changé, sinon (reset, lines).
+
+        reset : le fichier a été remplacé ou tronqué, lines est tout son contenu. Sinon,
+        lines s'ajoute au document, sa première ligne prolongeant la dernière si `continued`
+        était vrai avant l'appel.
+        """
+        try: stat = os.stat(self.path)
+        except OSError: return None # Entre le renommage et la création du nouveau fichier : on attendra
+        identity = (stat.st_dev, stat.st_ino)
+        reset = identity != self._identity or stat.st_size < self.offset
+        if not reset and stat.st_size == self.offset and stat.st_mtime_ns == self._mtime: return None
+        if reset:
+            self._identity, self.offset, self._pending_cr = identity, 0, ""
+            self._decoder.reset()
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(min(stat.st_size - self.offset, READ_LIMIT))
+        except OSError: return None
+        self.offset += len(data)
+        self._mtime, self.behind = stat.st_mtime_ns, self.offset < stat.st_size
+        if not data and not reset: return None # Date changée, rien d'ajouté
+        text = self._pending_cr + self._decoder.decode(data)
+        self._pending_cr = ""
+        if text.endswith('\r'): text, self._pending_cr = text[:-1], '\r'
+        if not text and not reset: return None # Seulement un '\r' en attente, ou un caractère pas encore complet
+        lines = text.replace('\r\n', '\n').split('\n')
+        ended = len(lines) > 1 and lines[-1] == "" # Le texte finit par un saut de ligne
+        if ended: lines.pop()
+        self.continued = not ended
+        return reset, lines
@@ -0,0 +1,137 @@
+# -- coding: utf-8 --
+
+import curses
+import mmap
+import os
+import re
+
+from .project_search import BINARY_SNIFF
+from .text_format import detect_bom
+
+ROW_BYTES = 16
+SEARCH_SLICE = 32 * 1024 * 1024 # Octets examinés entre deux mises à jour de la progression d'une recherche
+
+# Vue hexadécimale des fichiers binaires (ou illisibles dans l'encodage de leur BOM). Le fichier
+# est mappé en mémoire et seules les lignes visibles sont lues et mises en forme : la
+# mémoire utilisée et le temps d'ouverture ne dépendent pas de sa taille.
+
+def is_binary(path):
+    """Vrai si le début du fichier contient un octet nul, signe d'un fichier binaire (sauf texte UTF-16 ou UTF-32 annoncé par une BOM)."""
+    try:
+        with open(path, 'rb') as f: data = f.read(BINARY_SNIFF)
+    except OSError: return False
+    return b'\0' in data and detect_bom(data)[1] is None
+
+def parse_hex(text):
+    """Octets d'un motif saisi en hexadécimal ("7f 45 4c 46", "7f454c46"), ou None s'il n'est pas valide."""
+    digits = re.sub(r'\s+', '', text)
+    if digits.lower().startswith('0x'): digits = digits[2:]
+    if not digits or len(digits) % 2: return None
+    try: return bytes.fromhex(digits)
+    except ValueError: return None
+
+def parse_offset(text, current):
+    """Décalage saisi : décimal, hexadécimal (0x... ou suffixe h), relatif avec + ou - ; None s'il n'est pas valide."""
+    text = text.strip().lower()
+    sign = text[:1] if text[:1] in '+-' else ''
+    text = text[len(sign):].strip()
+    try:
+        if text.startswith('0x'): value = int(text[2:], 16)
+        elif text.endswith('h'): value = int(text[:-1], 16)
+        else: value = int(text, 10)
+    except ValueError: return None
+    return current + value if sign == '+' else current - value if sign == '-' else value
+
+def _runs(attrs):
+    """Suites d'octets consécutifs de même attribut : (premier, fin, attribut)."""
+    first = 0
+    for j in range(1, len(attrs) + 1):
+        if j == len(attrs) or attrs[j] != attrs[first]:
+            yield first, j, attrs[first]
+            first = j
+
+
+class HexView:
+    """Contenu d'un fichier en hexadécimal et ASCII, ROW_BYTES octets par ligne, avec un curseur sur un octet."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.size = os.fstat(f.fileno()).st_size
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b"" # Un fichier vide ne se mappe pas
+        self.cursor, self.top_row = 0, 0
+        self.pattern, self.match = None, None # Dernier motif cherché, et position de l'occurrence trouvée
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap): self._mm.close()
+
+    def offset_width(self): return max(8, len(f"{self.size:x}"))
+
+    def row_bytes(self, width):
+        """ROW_BYTES octets par ligne, ou moitié moins si la fenêtre est trop étroite."""
+        return ROW_BYTES if width >= self.offset_width() + 4 * ROW_BYTES + 8 else ROW_BYTES // 2
+
+    def goto(self, offset):
+        self.cursor = max(0, min(offset, self.size - 1)) if self.size else 0
+
+    def move(self, key, rows, per_row):
+        """Déplace le curseur selon une touche de navigation ; retourne False si la touche n'en est pas une."""
+        steps = {curses.KEY_LEFT: -1, curses.KEY_RIGHT: 1, curses.KEY_UP: -per_row, curses.KEY_DOWN: per_row,
+                 curses.KEY_PPAGE: -per_row * rows, curses.KEY_NPAGE: per_row * rows}
+        if key in steps:
+            target = self.cursor + steps[key]
+            if 0 <= target < self.size: self.cursor = target
+            elif key in (curses.KEY_PPAGE, curses.KEY_NPAGE): self.goto(target) # Une page au-delà : jusqu'au bout
+        elif key == curses.KEY_HOME: self.cursor -= self.cursor % per_row
+        elif key == curses.KEY_END: self.goto(self.cursor - self.cursor % per_row + per_row - 1)
+        else: return False
+        return True
+
+    def find(self, pattern, start, backward=False, progress=None):
+        """Première occurrence de pattern à partir de start (dernière avant start si backward), cherchée par tranches de SEARCH_SLICE.
+
+        Retourne sa position, ou None. progress(fraction) est appelé entre deux tranches ;
+        s'il retourne False la recherche est abandonnée.
+        """
+        mm, size, n = self._mm, self.size, len(pattern)
+        if backward:
+            end = start # Occurrences qui commencent dans [start, end)
+            while end > 0:
+                start = max(0, end - SEARCH_SLICE)
+                found = mm.rfind(pattern, start, min(size, end + n - 1))
+                if found != -1: return found
+                end = start
+                if end > 0 and progress is not None and progress(1 - end / size) is False: return None
+            return None
+        while start < size:
+            end = min(size, start + SEARCH_SLICE)
+            found = mm.find(pattern, start, min(size, end + n - 1)) # Une occurrence à cheval sur deux tranches compte
+            if found != -1: return found
+            start = end
+            if start < size and progress is not None and progress(start / size) is False: return None
+        return None
+
+    def draw(self, stdscr, top, height, width):
+        """Dessine les lignes visibles sur height lignes de l'écran à partir de top, entre les bords de la fenêtre."""
+        per_row = self.row_bytes(width)
+        cursor_row = self.cursor // per_row
+        if cursor_row < self.top_row: self.top_row = cursor_row
+        if cursor_row >= self.top_row + height: self.top_row = cursor_row - height + 1
+        offset_width = self.offset_width()
+        hex_col = 2 + offset_width + 2
+        ascii_col = hex_col + 3 * per_row + 2
+        match = range(self.match, self.match + len(self.pattern)) if self.match is not None else range(0)
+        half = per_row // 2
+        for i in range(height):
+            start = (self.top_row + i) * per_row
+            if start >= self.size and (start or self.size): break
+            data = self._mm[start:start + per_row]
+            stdscr.addstr(top + i, 2, f"{start:0{offset_width}x}", curses.color_pair(3) | curses.A_DIM)
+            hex_text = ''.join(f"{byte:02x} " + (" " if j == half - 1 else "") for j, byte in enumerate(data)) # Un espace de plus au milieu
+            ascii_text = ''.join(chr(byte) if 32 <= byte < 127 else '.' for byte in data)
+            attrs = [curses.A_REVERSE if offset == self.cursor else curses.A_BOLD | curses.A_UNDERLINE if offset in match else
+                     curses.A_DIM if byte == 0 else 0 for offset, byte in enumerate(data, start)]
+            for first, end, attr in _runs(attrs): # Un appel par suite d'octets de même aspect
+                x, last_x = 3 * first + (first >= half), 3 * (end - 1) + (end - 1 >= half) + 2
+                stdscr.addstr(top + i, hex_col + x, hex_text[x:last_x], attr)
+                stdscr.addstr(top + i, ascii_col + first, ascii_text[first:end], attr)
@@ -0,0 +1,249 @@
+# -- coding: utf-8 --
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from .buffer import ChunkedList
+
+MAX_EAGER_RELEX = 100 # Lignes re-colorées au plus pendant une édition avant de passer la main au fil de fond
+MAX_SYNC_WALK = 100 # Lignes colorées au plus pendant le dessin ; au-delà, la ligne attend le fil de fond
+MAX_WALK = 2000 # Au-delà, on recolore à partir d'un état neutre plutôt que depuis le début
+RESYNC_CONTEXT = 200
+LOOKAHEAD = 1000 # Lignes colorées d'avance sous la zone visible
+BATCH_SIZE = 16 # Lignes colorées par lot ; le fil de fond rend la main entre deux lots
+
+# Levé tant que l'interface attend une touche : les fils de fond ne colorent que pendant
+# ce temps, et ne disputent donc jamais le GIL au traitement d'une touche ou au dessin.
+ui_idle = threading.Event()
+ui_idle.set()
+
+class TokenCache:
+    """Cache LRU (lexer, état d'entrée, texte de la ligne) -> (tokens, état de sortie).
+
+    Il est partagé par tous les fichiers ouverts ; hit_rate permet d'en régler la taille.
+    """
+
+    def __init__(self, maxsize=20000):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self): return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > maxsize: self._entries.popitem(last=False)
+
+    def lex(self, lexer, line, state):
+        key = (lexer, state, line)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = lexer(line, state)
+        with self._lock:
+            self._entries[key] = result
+            if len(self._entries) > self.maxsize: self._entries.popitem(last=False)
+        return result
+
+token_cache = TokenCache()
+
+class _HighlightWorker(threading.Thread):
+    """Colore en arrière-plan, par lots, les lignes demandées par un LineHighlighter.
+
+    Le verrou du tampon n'est pris que pour lire un lot et ranger le résultat : la
+    coloration elle-même se fait sans, pour que l'interface n'attende jamais le fil.
+    Celui-ci ne garde qu'une référence faible vers le colorieur et s'arrête de
+    lui-même quand l'éditeur est fermé.
+    """
+
+    def __init__(self, highlighter):
+        super().__init__(daemon=True)
+        self._highlighter, self._wakeup = weakref.ref(highlighter), highlighter._wakeup
+
+    def run(self):
+        while True:
+            ui_idle.wait()
+            with self._wakeup:
+                highlighter = self._highlighter()
+                if highlighter is None: return
+                batch = highlighter._next_batch()
+                if batch is None:
+                    del highlighter
+                    self._wakeup.wait(1.0)
+                    continue
+            lexer, (generation, start, state, lines, entries) = highlighter.lexer, batch
+            results = []
+            for line, entry in zip(lines, entries):
+                if entry is None or entry[0] != state:
+                    tokens, end_state = token_cache.lex(lexer, line, state)
+                    entry = (state, end_state, tokens)
+                    results.append(entry)
+                else: results.append(None) # Déjà juste
+                state = entry[1]
+            with self._wakeup: highlighter._store_batch(generation, start, results)
+            del highlighter
+            time.sleep(0) # Rend la main tout de suite si une touche vient d'arriver
+
+class LineHighlighter:
+    """Cache de coloration ligne par ligne pour un TextBuffer.
+
+    Chaque ligne garde (état d'entrée, état de sortie, tokens). Toutes les lignes
+    avant `_valid` sont à jour ; après une édition, on recolore à partir de la
+    ligne modifiée jusqu'à retrouver une ligne dont l'état d'entrée n'a pas changé.
+    Au-delà de quelques lignes, ce travail revient à un fil de fond qui colore
+    d'abord les zones visibles (set_viewports) puis la suite ; tokens() retourne None
+    pour une ligne qui n'est pas encore prête. Le fil partage le verrou du tampon.
+    on_change(début, fin) est appelé, depuis le fil de l'interface, pour les lignes
+    dont l'aspect change (fin None : jusqu'à la fin du fichier) ; les changements
+    faits en arrière-plan sont transmis par flush_changes().
+    """
+
+    def __init__(self, buffer, lexer):
+        self.buffer, self.lexer = buffer, lexer
+        self.on_change = None
+        self._entries = ChunkedList([None] * len(buffer))
+        self._valid = 0
+        self._generation = 0 # Change à chaque édition : un lot préparé avant est alors ignoré
+        self._viewports = [(0, 0)] # Zones affichées, par priorité (celle de la vue active d'abord)
+        self._changes = []
+        self._wakeup = threading.Condition(buffer.lock)
+        buffer.add_listener(self._on_edit)
+        _HighlightWorker(self).start()
+
+    def _sync_length(self, length):
+        """Suit les lignes ajoutées au tampon par l'indexation en arrière-plan."""
+        missing = length - len(self._entries)
+        if missing > 0: self._entries.append_lazy(missing, lambda: [None] * missing)
+
+    def _lex(self, line_idx, state):
+        tokens, end_state = token_cache.lex(self.lexer, self.buffer[line_idx], state)
+        entry = (state, end_state, tokens)
+        self._entries[line_idx] = entry
+        return entry
+
+    def _state_before(self, line_idx):
+        return self._entries[line_idx - 1][1] if line_idx else None
+
+    def _on_edit(self, start, old_lines, new_lines):
+        # Appelé sous le verrou du tampon : le fil de fond ne voit jamais le cache décalé
+        self._sync_length(len(self.buffer) - len(new_lines) + len(old_lines))
+        self._entries.splice(start, start + len(old_lines), [None] * len(new_lines))
+        old_valid, self._valid = self._valid, min(self._valid, start)
+        self._generation += 1
+        self._wakeup.notify()
+        if old_valid < start: return # Cette zone n'a jamais été colorée de façon fiable
+        end = start + len(new_lines)
+        valid_after = old_valid + len(new_lines) - len(old_lines) if old_valid >= start + len(old_lines) else end
+        state, line_idx = self._state_before(start), start
+        while line_idx < min(len(self.buffer), start + MAX_EAGER_RELEX):
+            entry = self._entries[line_idx]
+            if line_idx >= end:
+                if entry is None: break # Jamais colorée : elle le sera à la demande
+                if entry[0] == state: # L'état a convergé, la suite du cache reste juste
+                    self._valid = max(line_idx, valid_after)
+                    return
+                if self.on_change: self.on_change(line_idx, line_idx + 1)
+            state = self._lex(line_idx, state)[1]
+            line_idx += 1
+        self._valid = line_idx # Le fil de fond reprend à partir d'ici
+
+    def _viewport_work(self, first, last):
+        """Vrai si la zone [first:last] attend encore des lignes colorées."""
+        last = min(last, len(self.buffer))
+        if first - self._valid > MAX_WALK:
+            return any(self._entries[idx] is None for idx in range(first, last))
+        return self._valid < min(len(self.buffer), last + LOOKAHEAD)
+
+    def _catch_up_end(self):
+        """Ligne jusqu'où avancer `_valid` une fois les zones visibles servies : sous la plus basse.
+
+        C'est ce parcours qui vérifie les lignes colorées depuis un état neutre après un
+        saut lointain ; celles dont l'état d'entrée réel diffère sont recolorées et signalées.
+        """
+        return min(len(self.buffer), max(last for _, last in self._viewports) + LOOKAHEAD)
+
+    def _has_work(self):
+        self._sync_length(len(self.buffer))
+        return any(self._viewport_work(first, last) for first, last in self._viewports) or self._valid < self._catch_up_end()
+
+    def _report(self, start, end):
+        if self._changes and self._changes[-1][1] == start: self._changes[-1] = (self._changes[-1][0], end)
+        else: self._changes.append((start, end))
+
+    def _next_batch(self):
+        """Prépare (sous le verrou) le prochain lot du fil de fond, ou retourne None s'il n'y a rien à faire."""
+        self._sync_length(len(self.buffer))
+        viewport = next((v for v in self._viewports if self._viewport_work(*v)), None) # La plus prioritaire qui attend
+        if viewport is not None and viewport[0] - self._valid > MAX_WALK:
+            # Saut lointain : on part d'un état neutre quelques lignes au-dessus de la zone visible.
+            # Ces entrées restent au-delà de _valid et seront vérifiées quand la frontière les atteindra.
+            first, last = viewport[0], min(viewport[1], len(self.buffer))
+            missing = next(idx for idx in range(first, last) if self._entries[idx] is None)
+            before = self._entries[missing - 1]
+            start = missing if before is not None else missing - RESYNC_CONTEXT
+            state = before[1] if before is not None else None
+            stop = min(last, missing + BATCH_SIZE)
+        else: # Zone visible proche de la frontière, ou toutes servies : on avance la frontière
+            end = min(len(self.buffer), viewport[1] + LOOKAHEAD) if viewport is not None else self._catch_up_end()
+            if self._valid >= end: return None
+            start, stop = self._valid, min(end, self._valid + BATCH_SIZE)
+            state = self._state_before(start)
+        return self._generation, start, state, self.buffer[start:stop], self._entries[start:stop]
+
+    def _store_batch(self, generation, start, results):
+        """Range les entrées calculées par le fil de fond, sauf si le tampon a changé entre-temps."""
+        if generation != self._generation: return
+        for idx, entry in enumerate(results, start):
+            if entry is None: continue
+            self._entries[idx] = entry
+            self._report(idx, idx + 1)
+        if self._valid == start: self._valid = start + len(results)
+
+    def set_viewports(self, viewports):
+        """Indique les zones affichées [first:last], à colorer en priorité et dans cet ordre."""
+        viewports = list(viewports)
+        with self._wakeup:
+            if viewports == self._viewports: return
+            self._viewports = viewports
+            self._wakeup.notify()
+
+    def pending(self):
+        """Vrai tant que le fil de fond a du travail ou des changements non transmis."""
+        with self._wakeup: return bool(self._changes) or self._has_work()
+
+    def flush_changes(self):
+        """Transmet à on_change les lignes colorées en arrière-plan depuis le dernier appel."""
+        with self._wakeup: changes, self._changes = self._changes, []
+        if self.on_change:
+            for start, end in changes: self.on_change(start, end)
+
+    def tokens(self, line_idx):
+        """Retourne les tokens de la ligne, ou None si elle attend encore le fil de fond."""
+        with self._wakeup:
+            self._sync_length(len(self.buffer))
+            if line_idx < self._valid: return self._entries[line_idx][2]
+            if line_idx - self._valid >= MAX_SYNC_WALK:
+                entry = self._entries[line_idx]
+                return entry[2] if entry is not None else None
+            state = self._state_before(self._valid)
+            for idx in range(self._valid, line_idx + 1):
+                entry = self._entries[idx]
+                if entry is None or entry[0] != state:
+                    entry = self._lex(idx, state)
+                    if idx < line_idx: self._report(idx, idx + 1) # Peut-être déjà affichée avec d'anciens tokens
+                state = entry[1]
+            self._valid = line_idx + 1
+            return self._entries[line_idx][2]
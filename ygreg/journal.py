@@ -0,0 +1,176 @@
+# -- coding: utf-8 --
+
+import os
+import shutil
+import struct
+import threading
+import zlib
+from array import array
+from functools import partial
+
+# Journal de récupération : un fichier caché à côté du document, où chaque appel à
+# TextBuffer.replace() est ajouté sous forme d'enregistrement binaire. En cas de plantage,
+# le document sur disque plus le journal redonnent le texte. Format :
+#   en-tête      MAGIC, taille et mtime (ns) du document auquel s'appliquent les éditions
+#   enregistrement  début, nb de lignes retirées, nb de lignes insérées, taille du texte,
+#                   texte UTF-8 (lignes jointes par '\n'), CRC32 de ce qui précède
+# Un enregistrement incomplet ou corrompu (plantage pendant l'écriture) termine le journal.
+
+MAGIC = b"YGJ1"
+_HEADER = struct.Struct("<4sqq")
+_RECORD = struct.Struct("<IIII")
+_CRC = struct.Struct("<I")
+FLUSH_INTERVAL = 0.2 # Secondes entre deux écritures (et fsync) groupées
+
+def journal_path(document_path):
+    directory, name = os.path.split(os.path.abspath(document_path))
+    return os.path.join(directory, f".{name}.ygreg-journal")
+
+def _document_id(document_path):
+    """(taille, mtime en ns) du document sur disque, ou (-1, 0) s'il n'existe pas encore."""
+    try: st = os.stat(document_path)
+    except FileNotFoundError: return -1, 0
+    return st.st_size, st.st_mtime_ns
+
+def _encode(start, old_count, new_lines):
+    payload = '\n'.join(new_lines).encode('utf-8')
+    record = _RECORD.pack(start, old_count, len(new_lines), len(payload)) + payload
+    return record + _CRC.pack(zlib.crc32(record))
+
+def _read_records(data, pos):
+    """Décode les enregistrements valides à partir de pos ; produit (fin, début, nb retirées, nouvelles lignes)."""
+    while pos + _RECORD.size <= len(data):
+        start, old_count, new_count, size = _RECORD.unpack_from(data, pos)
+        end = pos + _RECORD.size + size
+        if end + _CRC.size > len(data) or _CRC.unpack_from(data, end)[0] != zlib.crc32(data[pos:end]): return
+        text = data[pos + _RECORD.size:end].decode('utf-8')
+        yield end + _CRC.size, start, old_count, (text.split('\n') if new_count else [])
+        pos = end + _CRC.size
+
+def _wait_for_line(buffer, y):
+    buffer.wait_for_line(y)
+    return True
+
+
+class RecoveryCancelled(Exception):
+    """Rejeu du journal abandonné en attendant l'indexation : le tampon est remis comme sur disque, le journal est gardé."""
+
+
+class Journal:
+    """Journal des éditions d'un document, écrit et synchronisé sur disque par un fil dédié.
+
+    À la création, un journal laissé par une session interrompue est rejoué dans le
+    tampon (`recovered` donne le nombre d'éditions rejouées) s'il correspond toujours
+    au document sur disque ; wait(y), qui attend que la ligne y soit indexée, peut
+    retourner False pour abandonner le rejeu (RecoveryCancelled). Après une sauvegarde
+    réussie, checkpoint() repart du nouveau document en ne gardant que les éditions
+    postérieures à l'instantané sauvegardé.
+    """
+
+    def __init__(self, document_path, buffer, wait=None):
+        self.document_path, self.path = document_path, journal_path(document_path)
+        self._cond = threading.Condition()
+        self._pending = bytearray() # Octets pas encore écrits
+        # Éditions depuis le dernier point de reprise : seule la position de leur fin dans le
+        # fichier est gardée en mémoire, checkpoint() recopie les enregistrements depuis le disque
+        self._ends = array('q') # Fin de l'enregistrement numéro _base + 1 + i
+        self._count = self._base = 0
+        self._checkpoint, self._closed = None, False
+        self.recovered, valid_end = self._replay(buffer, wait or partial(_wait_for_line, buffer))
+        self._start = self._size = valid_end or _HEADER.size # Début des éditions de cette session, taille du journal
+        if self.recovered:
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(valid_end) # Retire un éventuel enregistrement tronqué
+            self._file.seek(valid_end)
+        else:
+            self._file = open(self.path, 'wb')
+            self._file.write(_HEADER.pack(MAGIC, *_document_id(document_path)))
+            self._file.flush(); os.fsync(self._file.fileno())
+        self._buffer = buffer
+        buffer.add_listener(self._on_edit)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _replay(self, buffer, wait):
+        """Rejoue le journal existant ; retourne (nombre d'éditions, fin de la partie valide)."""
+        try:
+            with open(self.path, 'rb') as f: data = f.read()
+        except FileNotFoundError: return 0, 0
+        if len(data) < _HEADER.size: return 0, 0
+        magic, size, mtime = _HEADER.unpack_from(data)
+        if magic != MAGIC or (size, mtime) != _document_id(self.document_path): return 0, 0 # Document modifié depuis
+        valid_end, undo = _HEADER.size, [] # (début, nb de lignes insérées, lignes retirées) de chaque édition rejouée
+        for valid_end, start, old_count, new_lines in _read_records(data, _HEADER.size):
+            if not wait(start + old_count):
+                for start, count, old_lines in reversed(undo): buffer.replace(start, start + count, old_lines)
+                raise RecoveryCancelled(self.path)
+            if start + old_count > len(buffer): break
+            size = len(buffer)
+            old_lines = buffer.replace(start, start + old_count, new_lines)
+            undo.append((start, len(buffer) - size + old_count, old_lines)) # Un document vidé garde une ligne vide
+        return len(undo), valid_end
+
+    def _on_edit(self, start, old_lines, new_lines):
+        record = _encode(start, len(old_lines), new_lines)
+        with self._cond:
+            self._count += 1
+            self._size += len(record)
+            self._ends.append(self._size)
+            if not self._pending: self._cond.notify() # Le fil n'est réveillé qu'une fois par lot
+            self._pending += record
+
+    def mark(self):
+        """Numéro de la dernière édition journalisée, à passer à checkpoint() après la sauvegarde."""
+        with self._cond: return self._count
+
+    def checkpoint(self, mark):
+        """Le document sur disque contient désormais les éditions jusqu'à mark : le journal repart de là."""
+        with self._cond:
+            self._checkpoint = mark
+            self._cond.notify()
+
+    def close(self, delete=False):
+        """Écrit ce qui reste puis arrête le fil ; delete efface le journal (document sauvegardé ou abandonné)."""
+        self._buffer.remove_listener(self._on_edit)
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._file.close()
+        if delete:
+            try: os.remove(self.path)
+            except FileNotFoundError: pass
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._checkpoint is not None or self._closed)
+                data, self._pending = bytes(self._pending), bytearray()
+                mark, self._checkpoint = self._checkpoint, None
+                if mark is not None: # Le nouveau journal reprend les éditions postérieures à la sauvegarde
+                    mark = max(mark, self._base)
+                    keep = self._ends[mark - self._base - 1] if mark > self._base else self._start
+                closed = self._closed
+            if data:
+                self._file.write(data)
+                self._file.flush(); os.fsync(self._file.fileno())
+            if mark is not None:
+                self._rewrite(keep)
+                with self._cond: # Les éditions arrivées pendant la copie se décalent avec les autres
+                    shift = keep - _HEADER.size
+                    self._ends = array('q', (end - shift for end in self._ends[mark - self._base:]))
+                    self._base, self._start, self._size = mark, _HEADER.size, self._size - shift
+            if closed: return
+            with self._cond: self._cond.wait_for(lambda: self._closed, FLUSH_INTERVAL) # Regroupe les écritures
+
+    def _rewrite(self, keep):
+        """Remplace le journal par un nouveau, sur le document sauvegardé, qui ne garde que ses enregistrements à partir de keep."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f, open(self.path, 'rb') as old:
+            f.write(_HEADER.pack(MAGIC, *_document_id(self.document_path)))
+            old.seek(keep)
+            shutil.copyfileobj(old, f)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._file.close()
+        self._file = open(self.path, 'ab')
@@ -0,0 +1,52 @@
+# -- coding: utf-8 --
+
+import curses
+from ..constants import OPERATORS
+from ..syntax import WORD, master_regex, emit, close_block, scan
+
+KEYWORDS = {
+    "auto", "break", "case", "char", "const", "continue", "default", "do", "double", "else", "enum",
+    "extern", "float", "for", "goto", "if", "inline", "int", "long", "register", "return", "short",
+    "signed", "sizeof", "static", "struct", "switch", "typedef", "union", "unsigned", "void", "volatile",
+    "while", "bool", "true", "false", "NULL", "nullptr", "class", "public", "private", "protected",
+    "virtual", "template", "typename", "namespace", "using", "new", "delete", "this", "throw", "try",
+    "catch", "operator", "override", "final", "import", "package", "extends", "implements",
+    "interface", "abstract", "boolean", "byte", "super", "null"
+}
+
+def c_family(keywords, preprocessor=False, raw_strings=False):
+    """Construit la fonction de coloration d'un langage à la C.
+
+    Commentaires // et /* */ (l'état '/*' couvre un bloc sur plusieurs lignes), chaînes,
+    caractères, nombres et mots-clés ; en option les directives #include... et les chaînes
+    brutes `...` de Go (état '`').
+    """
+    rules = {'comment': r"//.*|/\*.*?\*/", 'comment_open': r"/\*.*"}
+    if raw_strings: rules.update(raw=r"`.*?`", raw_open=r"`.*")
+    if preprocessor: rules['directive'] = r"^\s*#\s*\w+"
+    rules.update(string=r'"(?:\\.|[^"\\])*"', char=r"'(?:\\[^']*|[^'\\])'", number=r"\b\d+(?:\.\d+)?\w*",
+                 word=WORD, operator=OPERATORS)
+    regex = master_regex(**rules)
+    styles = {'comment': 5, 'comment_open': 5, 'raw': 4, 'raw_open': 4, 'directive': 13,
+              'string': 4, 'char': 4, 'number': 8, 'operator': 7}
+    openers = {'comment_open': '/*', 'raw_open': '`'}
+
+    def highlight(line, state=None):
+        result = []
+        if state:
+            result, line = close_block(line, '*/' if state == '/*' else '`', 5 if state == '/*' else 4)
+            if line is None: return tuple(result), state
+            state = None
+        def classify(kind, text):
+            nonlocal state
+            if kind == 'word':
+                if text in keywords: emit(result, text, 15, curses.A_BOLD)
+                else: emit(result, text)
+                return
+            state = openers.get(kind, state)
+            emit(result, text, styles[kind])
+        scan(regex, line, result, classify)
+        return tuple(result), state
+    return highlight
+
+highlight = c_family(KEYWORDS, preprocessor=True)
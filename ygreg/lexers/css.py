@@ -0,0 +1,32 @@
+# -- coding: utf-8 --
+
+from ..constants import CSS_PROPERTIES
+from ..syntax import master_regex, emit, close_block, scan
+
+_CSS = master_regex(
+    comment=r"/\*.*?\*/", comment_open=r"/\*.*", string=r'".*?"', number=r"\d+\w*",
+    punct=r"[{}\[\]:;,+]", space=r"\s+", word=r'[^{}\[\]:;,\s+"/]+')
+_MODES = {'{': 'property', '}': 'selector', ':': 'value', ';': 'property'}
+
+def highlight(line, state=None):
+    """Colore une ligne CSS. L'état est (position dans la règle, dans un commentaire ?)."""
+    mode, in_comment = state or ('selector', False)
+    result = []
+    if in_comment:
+        result, line = close_block(line, '*/', 5)
+        if line is None: return tuple(result), (mode, True)
+        in_comment = False
+    def classify(kind, text):
+        nonlocal mode, in_comment
+        color_pair_num = 0
+        if kind in ('comment', 'comment_open'):
+            color_pair_num = 5
+            in_comment = kind == 'comment_open'
+        elif kind == 'string': color_pair_num = 4
+        elif kind == 'number' or text.startswith('#'): color_pair_num = 8
+        elif kind == 'word' and mode == 'property' and text in CSS_PROPERTIES: color_pair_num = 16
+        elif mode == 'selector' and kind != 'space' and text not in '{};:': color_pair_num = 6
+        if kind == 'punct': mode = _MODES.get(text, mode)
+        emit(result, text, color_pair_num)
+    scan(_CSS, line, result, classify)
+    return tuple(result), (mode, in_comment)
@@ -0,0 +1,36 @@
+# -- coding: utf-8 --
+
+import re
+from ..syntax import emit
+
+# Une couleur par colonne, en boucle, pour suivre une colonne d'un coup d'œil
+_COLUMN_COLORS = (0, 4, 6, 8, 16, 15, 13, 14)
+_FIELD = re.compile(r'(?P<quoted>"(?:[^"]|"")*")|(?P<open>"(?:[^"]|"")*$)|(?P<plain>[^,]*)')
+_QUOTED_END = re.compile(r'(?:[^"]|"")*"')
+
+def _color(column): return _COLUMN_COLORS[column % len(_COLUMN_COLORS)]
+
+def highlight(line, state=None):
+    """Colore une ligne CSV par colonne. L'état est la colonne d'un champ entre guillemets resté ouvert."""
+    result, column, pos = [], 0, 0
+    if state is not None:
+        column = state
+        end = _QUOTED_END.match(line)
+        if end is None: return ((line, _color(column), 0),) if line else (), column
+        emit(result, end.group(), _color(column))
+        pos = end.end()
+    else:
+        field = _FIELD.match(line)
+        if field.group(): emit(result, field.group(), _color(column))
+        if field.lastgroup == 'open': return tuple(result), column
+        pos = field.end()
+    while pos < len(line):
+        if line[pos] == ',':
+            emit(result, ',', 7); column += 1; pos += 1
+        field = _FIELD.match(line, pos)
+        if field.group(): emit(result, field.group(), _color(column))
+        if field.lastgroup == 'open': return tuple(result), column
+        if field.end() == pos and pos < len(line) and line[pos] != ',':
+            emit(result, line[pos]); pos += 1 # Guillemet mal placé : on avance d'un caractère
+        else: pos = field.end()
+    return tuple(result), None
@@ -0,0 +1,12 @@
+# -- coding: utf-8 --
+
+from .c import c_family
+
+KEYWORDS = {
+    "break", "case", "chan", "const", "continue", "default", "defer", "else", "fallthrough", "for",
+    "func", "go", "goto", "if", "import", "interface", "map", "package", "range", "return", "select",
+    "struct", "switch", "type", "var", "true", "false", "nil", "iota", "bool", "string", "int", "int64",
+    "uint", "uint64", "byte", "rune", "float64", "error", "any"
+}
+
+highlight = c_family(KEYWORDS, raw_strings=True)
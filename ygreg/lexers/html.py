@@ -0,0 +1,22 @@
+# -- coding: utf-8 --
+
+from ..syntax import master_regex, emit, close_block, scan
+
+_HTML = master_regex(
+    comment=r"<!--.*?-->", comment_open=r"<!--.*", tag=r"<[^>]+>", tag_open=r"<[^>]*$", entity=r"&[a-zA-Z0-9]+;")
+
+def highlight(line, state=None):
+    """Colore une ligne HTML. L'état vaut 'comment' dans un <!-- -->, 'tag' dans une balise non fermée."""
+    result = []
+    if state:
+        result, line = close_block(line, '-->' if state == 'comment' else '>', 5 if state == 'comment' else 13)
+        if line is None: return tuple(result), state
+        state = None
+    def classify(kind, text):
+        nonlocal state
+        if kind == 'entity': emit(result, text, 8); return
+        if kind == 'comment_open': state = 'comment'
+        elif kind == 'tag_open': state = 'tag'
+        emit(result, text, 5 if kind.startswith('comment') or text.startswith('<!DOCTYPE') else 13)
+    scan(_HTML, line, result, classify)
+    return tuple(result), state
@@ -0,0 +1,29 @@
+# -- coding: utf-8 --
+
+import curses
+from ..constants import JS_KEYWORDS, OPERATORS
+from ..syntax import WORD, master_regex, emit, close_block, scan
+
+_JS = master_regex(
+    comment=r"//.*|/\*.*?\*/", comment_open=r"/\*.*", template=r"`.*?`", template_open=r"`.*",
+    string=r"'.*?'|\".*?\"", number=r"\b\d+\b", word=WORD, operator=OPERATORS)
+_STYLES = {'comment': 5, 'comment_open': 5, 'template': 4, 'template_open': 4, 'string': 4, 'number': 8, 'operator': 7}
+_OPENERS = {'comment_open': '/*', 'template_open': '`'}
+
+def highlight(line, state=None):
+    """Colore une ligne JavaScript. L'état vaut '/*' dans un commentaire bloc, '`' dans un gabarit."""
+    result = []
+    if state:
+        result, line = close_block(line, '*/' if state == '/*' else '`', 5 if state == '/*' else 4)
+        if line is None: return tuple(result), state
+        state = None
+    def classify(kind, text):
+        nonlocal state
+        if kind == 'word':
+            if text in JS_KEYWORDS: emit(result, text, 15, curses.A_BOLD)
+            else: emit(result, text)
+            return
+        state = _OPENERS.get(kind, state)
+        emit(result, text, _STYLES[kind])
+    scan(_JS, line, result, classify)
+    return tuple(result), state
@@ -0,0 +1,14 @@
+# -- coding: utf-8 --
+
+from ..syntax import master_regex, emit, scan
+
+_JSON = master_regex(
+    key=r'"[^"]*"\s*:', string=r'"[^"]*"', literal=r"\b(?:true|false|null)\b",
+    number=r"\d+(?:\.\d*)?", punct=r"[{}\[\]:,]")
+_STYLES = {'key': 16, 'string': 4, 'literal': 15, 'number': 8, 'punct': 7}
+
+def highlight(line, state=None):
+    """Colore une ligne JSON (sans état : une ligne ne dépend pas des précédentes)."""
+    result = []
+    scan(_JSON, line, result, lambda kind, text: emit(result, text, _STYLES[kind]))
+    return tuple(result), None
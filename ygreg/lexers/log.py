@@ -0,0 +1,19 @@
+# -- coding: utf-8 --
+
+import curses
+from ..syntax import master_regex, emit, scan
+
+_LOG = master_regex(
+    error=r"\b(?:ERROR|ERR|FATAL|CRITICAL|SEVERE|PANIC)\b", warning=r"\b(?:WARN|WARNING)\b",
+    info=r"\b(?:INFO|NOTICE)\b", debug=r"\b(?:DEBUG|TRACE)\b",
+    timestamp=r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?",
+    string=r'"[^"]*"', number=r"\b\d+(?:\.\d+)?\b")
+_STYLES = {'error': (12, curses.A_BOLD), 'warning': (9, curses.A_BOLD), 'info': (10, curses.A_NORMAL),
+           'debug': (5, curses.A_NORMAL), 'timestamp': (14, curses.A_NORMAL), 'string': (4, curses.A_NORMAL),
+           'number': (8, curses.A_NORMAL)}
+
+def highlight(line, state=None):
+    """Colore une ligne de journal : niveaux, horodatages, chaînes et nombres (sans état)."""
+    result = []
+    scan(_LOG, line, result, lambda kind, text: emit(result, text, *_STYLES[kind]))
+    return tuple(result), None
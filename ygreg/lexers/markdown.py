@@ -0,0 +1,30 @@
+# -- coding: utf-8 --
+
+import curses
+import re
+from ..syntax import master_regex, emit, scan
+
+_FENCE = re.compile(r"\s*(```|~~~)")
+_BLOCK = re.compile(r"(?P<heading>#{1,6}\s.*)|(?P<quote>\s*>.*)|(?P<item>\s*(?:[-*+]|\d+\.)\s)")
+_INLINE = master_regex(
+    code=r"`[^`]+`", strong=r"\*\*[^*]+\*\*|__[^_]+__", emphasis=r"\*[^*\s][^*]*\*|\b_[^_\s][^_]*_\b",
+    link=r"!?\[[^\]]*\]\([^)]*\)")
+_STYLES = {'code': (4, curses.A_NORMAL), 'strong': (0, curses.A_BOLD), 'emphasis': (0, curses.A_UNDERLINE),
+           'link': (13, curses.A_NORMAL)}
+
+def highlight(line, state=None):
+    """Colore une ligne Markdown. L'état est le délimiteur d'un bloc de code ouvert (``` ou ~~~)."""
+    fence = _FENCE.match(line)
+    if state:
+        if fence and fence.group(1) == state: state = None
+        return ((line, 4, curses.A_NORMAL),) if line else (), state
+    if fence: return ((line, 4, curses.A_NORMAL),), fence.group(1)
+    result = []
+    block = _BLOCK.match(line)
+    if block and block.lastgroup == 'heading': return ((line, 6, curses.A_BOLD),), None
+    if block and block.lastgroup == 'quote': return ((line, 5, curses.A_NORMAL),), None
+    if block: # Puce de liste
+        emit(result, block.group(), 7)
+        line = line[block.end():]
+    scan(_INLINE, line, result, lambda kind, text: emit(result, text, *_STYLES[kind]))
+    return tuple(result), None
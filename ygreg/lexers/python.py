@@ -0,0 +1,28 @@
+# -- coding: utf-8 --
+
+import curses
+from ..constants import PYTHON_KEYWORDS, OPERATORS
+from ..syntax import WORD, master_regex, emit, close_block, scan
+
+_PYTHON = master_regex(
+    triple=r"'''.*?'''|\"\"\".*?\"\"\"", triple_open=r"'''.*|\"\"\".*", string=r"'.*?'|\".*?\"",
+    comment=r"#.*", number=r"\b\d+\b", word=WORD, operator=OPERATORS)
+_STYLES = {'triple': 4, 'triple_open': 4, 'string': 4, 'comment': 5, 'number': 8, 'operator': 7}
+
+def highlight(line, state=None):
+    """Colore une ligne Python. L'état est le délimiteur d'une chaîne triple restée ouverte."""
+    result = []
+    if state:
+        result, line = close_block(line, state, 4)
+        if line is None: return tuple(result), state
+        state = None
+    def classify(kind, text):
+        nonlocal state
+        if kind == 'word':
+            if text in PYTHON_KEYWORDS: emit(result, text, 6, curses.A_BOLD)
+            else: emit(result, text)
+            return
+        if kind == 'triple_open': state = text[:3]
+        emit(result, text, _STYLES[kind])
+    scan(_PYTHON, line, result, classify)
+    return tuple(result), state
@@ -0,0 +1,12 @@
+# -- coding: utf-8 --
+
+from .c import c_family
+
+KEYWORDS = {
+    "as", "async", "await", "break", "const", "continue", "crate", "dyn", "else", "enum", "extern",
+    "false", "fn", "for", "if", "impl", "in", "let", "loop", "match", "mod", "move", "mut", "pub", "ref",
+    "return", "self", "Self", "static", "struct", "super", "trait", "true", "type", "unsafe", "use",
+    "where", "while", "Some", "None", "Ok", "Err"
+}
+
+highlight = c_family(KEYWORDS)
@@ -0,0 +1,33 @@
+# -- coding: utf-8 --
+
+import curses
+from ..syntax import WORD, master_regex, emit, close_block, scan
+
+KEYWORDS = {
+    "if", "then", "else", "elif", "fi", "for", "while", "until", "do", "done", "case", "esac", "in",
+    "function", "return", "export", "local", "readonly", "set", "unset", "source", "exit", "break", "continue"
+}
+
+_SHELL = master_regex(
+    comment=r"(?:^|(?<=\s))#.*", single=r"'[^']*'", single_open=r"'[^']*$",
+    double=r'"(?:\\.|[^"\\])*"', double_open=r'"(?:\\.|[^"\\])*$',
+    variable=r"\$\{[^}]*\}|\$\w+|\$[@#?$!*-]", word=WORD, operator=r"[|&;<>()]")
+_STYLES = {'comment': 5, 'single': 4, 'single_open': 4, 'double': 4, 'double_open': 4, 'variable': 8, 'operator': 7}
+
+def highlight(line, state=None):
+    """Colore une ligne de script shell. L'état est le guillemet d'une chaîne restée ouverte."""
+    result = []
+    if state:
+        result, line = close_block(line, state, 4)
+        if line is None: return tuple(result), state
+        state = None
+    def classify(kind, text):
+        nonlocal state
+        if kind == 'word':
+            if text in KEYWORDS: emit(result, text, 6, curses.A_BOLD)
+            else: emit(result, text)
+            return
+        if kind.endswith('_open'): state = text[0]
+        emit(result, text, _STYLES[kind])
+    scan(_SHELL, line, result, classify)
+    return tuple(result), state
@@ -0,0 +1,110 @@
+# -- coding: utf-8 --
+
+import mmap
+import threading
+import weakref
+from functools import partial
+
+from .buffer import TextBuffer
+from .constants import INDEX_BLOCK_SIZE
+from .text_format import GUESSES, SAMPLE_SIZE, detect_bom, guess_encoding, load_text, split_text
+
+def _split_lines(text):
+    lines = text.replace('\r\n', '\n').split('\n')
+    if text.endswith('\n'): lines.pop()
+    return lines
+
+def _load_block(mm, start, end, encoding):
+    """Décode les lignes comprises entre deux débuts de ligne du fichier mappé."""
+    return _split_lines(mm[start:end].decode(encoding, errors='replace'))
+
+def _other_endings(block, file_format):
+    """Fins de ligne d'un bloc d'octets qui diffèrent de la majoritaire du fichier, {ligne du bloc: fin} ; vide (sans décoder) dans le cas courant."""
+    crlf = block.count(b'\r\n')
+    if crlf == (block.count(b'\n') if file_format.newline == "\r\n" else 0): return {}
+    return split_text(block.decode(file_format.encoding, errors='replace'), file_format.newline)[1].others
+
+def _first_invalid(block, encoding):
+    """Position dans block du premier octet que l'encodage ne décode pas, ou None."""
+    if encoding == "latin-1": return None # Décode n'importe quels octets
+    try: block.decode(encoding)
+    except UnicodeDecodeError as e: return e.start
+    return None
+
+def _block_end(data, start, size):
+    """Retourne la position qui suit le dernier saut de ligne de data (lu à partir de start)."""
+    if start + len(data) >= size: return size
+    newline = data.rfind(b'\n')
+    return start + newline + 1 if newline != -1 else None
+
+class _LineIndexer(threading.Thread):
+    """Construit l'index clairsemé des débuts de ligne : un bloc paresseux tous les INDEX_BLOCK_SIZE octets.
+
+    La lecture passe par un descripteur séparé (et non par le mmap) pour que les
+    accès disque ne bloquent pas le GIL, et donc pas l'interface. Chaque bloc est
+    décodé une fois strictement : le premier octet invalide est noté dans le format.
+    """
+
+    def __init__(self, buffer, path, mm, start, file_format):
+        super().__init__(daemon=True)
+        self._buffer, self._path, self._mm, self._start = weakref.ref(buffer), path, mm, start
+        self._format = file_format
+
+    def run(self):
+        start, size = self._start, len(self._mm)
+        try:
+            with open(self._path, 'rb') as f:
+                while start < size:
+                    f.seek(start)
+                    data, end = b"", None
+                    while end is None: # Ligne plus longue qu'un bloc : on lit plus loin
+                        data += f.read(INDEX_BLOCK_SIZE)
+                        end = _block_end(data, start, size)
+                    count = data.count(b'\n', 0, end - start)
+                    if end == size and not data[:end - start].endswith(b'\n'): count += 1
+                    others = _other_endings(data[:end - start], self._format)
+                    if self._format.invalid is None:
+                        invalid = _first_invalid(data[:end - start], self._format.encoding)
+                        if invalid is not None: self._format.invalid = start + invalid
+                    buffer = self._buffer()
+                    if buffer is None: return # L'éditeur a été fermé
+                    with buffer.lock: # Le décalage des numéros de ligne ne doit pas croiser une édition
+                        if others: self._format.add_others(len(buffer), others)
+                        buffer.append_lazy(count, partial(_load_block, self._mm, start, end, self._format.encoding), end)
+                    del buffer
+                    start = end
+        finally:
+            buffer = self._buffer()
+            if buffer is not None: buffer.finish_indexing()
+
+def load_mapped(path):
+    """Ouvre path via mmap : le premier bloc est décodé tout de suite, le reste est indexé en arrière-plan ; retourne (TextBuffer, FileFormat).
+
+    L'encodage (premier des GUESSES qui décode tout le premier bloc) et la fin de ligne
+    majoritaire sont ceux du premier bloc ; les blocs suivants sont décodés à la demande
+    en remplaçant les octets invalides, dont le premier est noté par l'indexation dans
+    FileFormat.invalid. Un fichier UTF-16 ou UTF-32, où un saut de ligne n'est pas un
+    octet seul, est lu par load_text().
+    """
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    bom, encoding = detect_bom(mm[:4])
+    if encoding is not None and encoding != "utf-8":
+        mm.close()
+        return load_text(path)
+    start = len(bom)
+    first_end = _block_end(mm[start:start + INDEX_BLOCK_SIZE], start, len(mm))
+    if first_end is None:
+        newline = mm.find(b'\n', start + INDEX_BLOCK_SIZE)
+        first_end = len(mm) if newline == -1 else newline + 1
+    first = mm[start:first_end]
+    candidates = [encoding] if encoding else GUESSES[GUESSES.index(guess_encoding(mm[:SAMPLE_SIZE])):]
+    encoding = next((encoding for encoding in candidates if _first_invalid(first, encoding) is None), candidates[-1])
+    lines, file_format = split_text(first.decode(encoding, errors='replace'))
+    file_format.encoding, file_format.bom, file_format.final_newline = encoding, bom, mm[-1:] == b'\n'
+    invalid = _first_invalid(first, encoding) # UTF-8 annoncé par une BOM mais invalide
+    if invalid is not None: file_format.invalid = start + invalid
+    buffer = TextBuffer(lines)
+    buffer.indexing, buffer.indexed_bytes, buffer.total_bytes = first_end < len(mm), first_end, len(mm)
+    if buffer.indexing: _LineIndexer(buffer, path, mm, first_end, file_format).start()
+    return buffer, file_format
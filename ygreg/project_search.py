@@ -0,0 +1,210 @@
+# -- coding: utf-8 --
+
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .search import compile_pattern, is_multiline, scan
+
+FIRST_BATCH = 8 # Fichiers du premier lot : les premiers résultats arrivent vite
+MAX_BATCH = 256
+BATCH_DELAY = 0.1 # Secondes au-delà desquelles un lot incomplet part quand même
+MAX_PENDING_BATCHES = 32 # Lots confiés aux processus et pas encore terminés
+MAX_RESULTS = 10000
+BINARY_SNIFF = 8192 # Octets lus pour reconnaître un fichier binaire (présence d'un octet nul)
+SNIPPET_WIDTH = 200
+
+# Recherche dans tout un dossier, depuis l'explorateur. Un fil parcourt l'arborescence avec
+# os.scandir en respectant les .gitignore et confie les fichiers, par lots de taille
+# croissante, à un groupe de processus partagé par toutes les recherches. Chaque processus
+# lit ses fichiers, écarte les binaires et cherche avec le moteur de search.py ; les
+# résultats remontent lot par lot et sont affichés au fur et à mesure.
+
+def _glob_to_regex(glob):
+    """Traduit un motif de .gitignore (sans '/' final ni '!') en regex sur un chemin relatif."""
+    out, i = [], 0
+    while i < len(glob):
+        if glob.startswith('**/', i): out.append('(?:.*/)?'); i += 3; continue
+        if glob.startswith('**', i): out.append('.*'); i += 2; continue
+        c = glob[i]
+        if c == '*': out.append('[^/]*')
+        elif c == '?': out.append('[^/]')
+        elif c == '[' and glob.find(']', i + 2) > 0:
+            end = glob.find(']', i + 2)
+            chars = glob[i + 1:end]
+            out.append('[' + ('^' + chars[1:] if chars[0] == '!' else chars) + ']')
+            i = end
+        elif c == '\\' and i + 1 < len(glob): i += 1; out.append(re.escape(glob[i]))
+        else: out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+def parse_gitignore(directory):
+    """Règles du .gitignore de directory : (dossier, regex, négation, dossiers seulement, ancrée)."""
+    try:
+        with open(os.path.join(directory, '.gitignore'), encoding='utf-8', errors='replace') as f: lines = f.read().splitlines()
+    except OSError: return []
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith('#'): continue
+        negate = line.startswith('!')
+        if negate or line.startswith('\\'): line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        anchored = '/' in line # Sans '/', le motif vaut pour le nom à n'importe quelle profondeur
+        line = line.lstrip('/')
+        if line:
+            try: rules.append((directory, re.compile(_glob_to_regex(line)), negate, dir_only, anchored))
+            except re.error: pass
+    return rules
+
+def is_ignored(path, name, is_dir, rules):
+    """Vrai si les règles (des .gitignore de path et de ses parents, dans l'ordre) excluent path ; la dernière qui s'applique l'emporte."""
+    ignored = False
+    for base, regex, negate, dir_only, anchored in rules:
+        if ignored != negate or (dir_only and not is_dir): continue # La règle ne changerait rien
+        if regex.fullmatch(path[len(base) + 1:] if anchored else name): ignored = not negate
+    return ignored
+
+def parent_rules(root):
+    """Règles des .gitignore situés au-dessus de root, jusqu'à la racine du dépôt git qui le contient."""
+    parents, directory = [], root
+    while not os.path.isdir(os.path.join(directory, '.git')):
+        parent = os.path.dirname(directory)
+        if parent == directory: return [] # Pas dans un dépôt git
+        directory = parent
+        parents.append(directory)
+    return [rule for directory in reversed(parents) for rule in parse_gitignore(directory)]
+
+def _snippet(line, x):
+    start = max(0, x - SNIPPET_WIDTH // 4)
+    return line[start:start + SNIPPET_WIDTH].replace('\t', ' ').strip()
+
+def _search_files(paths, term, options, limit):
+    """Cherche term dans des fichiers, dans un processus du groupe ; retourne (fichiers lus, [(chemin, ligne, colonne, extrait)])."""
+    pattern, multiline = compile_pattern(term, **options), is_multiline(term, options["regex"])
+    searched, results = 0, []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f: data = f.read()
+        except OSError: continue
+        searched += 1
+        if b'\0' in data[:BINARY_SNIFF]: continue # Fichier binaire
+        text = data.decode('utf-8', 'replace')
+        if not pattern.search(text): continue # Cas courant : rien à découper en lignes
+        lines = text.split('\n')
+        for y, x, _, _, _ in scan(pattern, lines, multiline):
+            results.append((path, y, x, _snippet(lines[y], x)))
+            if len(results) >= limit: return searched, results
+    return searched, results
+
+_executor = None
+
+def _pool():
+    """Groupe de processus partagé, créé à la première recherche ; "spawn" car l'éditeur a déjà des fils en cours."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 2, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+def _discard_pool():
+    """Abandonne un groupe de processus cassé (processus tué) : la prochaine recherche en recrée un."""
+    global _executor
+    if _executor is not None: _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+class ProjectSearch:
+    """Recherche d'un terme dans tous les fichiers d'un dossier, en arrière-plan.
+
+    `results` reçoit les (chemin, ligne, colonne, extrait) au fur et à mesure de leur
+    arrivée ; `done` devient vrai quand tous les fichiers ont été lus, qu'il y a plus
+    de MAX_RESULTS résultats (`truncated`) ou après cancel(). `error` décrit un échec du groupe de processus.
+    compile_pattern() est appelé d'abord : un terme invalide lève re.error ici.
+    """
+
+    def __init__(self, root, term, regex=False, ignore_case=False, whole_word=False):
+        self.options = {"regex": regex, "ignore_case": ignore_case, "whole_word": whole_word}
+        compile_pattern(term, **self.options)
+        self.root, self.term = os.path.abspath(root), term
+        self.results, self.files_found, self.files_searched = [], 0, 0
+        self.truncated, self.error = False, None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._slots = threading.Semaphore(MAX_PENDING_BATCHES)
+        self._futures, self._walking = set(), True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self):
+        with self._lock: return not self._walking and not self._futures
+
+    def cancel(self):
+        self._stop.set()
+        with self._lock: futures = list(self._futures)
+        for future in futures: future.cancel() # Les lots déjà commencés se terminent, sans effet
+        self._thread.join()
+
+    def _files(self):
+        """Fichiers à lire sous root, dossier par dossier dans l'ordre alphabétique, sans ceux qu'excluent les .gitignore."""
+        stack = [(self.root, parent_rules(self.root))]
+        while stack and not self._stop.is_set():
+            directory, rules = stack.pop()
+            rules = rules + parse_gitignore(directory)
+            try:
+                with os.scandir(directory) as it: entries = sorted(it, key=lambda e: e.name)
+            except OSError: continue
+            subdirectories = []
+            for entry in entries:
+                try: is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError: continue
+                if is_dir and entry.name == '.git': continue
+                if is_ignored(entry.path, entry.name, is_dir, rules): continue
+                if is_dir: subdirectories.append((entry.path, rules))
+                elif entry.is_file(): yield entry.path
+            stack.extend(reversed(subdirectories))
+
+    def _run(self):
+        batch, size, last_submit = [], FIRST_BATCH, time.monotonic()
+        try:
+            for path in self._files():
+                batch.append(path)
+                self.files_found += 1
+                if len(batch) >= size or time.monotonic() - last_submit >= BATCH_DELAY:
+                    self._submit(batch)
+                    batch, size, last_submit = [], min(size * 2, MAX_BATCH), time.monotonic()
+            if batch: self._submit(batch)
+        except BrokenProcessPool as e:
+            _discard_pool()
+            self.error = str(e) or "processus de recherche interrompus"
+        finally:
+            with self._lock: self._walking = False
+
+    def _submit(self, batch):
+        while not self._slots.acquire(timeout=0.1): # Assez de lots en attente : on laisse les processus avancer
+            if self._stop.is_set(): return
+        if self._stop.is_set(): self._slots.release(); return
+        future = _pool().submit(_search_files, batch, self.term, self.options, MAX_RESULTS + 1) # Un résultat de trop : la liste est coupée
+        with self._lock: self._futures.add(future)
+        future.add_done_callback(self._on_batch_done)
+
+    def _on_batch_done(self, future):
+        self._slots.release()
+        if not future.cancelled() and future.exception() is not None:
+            if isinstance(future.exception(), BrokenProcessPool): _discard_pool()
+            self.error = str(future.exception()) or "processus de recherche interrompus"
+            self._stop.set()
+        with self._lock:
+            self._futures.discard(future)
+            if future.cancelled() or future.exception() is not None or self._stop.is_set() and self.truncated: return
+            searched, found = future.result()
+            self.files_searched += searched
+            room = MAX_RESULTS - len(self.results)
+            self.results.extend(found[:room])
+            if len(found) > room: self.truncated = True; self._stop.set() # Liste tout juste pleine : la suite dira s'il y a plus
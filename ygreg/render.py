@@ -0,0 +1,86 @@
+# -- coding: utf-8 --
+
+class DamageTracker:
+    """Mémorise les lignes du fichier à redessiner depuis la dernière image.
+
+    Les éditions arrivent par on_edit (écouteur du TextBuffer) ; l'éditeur y ajoute
+    la ligne du curseur et les changements de sélection. Quand le nombre de lignes
+    change, tout ce qui suit le point d'édition est à redessiner.
+    """
+
+    def __init__(self):
+        self.full = True
+        self.lines = set()
+        self.from_line = None
+
+    def invalidate(self): self.full = True
+
+    def mark_lines(self, start, end):
+        """Marque les lignes [start:end] comme à redessiner."""
+        if end - start > 512: self.mark_from(start); return
+        self.lines.update(range(start, end))
+
+    def mark_from(self, start):
+        self.from_line = start if self.from_line is None else min(self.from_line, start)
+
+    def on_edit(self, start, old_lines, new_lines):
+        if len(old_lines) != len(new_lines): self.mark_from(start)
+        else: self.mark_lines(start, start + len(new_lines))
+
+    def is_dirty(self, line_idx):
+        return self.full or line_idx in self.lines or (self.from_line is not None and line_idx >= self.from_line)
+
+    def clear(self):
+        self.full, self.from_line = False, None
+        self.lines.clear()
+
+
+class View:
+    """Un volet de l'éditeur : curseur, défilement, sélection et lignes à repeindre, propres à chaque vue du document.
+
+    Les vues partagent le tampon, l'historique et la coloration ; chacune a son
+    DamageTracker, abonné aux éditions, et ne repeint que ses propres lignes touchées.
+    `rect` (première ligne, première colonne, lignes de texte, largeur bords compris)
+    est fixé par layout() à chaque image.
+    """
+
+    def __init__(self, source=None):
+        if source is None: self.cursor_y, self.cursor_x, self.top_line, self.left_col = 0, 0, 0, 0
+        else: self.cursor_y, self.cursor_x, self.top_line, self.left_col = source.cursor_y, source.cursor_x, source.top_line, source.left_col
+        self.selecting = False
+        self.selection_anchor_y, self.selection_anchor_x = -1, -1
+        self.damage = DamageTracker()
+        self.last_frame = None
+        self.rect = None
+
+# Disposition des vues : une View, ou un nœud (orientation, premier, second) où 'h' empile
+# les deux moitiés (séparées par une ligne) et 'v' les met côte à côte (elles partagent
+# une colonne de bord).
+
+def layout(node, y, x, rows, width):
+    """Place les vues de node dans la zone ; retourne les séparateurs à tracer, (orientation, ligne, colonne, longueur)."""
+    if isinstance(node, View): node.rect = (y, x, rows, width); return []
+    orientation, first, second = node
+    if orientation == 'h':
+        top = (rows - 1) // 2
+        return [('h', y + top, x, width)] + layout(first, y, x, top, width) + layout(second, y + top + 1, x, rows - top - 1, width)
+    left = (width + 1) // 2
+    return [('v', y, x + left - 1, rows)] + layout(first, y, x, rows, left) + layout(second, y, x + left - 1, rows, width - left + 1)
+
+def views(node):
+    """Les vues de node, de haut en bas et de gauche à droite."""
+    return [node] if isinstance(node, View) else views(node[1]) + views(node[2])
+
+def split(node, view, orientation, new_view):
+    """node où view est partagée avec new_view (en bas ou à droite)."""
+    if node is view: return (orientation, view, new_view)
+    if isinstance(node, View): return node
+    return (node[0], split(node[1], view, orientation, new_view), split(node[2], view, orientation, new_view))
+
+def remove(node, view):
+    """node sans view : sa moitié sœur prend toute la place."""
+    if isinstance(node, View): return node
+    orientation, first, second = node
+    if first is view: return second
+    if second is view: return first
+    return (orientation, remove(first, view), remove(second, view))
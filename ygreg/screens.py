@@ -2,6 +2,7 @@
 
 import curses
 from .themes import set_theme_colors
+from .highlight import token_cache
 
 class SettingsScreen:
     def __init__(self, stdscr, settings):
@@ -9,8 +10,14 @@ class SettingsScreen:
         self.options = [
             {"key": "theme", "label": "Thème de couleurs", "values": ["dark", "light", "ocean", "synthwave"]},
             {"key": "autosave_threshold", "label": "Autosave (0=désactivé)", "values": [0, 10, 25, 50, 100]},
+            {"key": "journal", "label": "Journal de récupération", "values": [True, False]},
+            {"key": "autosave_idle", "label": "Autosave après inactivité (s, 0=désactivé)", "values": [0, 2, 5, 10, 30]},
+            {"key": "undo_memory_mb", "label": "Mémoire d'annulation (Mo)", "values": [8, 32, 128]},
             {"key": "show_syntax_highlighting", "label": "Coloration syntaxique", "values": [True, False]},
-            {"key": "tab_size", "label": "Taille tabulation", "values": [2, 4, 8]}
+            {"key": "tab_size", "label": "Taille tabulation", "values": [2, 4, 8]},
+            {"key": "token_cache_size", "label": "Cache de coloration (lignes)", "values": [2000, 20000, 100000]},
+            {"key": "file_index", "label": "Indexer le projet au lancement", "values": [True, False]},
+            {"key": "buffer_memory_mb", "label": "Mémoire des fichiers ouverts (Mo)", "values": [64, 256, 1024]}
         ]
         self.selected_option = 0
 
@@ -50,6 +57,9 @@ class SettingsScreen:
             line_str = f"{opt['label'].ljust(30)} {val_str}"
             attr = curses.A_REVERSE if i == self.selected_option else curses.A_NORMAL
             self.stdscr.addstr(i + 4, (w - len(line_str))//2, line_str, attr)
+
+        cache_str = f"Cache de coloration : {len(token_cache)} lignes, {token_cache.hit_rate:.0%} de succès"
+        self.stdscr.addstr(len(self.options) + 5, (w - len(cache_str))//2, cache_str, curses.A_DIM)
         
         help_text = "Q: Retour | ↑↓: Naviguer | ←→/Entrée: Changer"
         self.stdscr.addstr(h-1, (w-len(help_text))//2, help_text, curses.color_pair(2))
@@ -79,8 +89,16 @@ class HelpScreen:
             ("Ctrl+G", "Ouvrir le menu des commandes"),
             ("  s: Sauvegarder", "q: Quitter l'éditeur"),
             ("  h: Aide", "p: Paramètres"),
+            ("  e: Ouvrir un fichier", "Recherche floue dans le dossier de travail"),
+            ("  l: Fichiers ouverts", "Changer de fichier (aussi F6/Shift+F6)"),
+            ("  a: Suivre le fichier", "Comme tail -f, en lecture seule"),
             ("  f: Rechercher", "r: Remplacer"),
+            ("  n: Occurrence suivante", "b: Occurrence précédente (aussi F3/Shift+F3)"),
+            ("  Recherche: Ctrl+R/T/W", "Regex / Ignorer la casse / Mot entier"),
             ("  g: Aller à la ligne", "d: Dupliquer la ligne"),
+            ("  u: Annuler", "y: Rétablir"),
+            ("  -/|: Partager la vue", "En haut et en bas / côte à côte"),
+            ("  w: Vue suivante", "k: Fermer la vue"),
             ("", ""),
             ("--- Édition & Sélection ---", None),
             ("Shift+Flèches", "Sélectionner du texte"),
@@ -89,6 +107,9 @@ class HelpScreen:
             ("Ctrl+X/C/V", "Couper/Copier/Coller"),
             ("Tab/Shift+Tab", "Indenter/Désindenter la sélection"),
             ("", ""),
+            ("--- Vue hexadécimale (fichiers binaires) ---", None),
+            ("g: Aller au décalage", "f: Chercher des octets (hexa), n/b: Suivant/Précédent"),
+            ("", ""),
             ("--- Snippets & Outils (mot + Tab) ---", None),
             ("= (ex: 5*2=)", "Calcule une expression mathématique"),
             ("date / heure / now", "Insère la date et/ou l'heure"),
@@ -0,0 +1,434 @@
+# -- coding: utf-8 --
+
+import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+
+SCAN_SLICE = 0.02 # Secondes d'analyse par appel de build(), pour que la saisie reste fluide
+SCAN_LINES = 2048 # Lignes jointes et parcourues d'un seul appel à la regex
+PATTERN_CACHE_SIZE = 64
+MULTILINE_CONTEXT = 100 # Lignes qu'une occurrence multiligne est assurée de pouvoir couvrir
+
+# Moteur de recherche commun à la recherche et au remplacement. Un terme devient une regex
+# compilée (littéral échappé, casse, mot entier), gardée dans un cache LRU. Le document est
+# parcouru par blocs de lignes jointes par '\n' : un seul finditer par bloc, et non un appel
+# par ligne. Une occurrence ne franchit une fin de ligne que si la regex contient \n ; elle
+# est alors trouvée à coup sûr si elle couvre au plus MULTILINE_CONTEXT lignes.
+
+_patterns = OrderedDict()
+
+def compile_pattern(term, regex=False, ignore_case=False, whole_word=False):
+    """Compile un terme de recherche, via le cache ; lève re.error si la regex est invalide."""
+    key = (term, regex, ignore_case, whole_word)
+    pattern = _patterns.get(key)
+    if pattern is not None:
+        _patterns.move_to_end(key)
+        return pattern
+    source = term if regex else re.escape(term)
+    if whole_word:
+        # Un littéral reste en tête (et la regex garde sa recherche rapide de préfixe) : on vérifie le caractère précédent après coup
+        source = rf"(?<!\w)(?:{source})(?!\w)" if regex else rf"{source}(?<!\w{source})(?!\w)"
+    pattern = _patterns[key] = re.compile(source, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+    if len(_patterns) > PATTERN_CACHE_SIZE: _patterns.popitem(last=False)
+    return pattern
+
+def is_multiline(term, regex):
+    return regex and '\\n' in term
+
+def scan(pattern, lines, multiline=False, pos=0):
+    """Cherche pattern dans lines jointes par '\n', en un seul parcours, à partir de la colonne pos de la première.
+
+    Produit (ligne, colonne, ligne de fin, colonne de fin, match) pour chaque occurrence non
+    vide, les lignes étant des indices dans lines. Hors mode multiligne, une occurrence qui
+    déborderait sur la ligne suivante (\s, [^x]…) est recherchée à nouveau dans sa seule ligne.
+    """
+    text = '\n'.join(lines)
+    starts = [0]
+    starts.extend(accumulate(len(line) + 1 for line in lines)) # starts[y + 1] - 1 : fin de la ligne y
+    while True:
+        for match in pattern.finditer(text, pos):
+            start, end = match.span()
+            if start == end: continue
+            y = bisect_right(starts, start) - 1
+            if end < starts[y + 1]: yield y, start - starts[y], y, end - starts[y], match; continue
+            if not multiline:
+                for sub in pattern.finditer(lines[y], start - starts[y]):
+                    if sub.start() != sub.end(): yield y, sub.start(), y, sub.end(), sub
+                pos = starts[y + 1]
+                break
+            end_y = bisect_right(starts, end) - 1
+            yield y, start - starts[y], end_y, end - starts[end_y], match
+        else: return
+
+def iter_chunks(buffer, pattern, multiline=False, start=(0, 0)):
+    """Parcourt le document bloc par bloc à partir de la position start.
+
+    Produit, après chaque bloc, (position de reprise, occurrences), les occurrences étant en
+    coordonnées du document. En mode multiligne, les blocs se chevauchent et une occurrence
+    qui touche la fin d'un bloc est recherchée à nouveau dans le suivant, agrandi au besoin.
+    S'arrête à la fin des lignes déjà indexées : il faut repartir de la reprise ensuite.
+    """
+    (y, x), size = start, SCAN_LINES
+    if multiline: size = max(size, 2 * MULTILINE_CONTEXT)
+    while y < len(buffer):
+        stop = min(len(buffer), y + size)
+        lines = buffer[y:stop]
+        last = stop >= len(buffer) # Dernières lignes disponibles : plus rien après, sauf pendant l'indexation
+        final = last and not buffer.indexing
+        found, resume = [], None
+        for rel_y, col, rel_end_y, end_col, match in scan(pattern, lines, multiline, x):
+            if multiline and not final and rel_end_y == len(lines) - 1 and end_col == len(lines[-1]):
+                resume = (y + rel_y, col) # Touche la fin du bloc : l'occurrence pourrait être plus longue
+                break
+            found.append((y + rel_y, col, y + rel_end_y, end_col, match))
+        if not multiline or final: next_position = (stop, 0)
+        elif resume is not None: next_position = resume
+        else: # La suite du bloc peut commencer une occurrence qui continue dans le bloc suivant
+            next_position = (max(stop - MULTILINE_CONTEXT, y), 0)
+            if found: next_position = max(next_position, found[-1][2:4])
+        if next_position <= (y, x) and not found:
+            if last: return # Rien de plus à lire pour l'instant
+            size *= 2; continue
+        (y, x), size = next_position, max(SCAN_LINES, 2 * MULTILINE_CONTEXT) if multiline else SCAN_LINES
+        yield (y, x), found
+        if last and multiline and not final: return
+
+
+class SearchIndex:
+    """Occurrences d'une recherche dans un TextBuffer, tenues à jour au fil des éditions.
+
+    L'index ne garde que les lignes où commence au moins une occurrence : `_lines` (numéros
+    triés), `_counts` (nombre d'occurrences) et `_extents` (ligne où finit la dernière), en
+    parallèle ; les colonnes sont recalculées à la demande, pour l'affichage et les sauts.
+    L'analyse se fait par tranches avec build(). Une édition ne réanalyse que les lignes
+    remplacées (en mode multiligne, tout ce qui suit). Un littéral qui prolonge le précédent
+    ne réexamine que les lignes où celui-ci apparaissait, et revenir à un terme plus court
+    (retour arrière) reprend son index sans rien réanalyser.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.term, self.options = "", {}
+        self.pattern, self.multiline, self.error = None, False, None
+        self._previous = [] # ((terme, options), état) des préfixes du terme actuel
+        self._reset()
+        buffer.add_listener(self._on_edit)
+
+    def _reset(self, candidates=None):
+        self._lines, self._counts, self._extents, self.count = [], [], [], 0
+        self._candidates, self._candidate_pos = candidates, 0 # Lignes à réexaminer, et combien l'ont été
+        self._resume, self._chunks = (0, 0), None # Position où reprendre l'analyse, et son parcours en cours
+        self._current, self._rank = None, None # Occurrence courante : (i, j, position), et son rang
+
+    def set_term(self, term, regex=False, ignore_case=False, whole_word=False):
+        """Change la recherche ; l'index est ensuite (re)construit par build().
+
+        Une regex invalide laisse l'index vide et son message dans `error`.
+        """
+        options = {"regex": regex, "ignore_case": ignore_case, "whole_word": whole_word}
+        if (term, options) == (self.term, self.options): return
+        for n, (query, state) in enumerate(self._previous):
+            if query == (term, options): # Retour à un préfixe déjà indexé
+                del self._previous[n:]
+                self._set_pattern(term, options)
+                self._reset()
+                self._lines, self._counts, self._extents, self.count = state
+                self._resume = (len(self.buffer), 0)
+                return
+        narrowing = (self.term and term.startswith(self.term) and options == self.options
+                     and not regex and not whole_word and self.complete and not self.error)
+        if narrowing: self._previous.append(((self.term, self.options), (self._lines, self._counts, self._extents, self.count)))
+        else: self._previous.clear()
+        candidates = self._lines if narrowing else None # Seules les lignes contenant le préfixe peuvent contenir le terme
+        self._set_pattern(term, options)
+        self._reset(candidates)
+
+    def _set_pattern(self, term, options):
+        self.term, self.options = term, options
+        self.multiline, self.error = is_multiline(term, options["regex"]), None
+        try: self.pattern = compile_pattern(term, **options) if term else None
+        except re.error as e: self.pattern, self.error = None, str(e)
+
+    @property
+    def complete(self):
+        if self.pattern is None: return True
+        return self._candidates is None and self._resume[0] >= len(self.buffer) and not self.buffer.indexing
+
+    def _add(self, y, end_y):
+        if self._lines and self._lines[-1] == y:
+            self._counts[-1] += 1; self._extents[-1] = end_y
+        else: self._lines.append(y); self._counts.append(1); self._extents.append(end_y)
+        self.count += 1
+
+    def build(self, budget=SCAN_SLICE):
+        """Poursuit l'analyse pendant au plus budget secondes (None : jusqu'au bout) ; retourne True si l'index est complet."""
+        deadline = None if budget is None else time.monotonic() + budget
+        while not self.complete:
+            if self._candidates is not None:
+                stop = min(len(self._candidates), self._candidate_pos + SCAN_LINES)
+                ys = self._candidates[self._candidate_pos:stop]
+                if ys:
+                    for rel_y, _, _, _, _ in scan(self.pattern, self._candidate_lines(ys)): self._add(ys[rel_y], ys[rel_y])
+                self._candidate_pos = stop
+                if stop >= len(self._candidates): self._candidates, self._resume = None, (len(self.buffer), 0)
+            else:
+                if self._chunks is None: self._chunks = iter_chunks(self.buffer, self.pattern, self.multiline, self._resume)
+                try: self._resume, found = next(self._chunks)
+                except StopIteration:
+                    self._chunks = None
+                    if self.buffer.indexing: return False # La suite n'est pas encore indexée
+                    self._resume = (len(self.buffer), 0)
+                    continue
+                for y, _, end_y, _, _ in found: self._add(y, end_y)
+            if deadline is not None and time.monotonic() >= deadline: break
+        return self.complete
+
+    def _candidate_lines(self, ys):
+        """Texte des lignes ys, lu d'un bloc quand elles sont proches les unes des autres."""
+        first, last = ys[0], ys[-1]
+        if last - first < 8 * len(ys):
+            text = self.buffer[first:last + 1]
+            return [text[y - first] for y in ys]
+        return [self.buffer[y] for y in ys]
+
+    def _truncate(self, i, y):
+        """Oublie les entrées à partir de l'indice i ; l'analyse reprendra à la ligne y."""
+        self.count -= sum(self._counts[i:])
+        del self._lines[i:], self._counts[i:], self._extents[i:]
+        self._resume, self._chunks = (y, 0), None
+
+    def _on_edit(self, start, old_lines, new_lines):
+        if self.pattern is None: return
+        self._previous.clear()
+        self._current = self._rank = None
+        if self._candidates is not None: self._reset(); return # Les candidats ne correspondent plus au tampon
+        lines, counts, extents = self._lines, self._counts, self._extents
+        if self.multiline:
+            # Une occurrence peut venir d'avant l'édition et la suite peut se découper autrement : on réanalyse à partir de là
+            y = max(0, start - MULTILINE_CONTEXT)
+            i = bisect_left(lines, y)
+            if i and extents[i - 1] >= y: i -= 1; y = lines[i]
+            if y < self._resume[0]: self._truncate(i, y)
+            return
+        if start >= self._resume[0]: return
+        end, delta = start + len(old_lines), len(new_lines) - len(old_lines)
+        i = bisect_left(lines, start)
+        if self._chunks is not None or end > self._resume[0]: # Analyse en cours : elle reprendra au début de l'édition
+            self._truncate(i, start)
+            return
+        j = bisect_left(lines, end)
+        added_lines, added_counts = [], []
+        for rel_y, _, _, _, _ in scan(self.pattern, new_lines):
+            if added_lines and added_lines[-1] == start + rel_y: added_counts[-1] += 1
+            else: added_lines.append(start + rel_y); added_counts.append(1)
+        self.count += sum(added_counts) - sum(counts[i:j])
+        if delta: lines[i:] = added_lines + [y + delta for y in lines[j:]]
+        else: lines[i:j] = added_lines
+        counts[i:j] = added_counts
+        # Hors mode multiligne, une occurrence finit sur sa ligne
+        if delta: extents[i:] = lines[i:]
+        else: extents[i:j] = added_lines
+        self._resume = (self._resume[0] + delta, 0)
+
+    def _matches_from(self, i, last=None):
+        """Occurrences à partir de l'entrée i, jusqu'à celles qui commencent sur sa ligne ou, si donnée, jusqu'à la ligne last."""
+        lines, extents = self._lines, self._extents
+        end = max(extents[i], last if last is not None else extents[i])
+        if i and extents[i - 1] >= lines[i]: i -= 1 # Une occurrence multiligne finit sur cette ligne : on repart de son début
+        first = lines[i]
+        for y, x, end_y, end_x, match in scan(self.pattern, self.buffer[first:end + 1], self.multiline):
+            yield first + y, x, first + end_y, end_x, match
+
+    def _line_matches(self, i):
+        y = self._lines[i]
+        return [x for match_y, x, _, _, _ in self._matches_from(i) if match_y == y]
+
+    def visible_spans(self, first, last):
+        """Segments (début, fin, position de l'occurrence) à mettre en valeur sur les lignes [first:last], par ligne ; fin peut valoir inf."""
+        if self.pattern is None or not self._lines: return {}
+        i = bisect_left(self._lines, first)
+        if i and self._extents[i - 1] >= first: i -= 1
+        j = bisect_left(self._lines, last)
+        if i >= j: return {}
+        spans = {}
+        for y, x, end_y, end_x, _ in self._matches_from(i, max(self._extents[i:j])):
+            if y >= last: break
+            for line in range(max(y, first), min(end_y, last - 1) + 1):
+                spans.setdefault(line, []).append((x if line == y else 0, end_x if line == end_y else float('inf'), (y, x)))
+        return spans
+
+    @property
+    def current(self):
+        """Position (ligne, colonne) de l'occurrence courante, ou None."""
+        return self._current[2] if self._current else None
+
+    def rank(self):
+        """Rang (à partir de 1) de l'occurrence courante, ou None."""
+        if self._current is None: return None
+        if self._rank is None:
+            i, j, _ = self._current
+            self._rank = sum(self._counts[:i]) + j
+        return self._rank + 1
+
+    def _locate(self, y, x):
+        """(i, j) de la première occurrence commençant en (y, x) ou après ; i == len(_lines) s'il n'y en a pas."""
+        i = bisect_left(self._lines, y)
+        if i < len(self._lines) and self._lines[i] == y:
+            j = bisect_left(self._line_matches(i), x)
+            if j < self._counts[i]: return i, j
+            i += 1
+        return i, 0
+
+    def _position(self, i, j):
+        return self._lines[i], self._line_matches(i)[j]
+
+    def find(self, y, x, backward=False, inclusive=False):
+        """Occurrence suivante (ou précédente) à partir de (y, x), en bouclant ; retourne sa position ou None.
+
+        Depuis l'occurrence courante, le saut ne dépend pas de la taille du document ;
+        ailleurs, il coûte une recherche dichotomique. Tant que l'index est incomplet, un
+        saut qui devrait boucler retourne None.
+        """
+        if not self.count: return None
+        lines, counts = self._lines, self._counts
+        step = not inclusive and self.current == (y, x)
+        if step: i, j, position = self._current
+        else: i, j = self._locate(y, x)
+        if backward:
+            if step or i == len(lines) or not (inclusive and self._position(i, j) == (y, x)): j -= 1
+            if j < 0:
+                i -= 1
+                if i < 0:
+                    if not self.complete: return None
+                    i = len(lines) - 1
+                j = counts[i] - 1
+        else:
+            if step or (not inclusive and i < len(lines) and self._position(i, j) == (y, x)): j += 1
+            if i < len(lines) and j >= counts[i]: i, j = i + 1, 0
+            if i == len(lines):
+                if not self.complete: return None
+                i, j = 0, 0
+        if step and self._rank is not None: self._rank = (self._rank + (-1 if backward else 1)) % self.count
+        else: self._rank = None
+        self._current = (i, j, self._position(i, j))
+        return self._current[2]
+
+    def match_at(self, y, x):
+        """L'occurrence qui commence en (y, x) : (ligne de fin, colonne de fin, match), ou None."""
+        i = bisect_left(self._lines, y)
+        if i == len(self._lines) or self._lines[i] != y: return None
+        for match_y, match_x, end_y, end_x, match in self._matches_from(i):
+            if (match_y, match_x) == (y, x): return end_y, end_x, match
+        return None
+
+
+def expand_matches(matches, replacement, expand=False):
+    """Remplace le match de chaque occurrence par son texte de remplacement : (y, x, fin y, fin x, texte).
+
+    Avec expand, replacement est un gabarit de regex (\\1, \\g<nom>) ; une référence
+    invalide lève re.error ou IndexError ici, avant toute modification du document.
+    """
+    if not expand or '\\' not in replacement: # Sans barre oblique, le gabarit est le texte lui-même
+        return [(y, x, end_y, end_x, replacement) for y, x, end_y, end_x, _ in matches]
+    return [(y, x, end_y, end_x, match.expand(replacement)) for y, x, end_y, end_x, match in matches]
+
+def _replaced(lines, first, edits):
+    """Lignes (la première étant la ligne first du document) après des remplacements qui les touchent toutes."""
+    text = '\n'.join(lines)
+    starts = [0]
+    starts.extend(accumulate(len(line) + 1 for line in lines))
+    pieces, pos = [], 0
+    for y, x, end_y, end_x, new_text in edits:
+        pieces.append(text[pos:starts[y - first] + x])
+        pieces.append(new_text)
+        pos = starts[end_y - first] + end_x
+    pieces.append(text[pos:])
+    return ''.join(pieces).split('\n')
+
+def apply_replacements(buffer, edits):
+    """Applique des remplacements (en ordre, sans chevauchement) d'un seul bloc ; retourne leur nombre.
+
+    Les remplacements sont réunis en une édition par tranche d'au plus SCAN_LINES lignes,
+    où les lignes inchangées restent les mêmes objets (rien à copier pour l'annulation).
+    Les éditions sont appliquées du bas vers le haut, pour que les positions des suivantes
+    restent valables, et sous le verrou du tampon : un fil de fond ne voit pas d'état intermédiaire.
+    """
+    batches = [] # [première ligne, dernière ligne, remplacements]
+    for edit in edits:
+        if batches and (edit[0] <= batches[-1][1] or edit[2] - batches[-1][0] < SCAN_LINES):
+            batches[-1][1] = max(batches[-1][1], edit[2]); batches[-1][2].append(edit)
+        else: batches.append([edit[0], edit[2], [edit]])
+    with buffer.lock:
+        for first, last, batch in reversed(batches):
+            lines = buffer[first:last + 1]
+            new_lines, copied, i = [], first, 0
+            while i < len(batch): # Remplacements qui se partagent des lignes : traités ensemble
+                start, end, j = batch[i][0], batch[i][2], i + 1
+                while j < len(batch) and batch[j][0] <= end: end = max(end, batch[j][2]); j += 1
+                new_lines.extend(lines[copied - first:start - first])
+                if j == i + 1 and start == end: # Cas courant : un remplacement seul sur sa ligne
+                    _, x, _, end_x, new_text = batch[i]
+                    line = lines[start - first]
+                    new_lines.extend((line[:x] + new_text + line[end_x:]).split('\n'))
+                else: new_lines.extend(_replaced(lines[start - first:end - first + 1], start, batch[i:j]))
+                copied, i = end + 1, j
+            new_lines.extend(lines[copied - first:])
+            buffer.replace(first, last + 1, new_lines)
+    return len(edits)
+
+def replace_matches(buffer, matches, replacement, expand=False):
+    """Remplace des occurrences (en ordre, sans chevauchement) par replacement ; retourne leur nombre."""
+    return apply_replacements(buffer, expand_matches(matches, replacement, expand))
+
+
+class ReplaceAll:
+    """Remplacement de toutes les occurrences d'un motif, préparé par tranches puis appliqué d'un bloc.
+
+    step() poursuit l'analyse pendant au plus budget secondes, en calculant déjà les textes
+    de remplacement ; une fois l'analyse complète, `count` donne le nombre de remplacements
+    à venir et apply() les fait tous. Abandonner l'objet avant apply() ne change rien au
+    document, qui ne doit pas être modifié entre-temps.
+    """
+
+    def __init__(self, buffer, pattern, replacement, multiline=False, expand=False):
+        self.buffer, self.pattern, self.replacement = buffer, pattern, replacement
+        self.multiline, self.expand = multiline, expand
+        self.position = (0, 0) # Où reprendre l'analyse
+        self._edits, self._chunks = [], None
+
+    @property
+    def count(self): return len(self._edits)
+
+    @property
+    def complete(self): return self.position[0] >= len(self.buffer) and not self.buffer.indexing
+
+    def progress(self):
+        """Part du document déjà analysée, entre 0 et 1."""
+        if self.complete: return 1.0
+        return min(1.0, self.position[0] / max(1, self.buffer.estimated_len()))
+
+    def step(self, budget=SCAN_SLICE):
+        """Poursuit l'analyse pendant au plus budget secondes (None : jusqu'au bout) ; retourne True si elle est complète.
+
+        Lève re.error ou IndexError si le gabarit de remplacement cite un groupe invalide.
+        """
+        deadline = None if budget is None else time.monotonic() + budget
+        while not self.complete:
+            if self._chunks is None: self._chunks = iter_chunks(self.buffer, self.pattern, self.multiline, self.position)
+            try: self.position, found = next(self._chunks)
+            except StopIteration:
+                self._chunks = None
+                if self.buffer.indexing: return False # La suite n'est pas encore indexée
+                self.position = (len(self.buffer), 0)
+                continue
+            self._edits.extend(expand_matches(found, self.replacement, self.expand))
+            if deadline is not None and time.monotonic() >= deadline: break
+        return self.complete
+
+    def apply(self):
+        """Fait tous les remplacements trouvés ; retourne leur nombre."""
+        count = apply_replacements(self.buffer, self._edits)
+        self._edits = []
+        return count
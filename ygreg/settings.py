@@ -7,10 +7,16 @@ class Settings:
     def __init__(self):
         self.defaults = {
             "theme": "dark",
-            "autosave_threshold": 25,
+            "autosave_threshold": 0,
+            "autosave_idle": 0,
+            "journal": True,
+            "undo_memory_mb": 32,
             "show_syntax_highlighting": True,
             "tab_size": 4,
-            "smart_tab": False
+            "token_cache_size": 20000,
+            "smart_tab": False,
+            "file_index": True,
+            "buffer_memory_mb": 256
         }
         self.settings = self.defaults.copy()
         self.load()
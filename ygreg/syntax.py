@@ -1,84 +1,77 @@
 # -- coding: utf-8 --
 
 import curses
+import importlib
+import os
 import re
-from .constants import PYTHON_KEYWORDS, JS_KEYWORDS, CSS_PROPERTIES, OPERATORS
 
-def highlight_python(line):
-    """Retourne une liste de (token, color_pair, attribute) pour une ligne Python."""
-    tokens = re.split(f'({OPERATORS}|\\s+|\\b\\d+\\b|\'.*?\'|".*?"|#.*)', line)
-    result = []
-    for token in filter(None, tokens):
-        attr = curses.A_NORMAL
-        color_pair_num = 0
-        if token.startswith("'") or token.startswith('"'): color_pair_num = 4
-        elif token.startswith('#'): color_pair_num = 5
-        elif token in PYTHON_KEYWORDS: color_pair_num = 6; attr = curses.A_BOLD
-        elif token.isdigit(): color_pair_num = 8
-        elif re.match(OPERATORS, token): color_pair_num = 7
-        result.append((token, color_pair_num, attr))
-    return result
+# Registre des langages. Chaque langage est un module (par défaut dans ygreg.lexers)
+# exposant highlight(line, state=None) -> (tuple de (token, color_pair, attribute), état
+# en fin de ligne). Le module n'est importé qu'à la première ouverture d'un fichier du
+# langage ; ajouter un langage revient à écrire son module et à appeler register().
 
-def highlight_js(line):
-    """Retourne une liste de (token, color_pair, attribute) pour une ligne JavaScript."""
-    tokens = re.split(f'({OPERATORS}|\\s+|\\b\\d+\\b|\'.*?\'|".*?"|//.*|/\\*.*?\\*/)', line)
-    result = []
-    for token in filter(None, tokens):
-        attr = curses.A_NORMAL
-        color_pair_num = 0
-        if token.startswith("'") or token.startswith('"'): color_pair_num = 4
-        elif token.startswith('//') or token.startswith('/*'): color_pair_num = 5
-        elif token in JS_KEYWORDS: color_pair_num = 15; attr = curses.A_BOLD
-        elif token.isdigit(): color_pair_num = 8
-        elif re.match(OPERATORS, token): color_pair_num = 7
-        result.append((token, color_pair_num, attr))
-    return result
+EXTENSIONS = {}
+INTERPRETERS = {}
 
-def highlight_html(line):
-    """Retourne une liste de (token, color_pair, attribute) pour une ligne HTML."""
-    tokens = re.split(r'(<[^>]+>|&[a-zA-Z0-9]+;)', line)
-    result = []
-    for token in filter(None, tokens):
-        color_pair_num = 0
-        if token.startswith('<'):
-            if token.startswith(('<!--', '<!DOCTYPE')): color_pair_num = 5
-            else: color_pair_num = 13
-        elif token.startswith('&'): color_pair_num = 8
-        result.append((token, color_pair_num, curses.A_NORMAL))
-    return result
-    
-def highlight_css(line):
-    """Retourne une liste de (token, color_pair, attribute) pour une ligne CSS."""
-    # Note: L'état est difficile à gérer ligne par ligne, c'est une simplification.
-    tokens = re.split(r'([{}\[\]:;,\s+]|\d+\w*|".*?"|/\*.*?\*/)', line)
-    result = []
-    state = 'selector' # Simplification
-    for token in filter(None, tokens):
-        attr = curses.A_NORMAL
-        color_pair_num = 0
-        if token in CSS_PROPERTIES and state == 'property': color_pair_num = 16
-        elif token.startswith('/*'): color_pair_num = 5
-        elif token.isdigit() or token.startswith('#'): color_pair_num = 8
-        elif token.startswith('"'): color_pair_num = 4
-        elif state == 'selector' and token.strip() and token not in '{};:': color_pair_num = 6
-        if token == '{': state = 'property'
-        elif token == '}': state = 'selector'
-        elif token == ':': state = 'value'
-        elif token == ';': state = 'property'
-        result.append((token, color_pair_num, attr))
-    return result
+def register(module_name, extensions=(), interpreters=()):
+    """Associe des extensions (ou noms de fichier) et des interpréteurs de shebang à un module de coloration."""
+    for ext in extensions: EXTENSIONS[ext.lower()] = module_name
+    for interpreter in interpreters: INTERPRETERS[interpreter] = module_name
 
-def highlight_json(line):
-    """Retourne une liste de (token, color_pair, attribute) pour une ligne JSON."""
-    tokens = re.split(r'("[^"]*"\s*:|"[^"]*"|\btrue\b|\bfalse\b|\bnull\b|\d+(?:\.\d*)?|[{}\[\]:,])', line)
-    result = []
-    for token in filter(None, tokens):
-        attr = curses.A_NORMAL
-        color_pair_num = 0
-        if token.strip().endswith(':'): color_pair_num = 16
-        elif token.startswith('"'): color_pair_num = 4
-        elif token in ('true', 'false', 'null'): color_pair_num = 15
-        elif token.strip().isdigit() or '.' in token.strip(): color_pair_num = 8
-        elif token in '{}[],:': color_pair_num = 7
-        result.append((token, color_pair_num, attr))
-    return result
\ No newline at end of file
+register('ygreg.lexers.python', ['.py', '.pyw'], ['python', 'python2', 'python3'])
+register('ygreg.lexers.javascript', ['.js', '.mjs', '.cjs', '.ts'], ['node', 'deno'])
+register('ygreg.lexers.html', ['.html', '.htm', '.xml', '.svg'])
+register('ygreg.lexers.css', ['.css'])
+register('ygreg.lexers.json', ['.json'])
+register('ygreg.lexers.go', ['.go'])
+register('ygreg.lexers.rust', ['.rs'])
+register('ygreg.lexers.c', ['.c', '.h', '.cpp', '.hpp', '.cc', '.java'])
+register('ygreg.lexers.shell', ['.sh', '.bash', '.zsh'], ['sh', 'bash', 'zsh', 'dash', 'ksh'])
+register('ygreg.lexers.markdown', ['.md', '.markdown'])
+register('ygreg.lexers.csv', ['.csv'])
+register('ygreg.lexers.log', ['.log'])
+
+def _interpreter(first_line):
+    """Extrait le nom de l'interpréteur d'un shebang ('#!/usr/bin/env python3' -> 'python3')."""
+    if not first_line.startswith('#!'): return None
+    words = first_line[2:].split()
+    if words and os.path.basename(words[0]) == 'env': words = [w for w in words[1:] if not w.startswith('-')]
+    return os.path.basename(words[0]) if words else None
+
+def get_highlighter(file_path, first_line=""):
+    """Retourne la fonction de coloration du fichier, ou None, en important son module si besoin."""
+    name = os.path.basename(file_path).lower()
+    module_name = EXTENSIONS.get(os.path.splitext(name)[1]) or EXTENSIONS.get(name)
+    if module_name is None: module_name = INTERPRETERS.get(_interpreter(first_line))
+    if module_name is None: return None
+    return importlib.import_module(module_name).highlight
+
+# Outils communs aux modules de ygreg.lexers : une regex maîtresse compilée une fois, avec
+# un groupe nommé par type de token, parcourue en une seule passe.
+
+WORD = r"[^\W\d]\w*"
+
+def master_regex(**rules):
+    return re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in rules.items()))
+
+def emit(result, text, color_pair_num=0, attr=curses.A_NORMAL):
+    """Ajoute un token en le fusionnant avec le précédent s'ils ont le même style."""
+    if result and result[-1][1] == color_pair_num and result[-1][2] == attr:
+        result[-1] = (result[-1][0] + text, color_pair_num, attr)
+    else: result.append((text, color_pair_num, attr))
+
+def close_block(line, closing, color_pair_num):
+    """Consomme le début d'une ligne jusqu'à closing inclus ; retourne (tokens, reste de la ligne ou None)."""
+    end = line.find(closing)
+    if end == -1: return ([(line, color_pair_num, curses.A_NORMAL)] if line else []), None
+    end += len(closing)
+    return [(line[:end], color_pair_num, curses.A_NORMAL)], line[end:]
+
+def scan(regex, line, result, classify):
+    """Parcourt line avec la regex maîtresse ; classify(type, texte) ajoute le token à result."""
+    pos = 0
+    for match in regex.finditer(line):
+        if match.start() > pos: emit(result, line[pos:match.start()])
+        classify(match.lastgroup, match.group())
+        pos = match.end()
+    if pos < len(line): emit(result, line[pos:])
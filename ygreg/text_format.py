@@ -0,0 +1,151 @@
+# -- coding: utf-8 --
+
+import codecs
+from array import array
+
+from .buffer import TextBuffer
+
+SAMPLE_SIZE = 64 * 1024 # Octets examinés pour deviner l'encodage
+READ_CHUNK = 1024 * 1024 # Octets lus et décodés à la fois
+WRITE_LINES = 4096 # Lignes encodées à la fois à l'écriture
+
+# Format d'un fichier texte tel qu'il a été lu : encodage (deviné d'après une BOM ou un
+# échantillon), fin de ligne majoritaire et présence d'un saut de ligne final. Les lignes
+# du tampon n'ont pas de fin de ligne ; celles dont la fin diffère de la majoritaire (un
+# '\n' isolé dans un fichier Windows, par exemple) sont notées à part. L'écriture repasse
+# le document par un encodeur incrémental avec ces fins de ligne : un fichier ouvert puis
+# sauvegardé sans modification est réécrit octet pour octet.
+
+BOMS = [ # Les BOM UTF-32 avant celles d'UTF-16, dont elles commencent pareil
+    (codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF32_LE, "utf-32-le"), (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+GUESSES = ["utf-8", "cp1252", "latin-1"] # Encodages essayés sans BOM, dans l'ordre ; Latin-1 décode n'importe quels octets
+
+def detect_bom(data):
+    """(BOM, encodage) en tête de data, ou (b"", None)."""
+    for bom, encoding in BOMS:
+        if data.startswith(bom): return bom, encoding
+    return b"", None
+
+def guess_encoding(sample):
+    """Premier des GUESSES qui décode un échantillon sans BOM."""
+    for encoding in GUESSES:
+        try: codecs.getincrementaldecoder(encoding)().decode(sample, final=False) # L'échantillon peut couper un caractère
+        except UnicodeDecodeError: continue
+        return encoding
+
+
+class FileFormat:
+    """Encodage, BOM, fin de ligne majoritaire et saut de ligne final d'un fichier.
+
+    `others` associe aux numéros des lignes qui ne finissent pas par `newline` leur fin de
+    ligne réelle ; on_edit(), écouteur du TextBuffer, les tient à jour quand des lignes
+    sont insérées ou retirées au-dessus. Une ligne remplacée par plusieurs garde sa fin
+    sur la dernière. `invalid` est la position du premier octet que l'encodage ne décode
+    pas (trouvé après coup dans un fichier mappé) : écrire ce format est alors refusé.
+    """
+
+    def __init__(self, encoding="utf-8", bom=b"", newline="\n", final_newline=False, others=None, invalid=None):
+        self.encoding, self.bom, self.newline, self.final_newline = encoding, bom, newline, final_newline
+        self.others = others or {}
+        self.invalid = invalid
+
+    def label(self):
+        """Description courte pour la barre d'état, vide pour de l'UTF-8 avec des fins de ligne Unix."""
+        parts = []
+        if self.encoding != "utf-8" or self.bom: parts.append(self.encoding.upper() + (" BOM" if self.bom else ""))
+        if self.newline != "\n": parts.append("CRLF")
+        if self.others: parts.append("fins de ligne mixtes")
+        if self.invalid is not None: parts.append("octets invalides")
+        return " ".join(parts)
+
+    def frozen(self):
+        """Copie à confier au fil d'écriture avec un instantané du document (à prendre sous le verrou du tampon)."""
+        return FileFormat(self.encoding, self.bom, self.newline, self.final_newline, dict(self.others), self.invalid)
+
+    def add_others(self, start, endings):
+        """Note les fins de ligne particulières de lignes ajoutées à partir de start : {position relative: fin}."""
+        for i, ending in endings.items(): self.others[start + i] = ending
+
+    def on_edit(self, start, old_lines, new_lines):
+        if not self.others or len(old_lines) == len(new_lines): return # Lignes modifiées sur place : les fins restent
+        end, delta = start + len(old_lines), len(new_lines) - len(old_lines)
+        others = {}
+        for i, ending in self.others.items():
+            if i >= end: others[i + delta] = ending
+            elif i < start: others[i] = ending
+            elif i == end - 1 and new_lines: others[start + len(new_lines) - 1] = ending
+        self.others = others
+
+    def write(self, f, chunks):
+        """Écrit dans le fichier binaire f les lignes données par blocs (listes de lignes), dans ce format."""
+        if self.invalid is not None: # Les octets remplacés par U+FFFD à la lecture seraient perdus
+            raise ValueError(f"octet invalide en {self.encoding} à la position {self.invalid}, le fichier ne serait pas réécrit à l'identique")
+        encode = codecs.getincrementalencoder(self.encoding)().encode
+        newline, others = self.newline, self.others
+        f.write(self.bom)
+        index, pending = 0, None # Une ligne n'a sa fin qu'une fois la suivante connue : la dernière n'en a peut-être pas
+        for lines in chunks:
+            for start in range(0, len(lines), WRITE_LINES):
+                part = []
+                for line in lines[start:start + WRITE_LINES]:
+                    if pending is not None: part.append(pending + others.get(index - 1, newline))
+                    pending = line
+                    index += 1
+                f.write(encode(''.join(part)))
+        if pending is not None: f.write(encode(pending + (others.get(index - 1, newline) if self.final_newline else "")))
+        f.write(encode("", final=True))
+
+
+def split_text(text, newline=None):
+    """Découpe un texte en lignes sans fin de ligne ; retourne (lignes, FileFormat sans encodage).
+
+    newline : fin de ligne majoritaire, si elle est déjà connue (texte d'un morceau de fichier).
+    """
+    lines = text.split('\n')
+    final_newline = len(lines) > 1 and lines[-1] == ""
+    if final_newline: lines.pop()
+    terminated = len(lines) if final_newline else len(lines) - 1 # Lignes suivies d'un '\n'
+    crlf = array('b', (1 if lines[i].endswith('\r') else 0 for i in range(terminated))) if '\r' in text else None
+    count = sum(crlf) if crlf is not None else 0
+    if newline is None: newline = "\r\n" if count * 2 > terminated else "\n"
+    others = {}
+    for i in range(terminated if count else 0):
+        if crlf[i]: lines[i] = lines[i][:-1]
+    if count != (terminated if newline == "\r\n" else 0): # Fins de ligne mixtes
+        minority = 0 if newline == "\r\n" else 1
+        others = {i: "\r\n" if minority else "\n" for i in range(terminated) if (crlf[i] if crlf is not None else 0) == minority}
+    return lines, FileFormat(newline=newline, final_newline=final_newline, others=others)
+
+
+def load_text(path):
+    """Lit et décode le fichier par morceaux ; retourne (TextBuffer, FileFormat).
+
+    Lève UnicodeDecodeError si le fichier n'est pas valide dans l'encodage annoncé par sa
+    BOM. Sans BOM, un fichier dont l'échantillon passait pour de l'UTF-8 mais qui ne l'est
+    pas plus loin est relu avec l'encodage de secours.
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+        bom, encoding = detect_bom(sample)
+        candidates = [encoding] if encoding else GUESSES[GUESSES.index(guess_encoding(sample)):]
+        for encoding in candidates:
+            f.seek(len(bom))
+            decoder = codecs.getincrementaldecoder(encoding)()
+            pieces, size = [], len(bom)
+            try:
+                while True:
+                    data = f.read(READ_CHUNK)
+                    size += len(data)
+                    pieces.append(decoder.decode(data, final=not data))
+                    if not data: break
+            except UnicodeDecodeError:
+                if encoding == candidates[-1]: raise
+                continue
+            break
+    lines, file_format = split_text(''.join(pieces))
+    file_format.encoding, file_format.bom = encoding, bom
+    buffer = TextBuffer(lines)
+    buffer.total_bytes = size # Octets lus : le suivi du fichier reprend de là
+    return buffer, file_format
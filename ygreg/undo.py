@@ -0,0 +1,226 @@
+# -- coding: utf-8 --
+
+import sys
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
+
+COALESCE_DELAY = 1.0 # Deux frappes plus espacées que ça ne forment plus une seule étape
+_POINTER = 8
+_STEP_OVERHEAD = 650 # Objet _Step, ses trois tableaux, ses deux listes et le curseur (mesuré)
+
+def _cost(old_lines, new_lines):
+    """Octets retenus par une édition : les références, plus les lignes retirées qui n'ont pas été réinsérées.
+
+    Les nouvelles lignes sont dans le tampon ; une ligne retirée puis réinsérée telle quelle
+    (tri, déplacement) est le même objet et n'est pas comptée deux fois.
+    """
+    shared = {id(line) for line in new_lines} if len(old_lines) > 1 else ()
+    return _POINTER * (len(old_lines) + len(new_lines) + 3) + sum(sys.getsizeof(line) for line in old_lines if id(line) not in shared)
+
+def _extend_region(region, start, old_count, new_count):
+    """Zone (début, fin, décalage) couverte par des éditions successives, agrandie d'une édition de plus.
+
+    La fin est celle d'après les éditions, le décalage le nombre de lignes ajoutées en
+    tout ; region vaut None avant la première édition.
+    """
+    if region is None: return start, start + new_count, new_count - old_count
+    first, end, delta = region
+    return min(first, start), max(end, start + old_count) + new_count - old_count, delta + new_count - old_count
+
+
+class _Step:
+    """Une étape d'annulation : ses éditions stockées à plat, dans l'ordre où elles ont eu lieu.
+
+    Les positions et nombres de lignes sont dans des tableaux d'entiers et les lignes de
+    toutes les éditions bout à bout : un remplacement touchant 10 000 lignes coûte trois
+    entiers et deux références par ligne, pas un objet par édition.
+    """
+    __slots__ = ("starts", "old_counts", "new_counts", "old_lines", "new_lines", "cursor", "redo_cursor", "size", "last_time", "sealed")
+
+    def __init__(self, cursor):
+        self.starts, self.old_counts, self.new_counts = array('q'), array('q'), array('q')
+        self.old_lines, self.new_lines = [], []
+        self.cursor, self.redo_cursor = cursor, cursor
+        self.size, self.last_time, self.sealed = _STEP_OVERHEAD, 0, False
+
+    def add(self, start, old_lines, new_lines):
+        self.starts.append(start); self.old_counts.append(len(old_lines)); self.new_counts.append(len(new_lines))
+        self.old_lines.extend(old_lines); self.new_lines.extend(new_lines)
+        cost = _cost(old_lines, new_lines)
+        self.size += cost
+        return cost
+
+    def can_extend(self, start, old_lines, new_lines, now):
+        """Vrai pour une frappe de plus sur la ligne que cette étape modifie déjà."""
+        return (not self.sealed and now - self.last_time < COALESCE_DELAY and len(self.starts) == 1
+                and self.starts[0] == start and self.old_counts[0] == self.new_counts[0] == len(old_lines) == len(new_lines) == 1)
+
+    def undo(self, buffer):
+        old_end, new_end = len(self.old_lines), len(self.new_lines)
+        for i in reversed(range(len(self.starts))):
+            old_start, new_start = old_end - self.old_counts[i], new_end - self.new_counts[i]
+            buffer.replace(self.starts[i], self.starts[i] + self.new_counts[i], self.old_lines[old_start:old_end])
+            old_end, new_end = old_start, new_start
+
+    def region(self):
+        region = None
+        for edit in zip(self.starts, self.old_counts, self.new_counts): region = _extend_region(region, *edit)
+        return region
+
+    def shift(self, delta):
+        """Décale l'étape de delta lignes, quand des lignes ont été ajoutées ou retirées au-dessus."""
+        self.starts = array('q', (start + delta for start in self.starts))
+        self.cursor, self.redo_cursor = (self.cursor[0] + delta, self.cursor[1]), (self.redo_cursor[0] + delta, self.redo_cursor[1])
+
+    def redo(self, buffer):
+        new_pos = 0
+        for i in range(len(self.starts)):
+            new_count = self.new_counts[i]
+            buffer.replace(self.starts[i], self.starts[i] + self.old_counts[i], self.new_lines[new_pos:new_pos + new_count])
+            new_pos += new_count
+
+
+class UndoHistory:
+    """Historique d'annulation d'un TextBuffer, fait des éditions inverses plutôt que de copies du document.
+
+    Les frappes successives sur une même ligne forment une seule étape (jusqu'à seal(),
+    ou une pause de COALESCE_DELAY) ; les éditions faites dans `with group():` en forment
+    une aussi. Au-delà de max_bytes, les étapes les plus anciennes sont oubliées. Un
+    groupe qui dépasse à lui seul le budget est abandonné ; les étapes précédentes qui ne
+    touchent pas ses lignes restent annulables. cursor() donne la position du curseur,
+    rendue par undo() et redo().
+    """
+
+    def __init__(self, buffer, cursor, max_bytes):
+        self.buffer, self._cursor, self.max_bytes = buffer, cursor, max_bytes
+        self._undo, self._redo = deque(), []
+        self.size = 0
+        self._depth, self._group_step = 0, None
+        self._lost = None # Zone touchée par le groupe en cours s'il a été abandonné (voir _extend_region)
+        self._applying = False
+        buffer.add_listener(self._on_edit)
+
+    def _on_edit(self, start, old_lines, new_lines):
+        if self._applying: return
+        now = time.monotonic()
+        if self._redo:
+            self.size -= sum(step.size for step in self._redo)
+            self._redo.clear()
+        if self._depth:
+            step = self._group_step
+            if step is None:
+                step = self._group_step = _Step(self._cursor())
+                self._push(step)
+            elif self._lost is not None: # Groupe trop gros pour le budget : on ne suit plus que la zone touchée
+                self._lost = _extend_region(self._lost, start, len(old_lines), len(new_lines))
+                return
+        else:
+            step = self._undo[-1] if self._undo else None
+            if step is not None and step.can_extend(start, old_lines, new_lines, now):
+                # On garde la ligne d'origine et seulement la dernière version
+                step.new_lines[0] = new_lines[0]
+                step.last_time = now
+                return
+            step = _Step(self._cursor())
+            self._push(step)
+        step.last_time = now
+        self.size += step.add(start, old_lines, new_lines)
+        self._trim()
+
+    def _push(self, step):
+        if self._undo:
+            top = self._undo[-1]
+            top.sealed, top.redo_cursor = True, step.cursor # Le curseur à la fin d'une étape est celui du début de la suivante
+        self._undo.append(step)
+        self.size += step.size
+
+    def _trim(self):
+        """Oublie les étapes les plus anciennes jusqu'à repasser sous le budget.
+
+        Un groupe en cours ne fait pas oublier les étapes précédentes : on attend qu'il soit
+        terminé, et s'il dépasse à lui seul le budget c'est lui qui est abandonné.
+        """
+        step = self._group_step
+        if step is not None:
+            if self._lost is None and step.size > self.max_bytes:
+                self._undo.pop()
+                self.size -= step.size
+                self._lost, step.old_lines, step.new_lines = step.region(), None, None
+            return
+        while self.size > self.max_bytes and self._undo: self.size -= self._undo.popleft().size
+
+    def _rebase(self, region):
+        """Fait passer les étapes au-delà des éditions d'un groupe abandonné, qui ne sont pas dans l'historique.
+
+        Une étape au-dessus de la zone touchée reste telle quelle, une étape en dessous est
+        décalée ; la plus récente qui la chevauche est oubliée avec toutes les précédentes.
+        """
+        first, end, delta = region
+        end -= delta # Fin de la zone avant le groupe
+        for i in reversed(range(len(self._undo))):
+            step = self._undo[i]
+            step_first, step_end, step_delta = step.region()
+            if step_end <= first: first, end = first - step_delta, end - step_delta # Zone exprimée d'avant cette étape
+            elif step_first >= end: step.shift(delta)
+            else:
+                for _ in range(i + 1): self.size -= self._undo.popleft().size
+                return
+
+    def resize(self, max_bytes):
+        """Change le budget mémoire ; les étapes les plus anciennes qui le dépassent sont oubliées."""
+        self.max_bytes = max_bytes
+        self._trim()
+
+    def seal(self):
+        """Termine l'étape en cours : la prochaine édition en commencera une nouvelle."""
+        if self._undo: self._undo[-1].sealed = True
+
+    @contextmanager
+    def untracked(self):
+        """Éditions du bloc absentes de l'historique, qui est oublié : elles ne viennent pas de l'utilisateur et en décaleraient les étapes."""
+        self._applying = True
+        try: yield
+        finally:
+            self._applying = False
+            self._undo.clear(); self._redo.clear()
+            self.size, self._group_step, self._lost = 0, None, None
+
+    @contextmanager
+    def group(self):
+        """Regroupe les éditions du bloc en une seule étape d'annulation."""
+        self._depth += 1
+        try: yield
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                if self._group_step is not None: self._group_step.sealed = True
+                self._group_step = None
+                if self._lost is not None: self._rebase(self._lost); self._lost = None
+                self._trim()
+
+    def _apply(self, method):
+        self._applying = True
+        try:
+            with self.buffer.lock: method(self.buffer)
+        finally: self._applying = False
+
+    def undo(self):
+        """Annule la dernière étape ; retourne la position du curseur avant celle-ci, ou None."""
+        if not self._undo: return None
+        step = self._undo.pop()
+        step.sealed = True
+        if not self._redo: step.redo_cursor = self._cursor() # Étape la plus récente : sa fin est la position actuelle
+        self._apply(step.undo)
+        self._redo.append(step)
+        return step.cursor
+
+    def redo(self):
+        """Rétablit la dernière étape annulée ; retourne la position du curseur après celle-ci, ou None."""
+        if not self._redo: return None
+        step = self._redo.pop()
+        self._apply(step.redo)
+        self.seal()
+        self._undo.append(step)
+        return step.redo_cursor
@@ -0,0 +1,152 @@
+# -- coding: utf-8 --
+
+import curses
+import os
+from collections import OrderedDict
+
+from .autosave import writer
+from .editor import Editor
+
+# Documents ouverts dans l'éditeur. Chacun a son onglet, dans l'ordre d'ouverture ; les
+# Editor eux-mêmes sont gardés en mémoire tant que leur total estimé tient dans le budget
+# du réglage "buffer_memory_mb". Au-delà, les documents sauvegardés les moins récemment
+# utilisés sont déchargés (leur onglet reste) et relus depuis le disque quand on y revient,
+# à la même position. Un document modifié n'est jamais déchargé.
+
+
+class BufferPool:
+    """Documents ouverts, du plus ancien onglet au plus récent ; open() donne l'Editor du document, relu s'il avait été déchargé."""
+
+    def __init__(self, stdscr, settings):
+        self.stdscr, self.settings = stdscr, settings
+        self.paths = [] # Onglets, chemins absolus
+        self._editors = OrderedDict() # Chemin -> Editor chargé, du moins récemment utilisé au plus récent
+        self._positions = {} # Chemin déchargé -> (ligne, colonne, première ligne affichée)
+
+    def open(self, path):
+        """Editor de path, créé (ou recréé après déchargement) au besoin ; il devient le plus récent."""
+        path = os.path.abspath(path)
+        editor = self._editors.get(path)
+        if editor is not None:
+            self._editors.move_to_end(path)
+            editor.apply_settings() # Les réglages ont pu changer depuis sa dernière activation
+        else:
+            editor = Editor(self.stdscr, path, self.settings)
+            editor.workspace = self
+            position = self._positions.pop(path, None)
+            if position: editor.jump_to(*position[:2]); editor.top_line = position[2]
+            self._editors[path] = editor
+            if path not in self.paths: self.paths.append(path)
+        self._evict()
+        return editor
+
+    def close(self, path):
+        """Retire le document (déjà sauvegardé ou abandonné par l'utilisateur) ; retourne le plus récent des restants, ou None."""
+        path = os.path.abspath(path)
+        editor = self._editors.pop(path, None)
+        if editor is not None: editor.close()
+        if path in self.paths: self.paths.remove(path)
+        self._positions.pop(path, None)
+        return self.recent()
+
+    def recent(self):
+        """Chemin du document utilisé le plus récemment, ou None s'il n'y en a plus."""
+        if self._editors: return next(reversed(self._editors))
+        return self.paths[-1] if self.paths else None
+
+    def neighbour(self, path, step):
+        """Onglet situé step places après celui de path (en bouclant)."""
+        i = self.paths.index(os.path.abspath(path))
+        return self.paths[(i + step) % len(self.paths)]
+
+    def choose(self, current):
+        """Affiche la liste des fichiers ouverts ; retourne le chemin choisi, "explorer" ou None."""
+        return BufferSwitcher(self.stdscr, self, current).run()
+
+    def loaded(self, path): return os.path.abspath(path) in self._editors
+
+    def modified(self, path):
+        editor = self._editors.get(os.path.abspath(path))
+        return editor is not None and editor.modified
+
+    def unsaved(self):
+        """Chemins des documents qui ont des modifications non sauvegardées."""
+        return [path for path, editor in self._editors.items() if editor.modified]
+
+    def memory(self):
+        return sum(editor.memory_estimate() for editor in self._editors.values())
+
+    def _evict(self):
+        """Décharge les documents sauvegardés les moins récents tant que le budget est dépassé (jamais le plus récent)."""
+        budget = self.settings.get("buffer_memory_mb") * 1024 * 1024
+        sizes = {path: editor.memory_estimate() for path, editor in self._editors.items()}
+        total = sum(sizes.values())
+        for path in list(self._editors)[:-1]:
+            if total <= budget: break
+            editor = self._editors[path]
+            if editor.modified or editor.follower is not None or writer.busy(editor.file_path): continue
+            self._positions[path] = (editor.cursor_y, editor.cursor_x, editor.top_line)
+            editor.close()
+            del self._editors[path]
+            total -= sizes[path]
+
+    def tabs(self, active, width):
+        """Ligne d'onglets de largeur au plus width, l'onglet actif entre crochets et toujours visible ; '+' si modifié."""
+        labels = []
+        for path in self.paths:
+            label = os.path.basename(path) + ('+' if self.modified(path) else '')
+            labels.append(f"[{label}]" if path == os.path.abspath(active) else f" {label} ")
+        i = self.paths.index(os.path.abspath(active))
+        first, last = i, i + 1
+        used = len(labels[i])
+        while True: # On élargit autour de l'onglet actif, en alternant à droite et à gauche
+            grew = False
+            if last < len(labels) and used + len(labels[last]) <= width: used += len(labels[last]); last += 1; grew = True
+            if first > 0 and used + len(labels[first - 1]) <= width: first -= 1; used += len(labels[first]); grew = True
+            if not grew: break
+        return ''.join(labels[first:last])[:width]
+
+
+class BufferSwitcher:
+    """Liste des documents ouverts, du plus récent au plus ancien ; run() retourne le chemin choisi, "explorer" ou None."""
+
+    def __init__(self, stdscr, pool, current):
+        self.stdscr, self.pool = stdscr, pool
+        recent = list(reversed(pool._editors))
+        self.paths = recent + [path for path in reversed(pool.paths) if path not in recent]
+        self.selected = 1 if len(self.paths) > 1 and self.paths[0] == os.path.abspath(current) else 0 # Alt+Tab : le précédent
+
+    def run(self):
+        curses.curs_set(0)
+        entries = self.paths + ["explorer"]
+        top = 0
+        while True:
+            h, w = self.stdscr.getmaxyx(); list_h = max(1, h - 3)
+            if self.selected < top: top = self.selected
+            if self.selected >= top + list_h: top = self.selected - list_h + 1
+            try:
+                self.stdscr.erase(); self._draw(entries[top:top + list_h], top); self.stdscr.refresh()
+            except curses.error: pass
+            try: key = self.stdscr.get_wch()
+            except (curses.error, KeyboardInterrupt): return None
+            if key in ('\x1b', 'q'): return None
+            elif key == curses.KEY_UP: self.selected = max(0, self.selected - 1)
+            elif key == curses.KEY_DOWN: self.selected = min(len(entries) - 1, self.selected + 1)
+            elif key in ('\n', '\r', curses.KEY_ENTER): return entries[self.selected]
+
+    def _draw(self, visible, top):
+        h, w = self.stdscr.getmaxyx()
+        self.stdscr.attron(curses.color_pair(3)); self.stdscr.box(); self.stdscr.attroff(curses.color_pair(3))
+        title = " YGREG - Fichiers ouverts "
+        self.stdscr.addstr(0, (w - len(title)) // 2, title, curses.A_BOLD)
+        memory = f"{len(self.paths)} fichier(s), {self.pool.memory() / (1024 * 1024):.1f} Mo en mémoire"
+        self.stdscr.addstr(1, 2, f"{memory} / {self.pool.settings.get('buffer_memory_mb')} Mo"[:w - 4], curses.A_DIM)
+        for i, entry in enumerate(visible):
+            if entry == "explorer": line = "📁 Explorateur de fichiers..."
+            else:
+                state = " [+]" if self.pool.modified(entry) else "" if self.pool.loaded(entry) else " (déchargé)"
+                line = f"📄 {os.path.basename(entry)}{state}   {os.path.dirname(entry)}"
+            style = curses.color_pair(2) | curses.A_BOLD if top + i == self.selected else curses.color_pair(0)
+            self.stdscr.addstr(i + 2, 2, line[:w - 4].ljust(w - 4), style)
+        footer = "Entrée: Ouvrir | Haut/Bas: Choisir | Échap/Q: Retour"
+        self.stdscr.addstr(h - 1, (w - len(footer)) // 2, footer, curses.color_pair(2))
@@ -2,14 +2,17 @@
 # -- coding: utf-8 --
 
 import curses
+import os
 import sys
 import locale
 
 from ygreg.settings import Settings
 from ygreg.file_selector import FileSelector
-from ygreg.editor import Editor
+from ygreg.workspace import BufferPool
+from ygreg.file_index import project_index
 from ygreg.screens import SettingsScreen, HelpScreen
 from ygreg.themes import set_theme_colors
+from ygreg.utils import prompt_input
 
 def main(stdscr):
     """Fonction principale qui orchestre l'application."""
@@ -17,46 +20,65 @@ def main(stdscr):
     current_screen = "file_selector"
     previous_screen = "file_selector"
     file_to_open = sys.argv[1] if len(sys.argv) > 1 else None
+    open_at = None # (ligne, colonne) choisie dans les résultats d'une recherche dans le dossier
+    workspace = BufferPool(stdscr, settings) # Fichiers ouverts : on y revient sans les relire
+    if settings.get("file_index"): project_index(os.getcwd()) # Le parcours commence tout de suite, en fond
 
     while current_screen != "exit":
-        set_theme_colors(settings.get("theme"))
-        stdscr.bkgd(' ', curses.color_pair(0))
+        try:
+            set_theme_colors(settings.get("theme"))
+            stdscr.bkgd(' ', curses.color_pair(0))
         
-        if current_screen == "file_selector":
-            if file_to_open:
-                previous_screen = current_screen
-                current_screen = "editor"
-            else:
-                action_or_path = FileSelector(stdscr, settings).run()
-                if action_or_path in ["settings", "help"]:
-                    previous_screen = "file_selector"
-                    current_screen = action_or_path
-                elif action_or_path:
-                    file_to_open = action_or_path
-                    previous_screen = "file_selector"
+            if current_screen == "file_selector":
+                if file_to_open:
+                    previous_screen = current_screen
                     current_screen = "editor"
-                else: # action_or_path is None
-                    current_screen = "exit"
+                else:
+                    selector = FileSelector(stdscr, settings, back_to_editor=bool(workspace.recent()))
+                    action_or_path = selector.run()
+                    if action_or_path in ["settings", "help"]:
+                        previous_screen = "file_selector"
+                        current_screen = action_or_path
+                    elif action_or_path:
+                        file_to_open, open_at = action_or_path, selector.open_at
+                        previous_screen = "file_selector"
+                        current_screen = "editor"
+                    elif workspace.recent(): # Explorateur ouvert depuis l'éditeur : Q y revient
+                        file_to_open = workspace.recent()
+                        current_screen = "editor"
+                    else: # action_or_path is None
+                        current_screen = "exit"
 
-        elif current_screen == "editor":
-            editor_instance = Editor(stdscr, file_to_open, settings)
-            action = editor_instance.run()
-            if action == "quit":
-                file_to_open = None
-                current_screen = "file_selector"
-            elif action in ["settings", "help"]:
-                previous_screen = "editor"
-                current_screen = action
-            else:
-                current_screen = action
+            elif current_screen == "editor":
+                editor_instance = workspace.open(file_to_open)
+                if open_at: editor_instance.jump_to(*open_at); open_at = None
+                action = editor_instance.run()
+                if action == "quit": # Ce fichier est fermé ; on passe au plus récent des autres, s'il y en a
+                    file_to_open = workspace.close(editor_instance.file_path)
+                    if not file_to_open: current_screen = "file_selector"
+                elif action == "open": # Autre fichier, choisi par nom, dans la liste des fichiers ouverts ou avec F6
+                    file_to_open = editor_instance.open_request
+                elif action == "explorer":
+                    file_to_open = None
+                    current_screen = "file_selector"
+                elif action in ["settings", "help"]:
+                    previous_screen = "editor"
+                    current_screen = action
+                else:
+                    current_screen = action
 
-        elif current_screen == "settings":
-            SettingsScreen(stdscr, settings).run()
-            current_screen = previous_screen
+            elif current_screen == "settings":
+                SettingsScreen(stdscr, settings).run()
+                current_screen = previous_screen
 
-        elif current_screen == "help":
-            HelpScreen(stdscr).run()
-            current_screen = previous_screen
+            elif current_screen == "help":
+                HelpScreen(stdscr).run()
+                current_screen = previous_screen
+        except KeyboardInterrupt: # Ctrl+C hors de l'éditeur : les fichiers modifiés ne sont pas perdus sans confirmation
+            unsaved = workspace.unsaved()
+            if unsaved and prompt_input(stdscr, f"{len(unsaved)} fichier(s) non sauvegardé(s). Quitter quand même? (o/n) ").lower() != 'o': continue
+            for path in list(workspace.paths): workspace.close(path)
+            current_screen = "exit"
 
 if __name__ == "__main__":
     locale.setlocale(locale.LC_ALL, '')